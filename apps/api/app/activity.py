@@ -0,0 +1,388 @@
+"""Trip activity log: who changed what, written off the request path.
+
+Routers call ``record(db, trip_id, actor, entity, row, action, changes)`` next
+to their writes; ``changes(row)`` gives the ``{column: [old, new]}`` diff of a
+row's unflushed edits.  Entries are staged on the session and handed to an
+in-memory queue when it commits (a rollback drops them), so a mutation pays
+for a few dict and list operations, not an extra INSERT.  A writer thread
+drains the queue in batches, every ``ACTIVITY_FLUSH_SECONDS`` or
+``ACTIVITY_BATCH_SIZE`` entries: ``COPY`` on Postgres (psycopg), a multi-row
+INSERT elsewhere.  When the queue is full new entries are dropped and counted
+rather than slowing requests down; entries still queued when the process dies
+are lost.  The feed is therefore a little behind the writes it describes.
+
+Entries get time-ordered ids here (no sequence round-trip, so they can be
+copied in bulk) and go to ``trip_activity``, which on Postgres is partitioned
+by month: the writer creates ``trip_activity_pYYYYMM`` before the first write
+into a month and, with ``ACTIVITY_RETENTION_MONTHS``, drops partitions older
+than that.
+"""
+import logging
+import os
+import queue
+import re
+import secrets
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any
+
+import orjson
+from fastapi import HTTPException
+from sqlalchemy import Connection, and_, event, insert, inspect, or_, select, text
+from sqlalchemy.orm import Session
+
+from app import models
+from app.db import get_engine
+
+logger = logging.getLogger(__name__)
+
+ACTIVITY_FLUSH_SECONDS = float(os.getenv("ACTIVITY_FLUSH_SECONDS", "0.5"))
+ACTIVITY_BATCH_SIZE = int(os.getenv("ACTIVITY_BATCH_SIZE", "1000"))
+ACTIVITY_QUEUE_SIZE = int(os.getenv("ACTIVITY_QUEUE_SIZE", "100000"))
+ACTIVITY_RETENTION_MONTHS = int(os.getenv("ACTIVITY_RETENTION_MONTHS", "0"))  # 0 keeps everything
+WRITE_ATTEMPTS = 3
+
+TABLE = models.TripActivity.__table__
+COLUMNS = ("id", "occurred_at", "trip_id", "actor_id", "entity", "entity_id", "action", "changes")
+COPY_SQL = f"COPY trip_activity ({', '.join(COLUMNS)}) FROM STDIN"
+PARTITION_NAME = re.compile(r"^trip_activity_p(\d{4})(\d{2})$")
+
+# Bookkeeping columns that change on every write and say nothing about the edit,
+# and the invite code and calendar token, which are secrets
+IGNORED = frozenset({"id", "trip_id", "seq", "revision", "created_at", "updated_at", "invite_code", "calendar_token"})
+
+_STAGED = "activity_entries"
+_STOP = object()
+
+
+@dataclass(slots=True)
+class Entry:
+    id: int
+    occurred_at: datetime
+    trip_id: int
+    actor_id: int | None
+    entity: str
+    entity_id: int | None
+    action: str
+    changes: dict
+
+    def row(self) -> tuple:
+        return (self.id, self.occurred_at, self.trip_id, self.actor_id, self.entity, self.entity_id, self.action, self.changes)
+
+
+# --- ids -------------------------------------------------------------------
+
+_EPOCH_MS = 1_704_067_200_000  # 2024-01-01
+_id_lock = threading.Lock()
+_node = secrets.randbits(10)
+_last_ms = 0
+_sequence = 0
+
+
+def _reseed() -> None:
+    global _node
+    _node = secrets.randbits(10)
+
+
+os.register_at_fork(after_in_child=_reseed)
+
+
+def next_id() -> int:
+    """Time-ordered 63-bit id: milliseconds, 10 random process bits, 12 sequence bits."""
+    global _last_ms, _sequence
+    with _id_lock:
+        ms = max(int(time.time() * 1000) - _EPOCH_MS, _last_ms)
+        if ms == _last_ms:
+            _sequence = (_sequence + 1) & 0xFFF
+            if _sequence == 0:
+                ms += 1  # 4096 ids in one millisecond: borrow the next one
+        else:
+            _sequence = 0
+        _last_ms = ms
+        return (ms << 22) | (_node << 12) | _sequence
+
+
+# --- recording -------------------------------------------------------------
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def changes(row: Any, action: str = "update") -> dict[str, list]:
+    """``{column: [old, new]}`` for ``row``: its unflushed edits, or every column for a create/delete."""
+    state = inspect(row)
+    columns = state.mapper.columns
+    diff = {}
+    if action == "update":
+        # committed_state holds just the attributes modified since the last flush
+        for key in state.committed_state:
+            if key in IGNORED or key not in columns:
+                continue
+            history = state.attrs[key].history
+            old = history.deleted[0] if history.deleted else None
+            new = history.added[0] if history.added else None
+            if old != new:
+                diff[key] = [_plain(old), _plain(new)]
+        return diff
+    for key, value in state.dict.items():
+        if key in IGNORED or key not in columns or value is None:
+            continue
+        value = _plain(value)
+        diff[key] = [None, value] if action == "create" else [value, None]
+    return diff
+
+
+def record(
+    db: Session,
+    trip_id: int,
+    actor: models.User | None,
+    entity: str,
+    target: Any,
+    action: str,
+    changes: dict | None = None,
+) -> None:
+    """Stage an entry on ``db``; it is queued for writing if ``db`` commits.
+
+    ``target`` is the changed row (its id is read at commit, so new rows work)
+    or a plain id.
+    """
+    entity_id = target if target is None or isinstance(target, int) else None
+    entry = Entry(
+        id=next_id(),
+        occurred_at=datetime.now(timezone.utc),
+        trip_id=trip_id,
+        actor_id=actor.id if actor is not None else None,
+        entity=entity,
+        entity_id=entity_id,
+        action=action,
+        changes=changes or {},
+    )
+    if not db.in_transaction():
+        db.begin()  # so a rollback or close without commit ends it and drops the entry
+    db.info.setdefault(_STAGED, []).append((entry, target if entity_id is None else None))
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session: Session) -> None:
+    staged = session.info.pop(_STAGED, None)
+    if not staged:
+        return
+    writer = get_writer()
+    for entry, target in staged:
+        if target is not None:
+            identity = inspect(target).identity
+            entry.entity_id = identity[0] if identity else None
+        writer.put(entry)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _after_transaction_end(session: Session, transaction) -> None:
+    if transaction.parent is None:
+        session.info.pop(_STAGED, None)  # rolled back; committed entries are gone already
+
+
+# --- writing ---------------------------------------------------------------
+
+def _month_start(moment: datetime) -> date:
+    return date(moment.year, moment.month, 1)
+
+
+def _next_month(month: date) -> date:
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"trip_activity_p{month.year:04d}{month.month:02d}"
+
+
+def ensure_partition(conn: Connection, month: date) -> None:
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF trip_activity "
+        f"FOR VALUES FROM ('{month.isoformat()} 00:00+00') TO ('{_next_month(month).isoformat()} 00:00+00')"
+    ))
+
+
+def drop_partitions_before(conn: Connection, month: date) -> list[str]:
+    """Drop the monthly partitions that end on or before ``month``; returns their names."""
+    children = conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = 'trip_activity'"
+    )).scalars()
+    dropped = []
+    for name in children:
+        match = PARTITION_NAME.match(name)
+        if match and date(int(match[1]), int(match[2]), 1) < month:
+            conn.execute(text(f"DROP TABLE IF EXISTS {name}"))
+            dropped.append(name)
+    return dropped
+
+
+def _copy(conn: Connection, entries: list[Entry]) -> None:
+    with conn.connection.driver_connection.cursor() as cursor:
+        with cursor.copy(COPY_SQL) as copy:
+            for entry in entries:
+                row = entry.row()
+                copy.write_row((*row[:-1], orjson.dumps(row[-1]).decode()))
+
+
+class ActivityWriter(threading.Thread):
+    """Drains the queue and writes whatever has accumulated in one statement."""
+
+    def __init__(self, queue_size: int = ACTIVITY_QUEUE_SIZE) -> None:
+        super().__init__(name="activity-writer", daemon=True)
+        self.queue: queue.Queue = queue.Queue(queue_size)
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self._partitions: set[date] = set()
+
+    def put(self, entry: Entry) -> None:
+        try:
+            self.queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Block until everything queued so far is written."""
+        done = threading.Event()
+        self.queue.put(done)
+        return done.wait(timeout)
+
+    def stop(self, timeout: float | None = None) -> None:
+        self.queue.put(_STOP)
+        self.join(timeout)
+
+    def _prepare_partitions(self, entries: list[Entry]) -> None:
+        months = {_month_start(entry.occurred_at) for entry in entries} - self._partitions
+        if not months:
+            return
+        with get_engine().begin() as conn:
+            for month in sorted(months):
+                ensure_partition(conn, month)
+            if ACTIVITY_RETENTION_MONTHS > 0:
+                # Keep the current month and the ACTIVITY_RETENTION_MONTHS - 1 before it
+                cutoff = _month_start(datetime.now(timezone.utc))
+                for _ in range(ACTIVITY_RETENTION_MONTHS - 1):
+                    cutoff = date(cutoff.year - (cutoff.month == 1), (cutoff.month - 2) % 12 + 1, 1)
+                for name in drop_partitions_before(conn, cutoff):
+                    logger.info("Dropped activity partition %s", name)
+        self._partitions |= months
+
+    def write(self, entries: list[Entry]) -> None:
+        engine = get_engine()
+        if engine.dialect.name == "postgresql":
+            self._prepare_partitions(entries)
+            if engine.dialect.driver == "psycopg":
+                with engine.begin() as conn:
+                    _copy(conn, entries)
+                return
+        with engine.begin() as conn:
+            conn.execute(insert(TABLE), [dict(zip(COLUMNS, entry.row())) for entry in entries])
+
+    def _write_batch(self, entries: list[Entry]) -> None:
+        for attempt in range(1, WRITE_ATTEMPTS + 1):
+            try:
+                self.write(entries)
+                self.written += len(entries)
+                return
+            except Exception:
+                if attempt == WRITE_ATTEMPTS:
+                    self.failed += len(entries)
+                    logger.exception("Dropped %s activity entries after %s attempts", len(entries), attempt)
+                    return
+                self._partitions.clear()  # a partition may have been dropped under us
+                time.sleep(0.2 * 2 ** attempt)
+
+    def run(self) -> None:
+        stopping = False
+        while not stopping:
+            items = [self.queue.get()]
+            deadline = time.monotonic() + ACTIVITY_FLUSH_SECONDS
+            # Linger for more entries unless asked to flush or stop
+            while len(items) < ACTIVITY_BATCH_SIZE and isinstance(items[-1], Entry):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    items.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            entries = [item for item in items if isinstance(item, Entry)]
+            if entries:
+                self._write_batch(entries)
+            for item in items:
+                if item is _STOP:
+                    stopping = True
+                elif isinstance(item, threading.Event):
+                    item.set()
+
+
+_writer: ActivityWriter | None = None
+_writer_lock = threading.Lock()
+
+
+def get_writer() -> ActivityWriter:
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                writer = ActivityWriter()
+                writer.start()
+                _writer = writer
+    return _writer
+
+
+def stop(timeout: float | None = 10) -> None:
+    """Write out what is queued and stop the writer (it restarts on the next commit)."""
+    global _writer
+    with _writer_lock:
+        writer, _writer = _writer, None
+    if writer is not None:
+        writer.stop(timeout)
+
+
+# --- reading ---------------------------------------------------------------
+
+_UNIX_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def encode_cursor(entry: models.TripActivity) -> str:
+    occurred_at = entry.occurred_at
+    if occurred_at.tzinfo is None:
+        occurred_at = occurred_at.replace(tzinfo=timezone.utc)
+    return f"{(occurred_at - _UNIX_EPOCH) // _MICROSECOND}:{entry.id}"
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        micros, entry_id = cursor.split(":", 1)
+        return _UNIX_EPOCH + int(micros) * _MICROSECOND, int(entry_id)
+    except (ValueError, OverflowError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def page(db: Session, trip_id: int, limit: int, cursor: str | None = None) -> tuple[list[models.TripActivity], str | None]:
+    """One page of the trip's activity, newest first, and the cursor for the next page."""
+    activity = models.TripActivity
+    query = select(activity).where(activity.trip_id == trip_id)
+    if cursor:
+        occurred_at, entry_id = decode_cursor(cursor)
+        query = query.where(or_(
+            activity.occurred_at < occurred_at,
+            and_(activity.occurred_at == occurred_at, activity.id < entry_id),
+        ))
+    entries = db.scalars(query.order_by(activity.occurred_at.desc(), activity.id.desc()).limit(limit + 1)).all()
+    next_cursor = None
+    if len(entries) > limit:
+        entries = entries[:limit]
+        next_cursor = encode_cursor(entries[-1])
+    return entries, next_cursor
@@ -0,0 +1,234 @@
+"""Proxied, resized profile pictures with an on-disk LRU cache.
+
+``AvatarCache.thumbnail_for(url)`` returns the WebP thumbnail of a picture
+URL, fetching and resizing it the first time.  Thumbnails are content-addressed
+(``blobs/<sha256>.webp``); ``refs/<sha256(url, size)>`` records which blob a
+source URL produced, so identical pictures share one file.  A file's mtime is
+its last use: hits touch it, and once the blobs exceed
+``AVATAR_CACHE_MAX_BYTES`` the least recently used are deleted along with the
+refs pointing at them.  Hits return the bytes rather than a path, so a blob
+evicted right after a lookup cannot break the response; a ref whose blob is
+gone (written by another process) simply misses and refetches.
+
+Concurrent misses for the same URL wait for a single fetch.  The fetcher is
+pluggable: ``AVATAR_FETCHER=stub`` draws a colour per URL instead of going to
+the network (tests, offline development).  Each worker process keeps its own
+view of the cache size, so with several workers the bound is approximate.
+"""
+import hashlib
+import io
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Protocol
+
+AVATAR_CACHE_DIR = os.getenv("AVATAR_CACHE_DIR", os.path.join(tempfile.gettempdir(), "trvl-avatars"))
+AVATAR_CACHE_MAX_BYTES = int(os.getenv("AVATAR_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+AVATAR_SIZE = int(os.getenv("AVATAR_SIZE", "128"))
+AVATAR_FETCHER = os.getenv("AVATAR_FETCHER", "http")  # http | stub
+FETCH_TIMEOUT = 5
+MAX_SOURCE_BYTES = 5 * 1024 * 1024
+WEBP_QUALITY = 80
+
+
+class AvatarUnavailable(Exception):
+    pass
+
+
+class Fetcher(Protocol):
+    def fetch(self, url: str) -> bytes:
+        ...
+
+
+class HttpFetcher:
+    def fetch(self, url: str) -> bytes:
+        import requests
+
+        try:
+            r = requests.get(url, timeout=FETCH_TIMEOUT, stream=True)
+            r.raise_for_status()
+            data = r.raw.read(MAX_SOURCE_BYTES + 1, decode_content=True)
+        except requests.RequestException as exc:
+            raise AvatarUnavailable(str(exc)) from exc
+        if len(data) > MAX_SOURCE_BYTES:
+            raise AvatarUnavailable("Picture too large")
+        return data
+
+
+class StubFetcher:
+    """A solid square whose colour is derived from the URL."""
+
+    def fetch(self, url: str) -> bytes:
+        from PIL import Image
+
+        color = tuple(hashlib.sha256(url.encode()).digest()[:3])
+        buf = io.BytesIO()
+        Image.new("RGB", (256, 256), color).save(buf, "PNG")
+        return buf.getvalue()
+
+
+def make_thumbnail(data: bytes, size: int) -> bytes:
+    """Centre-crop to a ``size`` square and encode as WebP."""
+    from PIL import Image, ImageOps
+
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            image = ImageOps.exif_transpose(image).convert("RGB")
+            thumb = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+    except (OSError, ValueError, Image.DecompressionBombError) as exc:
+        raise AvatarUnavailable("Unreadable picture") from exc
+    buf = io.BytesIO()
+    thumb.save(buf, "WEBP", quality=WEBP_QUALITY, method=4)
+    return buf.getvalue()
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class AvatarCache:
+    def __init__(self, root: str, fetcher: Fetcher, max_bytes: int = AVATAR_CACHE_MAX_BYTES, size: int = AVATAR_SIZE) -> None:
+        self.fetcher = fetcher
+        self.max_bytes = max_bytes
+        self.size = size
+        self._blobs = os.path.join(root, "blobs")
+        self._refs = os.path.join(root, "refs")
+        os.makedirs(self._blobs, exist_ok=True)
+        os.makedirs(self._refs, exist_ok=True)
+        self._lock = threading.Lock()
+        self._inflight: dict[str, Future] = {}
+        # digest -> size, least recently used first
+        self._lru: OrderedDict[str, int] = OrderedDict()
+        # ref -> digest and digest -> refs, so evicting a blob removes its refs too
+        self._ref_digest: dict[str, str] = {}
+        self._digest_refs: dict[str, set[str]] = {}
+        entries = []
+        for entry in os.scandir(self._blobs):
+            if entry.name.endswith(".webp"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.name[:-5], stat.st_size))
+        for _, digest, size in sorted(entries):
+            self._lru[digest] = size
+        self._total = sum(self._lru.values())
+        for entry in os.scandir(self._refs):
+            try:
+                with open(entry.path) as f:
+                    digest = f.read().strip()
+            except FileNotFoundError:
+                continue
+            if digest in self._lru:
+                self._link(entry.name, digest)
+            else:
+                _remove(entry.path)
+
+    def _link(self, ref: str, digest: str) -> None:
+        previous = self._ref_digest.get(ref)
+        if previous is not None and previous != digest:
+            self._digest_refs[previous].discard(ref)
+        self._ref_digest[ref] = digest
+        self._digest_refs.setdefault(digest, set()).add(ref)
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self._blobs, f"{digest}.webp")
+
+    def _lookup(self, ref: str) -> bytes | None:
+        try:
+            with open(os.path.join(self._refs, ref)) as f:
+                digest = f.read().strip()
+            path = self._blob_path(digest)
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            if digest in self._lru:
+                self._lru.move_to_end(digest)
+        return data
+
+    def _store(self, ref: str, data: bytes) -> bytes:
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(digest)
+        if not os.path.exists(path):
+            _write_atomic(path, data)
+        _write_atomic(os.path.join(self._refs, ref), digest.encode())
+        with self._lock:
+            if digest not in self._lru:
+                self._total += len(data)
+            self._lru[digest] = len(data)
+            self._lru.move_to_end(digest)
+            self._link(ref, digest)
+            evicted = []
+            # The blob just stored is the most recent, so it is never among these
+            while self._total > self.max_bytes and len(self._lru) > 1:
+                old, size = self._lru.popitem(last=False)
+                self._total -= size
+                refs = self._digest_refs.pop(old, set())
+                for old_ref in refs:
+                    del self._ref_digest[old_ref]
+                evicted.append((old, refs))
+        for old, refs in evicted:
+            _remove(self._blob_path(old))
+            for old_ref in refs:
+                _remove(os.path.join(self._refs, old_ref))
+        return data
+
+    def thumbnail_for(self, url: str) -> bytes:
+        """WebP thumbnail of ``url``; raises ``AvatarUnavailable`` when it cannot be fetched or decoded."""
+        ref = hashlib.sha256(f"{url}\0{self.size}".encode()).hexdigest()
+        data = self._lookup(ref)
+        if data is not None:
+            return data
+        with self._lock:
+            flight = self._inflight.get(ref)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[ref] = Future()
+        if not leader:
+            return flight.result()
+        try:
+            data = self._lookup(ref) or self._store(ref, make_thumbnail(self.fetcher.fetch(url), self.size))
+        except BaseException as exc:
+            flight.set_exception(exc)
+            raise
+        else:
+            flight.set_result(data)
+            return data
+        finally:
+            with self._lock:
+                del self._inflight[ref]
+
+
+def picture_version(picture: str) -> str:
+    """Short hash of the source URL, used as the ``v`` query parameter of avatar links."""
+    return hashlib.sha256(picture.encode()).hexdigest()[:12]
+
+
+_cache: AvatarCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> AvatarCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                fetcher = StubFetcher() if AVATAR_FETCHER == "stub" else HttpFetcher()
+                _cache = AvatarCache(AVATAR_CACHE_DIR, fetcher)
+    return _cache
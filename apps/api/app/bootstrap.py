@@ -0,0 +1,130 @@
+"""Create a fresh database from the models instead of replaying migrations.
+
+The models are the squashed baseline: ``bootstrap`` runs
+``Base.metadata.create_all`` (which also emits the Postgres-only range
+indexes, search column and trigram index attached to the tables) and stamps
+``alembic_version`` with the current head, so a later ``alembic upgrade head``
+continues from there.  Existing databases keep upgrading through the chain.
+
+    python -m app.bootstrap [URL]                          # default: DATABASE_URL
+    python -m app.bootstrap --check BOOTSTRAP_URL MIGRATED_URL
+
+``--check`` bootstraps one empty database, replays every migration into the
+other and compares the reflected schemas (tables, column types and
+nullability, primary and foreign keys, indexes, unique constraints).  Run it
+in CI whenever a model or migration changes; the chain needs Postgres.
+"""
+import sys
+import time
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import Connection, create_engine, inspect
+
+from app import db, models  # noqa: F401 - models register the tables on Base.metadata
+
+ALEMBIC_INI = Path(__file__).resolve().parent.parent / "alembic.ini"
+
+
+def alembic_config() -> Config:
+    return Config(str(ALEMBIC_INI))
+
+
+def bootstrap(conn: Connection, config: Config | None = None) -> str:
+    """Create every table on an empty database and stamp it at head; returns the head revision."""
+    existing = set(inspect(conn).get_table_names())
+    if existing & (set(db.Base.metadata.tables) | {"alembic_version"}):
+        raise RuntimeError("Database is not empty; use `alembic upgrade head` instead")
+    script = ScriptDirectory.from_config(config or alembic_config())
+    head = script.get_current_head()
+    db.Base.metadata.create_all(conn)
+    MigrationContext.configure(conn).stamp(script, head)
+    return head
+
+
+def migrate(conn: Connection, config: Config | None = None) -> None:
+    """Replay the whole migration chain on ``conn``."""
+    config = config or alembic_config()
+    config.attributes["connection"] = conn
+    command.upgrade(config, "head")
+
+
+def schema_snapshot(conn: Connection) -> dict[str, dict]:
+    insp = inspect(conn)
+    snapshot = {}
+    for table in insp.get_table_names():
+        if table == "alembic_version":
+            continue
+        snapshot[table] = {
+            "columns": {c["name"]: (str(c["type"]), c["nullable"]) for c in insp.get_columns(table)},
+            "primary key": tuple(insp.get_pk_constraint(table)["constrained_columns"]),
+            "foreign keys": sorted(
+                (tuple(fk["constrained_columns"]), fk["referred_table"], tuple(fk["referred_columns"]), (fk.get("options") or {}).get("ondelete"))
+                for fk in insp.get_foreign_keys(table)
+            ),
+            "indexes": sorted(
+                (ix["name"], tuple(ix.get("column_names") or ()), tuple(ix.get("expressions") or ()), bool(ix["unique"]))
+                for ix in insp.get_indexes(table)
+            ),
+            # Constraint names differ between create_all and hand-written migrations; compare columns only
+            "unique constraints": sorted(tuple(uc["column_names"]) for uc in insp.get_unique_constraints(table)),
+        }
+    return snapshot
+
+
+def diff(bootstrapped: dict[str, dict], migrated: dict[str, dict]) -> list[str]:
+    problems = []
+    for table in sorted(bootstrapped.keys() | migrated.keys()):
+        if table not in migrated:
+            problems.append(f"{table}: only in bootstrapped schema")
+            continue
+        if table not in bootstrapped:
+            problems.append(f"{table}: only in migrated schema")
+            continue
+        for aspect, expected in migrated[table].items():
+            actual = bootstrapped[table][aspect]
+            if actual != expected:
+                problems.append(f"{table} {aspect}: bootstrapped {actual!r} != migrated {expected!r}")
+    return problems
+
+
+def check(bootstrap_url: str, migrated_url: str) -> list[str]:
+    """Bootstrap one empty database, migrate another, and list schema differences."""
+    fresh = create_engine(bootstrap_url)
+    replayed = create_engine(migrated_url)
+    try:
+        with fresh.begin() as conn:
+            bootstrap(conn)
+        with replayed.begin() as conn:
+            migrate(conn)
+        with fresh.connect() as a, replayed.connect() as b:
+            return diff(schema_snapshot(a), schema_snapshot(b))
+    finally:
+        fresh.dispose()
+        replayed.dispose()
+
+
+def main(argv: list[str]) -> int:
+    if argv[:1] == ["--check"]:
+        if len(argv) != 3:
+            print("usage: python -m app.bootstrap --check BOOTSTRAP_URL MIGRATED_URL", file=sys.stderr)
+            return 2
+        problems = check(argv[1], argv[2])
+        for problem in problems:
+            print(problem)
+        print("schemas differ" if problems else "schemas match")
+        return 1 if problems else 0
+
+    engine = create_engine(argv[0]) if argv else db.get_engine()
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        head = bootstrap(conn)
+    print(f"created schema at {head} in {(time.perf_counter() - started) * 1000:.0f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
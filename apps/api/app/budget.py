@@ -0,0 +1,99 @@
+"""Server-side budget rollups over the costs of a trip's scheduled cards.
+
+Backlog cards are not owned by a trip; a card counts toward a trip's budget
+once it is placed on that trip's schedule.  Each card counts once in the
+totals, and once per day it appears on in ``by_day``.  Costs are stored in
+``BASE_CURRENCY`` and converted with the ``currency_rates`` table.
+
+Rollups are cached per ``(trip_id, Trip.revision, currency, rate)``, so
+repeated dashboard views do not rescan cards until the trip changes.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+from fastapi import HTTPException
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Session
+
+from app import models, schemas
+
+BASE_CURRENCY = os.getenv("BUDGET_BASE_CURRENCY", "USD").upper()
+CACHE_SIZE = 512
+
+_cache: OrderedDict[tuple, schemas.TripBudgetRead] = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _rate(db: Session, currency: str) -> float:
+    if currency == BASE_CURRENCY:
+        return 1.0
+    rate = db.get(models.CurrencyRate, currency)
+    if rate is None:
+        raise HTTPException(status_code=400, detail=f"No exchange rate for {currency}")
+    return float(rate.rate)
+
+
+def _rollup(db: Session, trip_id: int, revision: int, currency: str, rate: float) -> schemas.TripBudgetRead:
+    card = models.BacklogCard
+    event = models.ScheduledEvent
+    cost = func.coalesce(func.sum(card.cost), 0)
+
+    trip_cards = select(event.card_id).where(event.trip_id == trip_id).distinct().subquery()
+    status = case((card.locked_in, "locked_in"), (card.reserved, "reserved"), else_="planned")
+    by_category = db.execute(
+        select(card.category, cost, func.count())
+        .join(trip_cards, trip_cards.c.card_id == card.id)
+        .group_by(card.category)
+        .order_by(card.category)
+    ).all()
+    by_status = db.execute(
+        select(status, cost, func.count())
+        .join(trip_cards, trip_cards.c.card_id == card.id)
+        .group_by(status)
+        .order_by(status)
+    ).all()
+
+    day_cards = select(event.day_index, event.card_id).where(event.trip_id == trip_id).distinct().subquery()
+    by_day = db.execute(
+        select(day_cards.c.day_index, cost, func.count())
+        .select_from(day_cards)
+        .join(card, card.id == day_cards.c.card_id)
+        .group_by(day_cards.c.day_index)
+        .order_by(day_cards.c.day_index)
+    ).all()
+
+    people = db.query(models.TripUser).filter(models.TripUser.trip_id == trip_id).count()
+
+    def money(value) -> float:
+        return round(float(value) * rate, 2)
+
+    return schemas.TripBudgetRead(
+        trip_id=trip_id,
+        revision=revision,
+        currency=currency,
+        total=round(sum(float(total) for _, total, _ in by_category) * rate, 2),
+        people=people,
+        by_category=[schemas.BudgetBucket(key=k, total=money(t), count=n) for k, t, n in by_category],
+        by_status=[schemas.BudgetBucket(key=k, total=money(t), count=n) for k, t, n in by_status],
+        by_day=[schemas.BudgetDay(day_index=d, total=money(t), count=n) for d, t, n in by_day],
+    )
+
+
+def trip_budget(db: Session, trip: models.Trip, currency: str | None = None, split: bool = False) -> schemas.TripBudgetRead:
+    currency = (currency or BASE_CURRENCY).upper()
+    rate = _rate(db, currency)
+    key = (trip.id, trip.revision, currency, rate)
+    with _cache_lock:
+        budget = _cache.get(key)
+        if budget is not None:
+            _cache.move_to_end(key)
+    if budget is None:
+        budget = _rollup(db, trip.id, trip.revision, currency, rate)
+        with _cache_lock:
+            _cache[key] = budget
+            while len(_cache) > CACHE_SIZE:
+                _cache.popitem(last=False)
+    if split and budget.people:
+        return budget.model_copy(update={"per_person": round(budget.total / budget.people, 2)})
+    return budget
@@ -0,0 +1,134 @@
+"""Copy a trip with its legs, travel segments, sections and schedule.
+
+Every child table is copied with one ``INSERT ... SELECT`` that reads the
+source rows and writes the clones inside the database, so the statement count
+is fixed however large the trip is.  New leg ids are not known in advance: the
+leg copy stores each source id, negated, in the clone's ``seq`` column, the
+segment copy joins on that tag to remap ``from_leg_id``/``to_leg_id``, and a
+final ``UPDATE`` stamps the real ``seq``.  Sections are matched through their
+unique ``(trip_id, kind)``.
+
+All of it runs in the caller's transaction; the caller commits.
+"""
+import secrets
+from datetime import date, datetime, timezone
+
+from sqlalchemy import and_, insert, literal, select, update
+from sqlalchemy.orm import Session
+
+from app import models
+from app.dates import shift_date
+
+# Copied rows are stamped with the new trip's (and its sections') first revision
+CLONE_REVISION = 1
+
+
+def clone_trip(
+    db: Session,
+    source: models.Trip,
+    user: models.User,
+    name: str | None = None,
+    start_date: str | None = None,
+    include_schedule: bool = True,
+    include_sections: bool = True,
+) -> int:
+    """Clone ``source`` for ``user`` and return the new trip's id.
+
+    With ``start_date`` every date moves by the distance between it and the
+    source trip's start; schedule slots are day offsets and need no shifting.
+    """
+    dialect = db.get_bind().dialect.name
+    days = 0
+    if start_date:
+        if not source.start_date:
+            raise ValueError("Source trip has no start date to shift from")
+        days = (date.fromisoformat(start_date) - date.fromisoformat(source.start_date)).days
+    now = datetime.now(timezone.utc)
+
+    def shifted(column):
+        return shift_date(dialect, column, days) if days else column
+
+    trip = models.Trip.__table__
+    new_trip_id = db.execute(
+        insert(trip)
+        .from_select(
+            ["name", "start_date", "end_date", "created_by", "created_at", "invite_code", "calendar_token", "revision"],
+            select(
+                literal(name or f"{source.name} (copy)"),
+                shifted(trip.c.start_date),
+                shifted(trip.c.end_date),
+                literal(user.id),
+                literal(now),
+                literal(secrets.token_urlsafe(12)),
+                literal(secrets.token_urlsafe(24)),
+                literal(CLONE_REVISION),
+            ).where(trip.c.id == source.id),
+        )
+        .returning(trip.c.id)
+    ).scalar_one()
+
+    db.execute(insert(models.TripUser.__table__).values(
+        trip_id=new_trip_id, user_id=user.id, created_at=now, seq=CLONE_REVISION, updated_at=now,
+    ))
+
+    leg = models.TripLeg.__table__
+    db.execute(insert(leg).from_select(
+        ["trip_id", "name", "start_date", "end_date", "order_index", "created_at", "seq", "updated_at"],
+        select(
+            literal(new_trip_id), leg.c.name, shifted(leg.c.start_date), shifted(leg.c.end_date),
+            leg.c.order_index, literal(now), -leg.c.id, literal(now),
+        ).where(leg.c.trip_id == source.id),
+    ))
+
+    seg = models.TravelSegment.__table__
+    from_leg = leg.alias("from_leg")
+    to_leg = leg.alias("to_leg")
+    db.execute(insert(seg).from_select(
+        [
+            "trip_id", "edge_type", "from_leg_id", "to_leg_id", "order_index", "transport_type",
+            "title", "badge", "start_date", "end_date", "created_at", "seq", "updated_at",
+        ],
+        select(
+            literal(new_trip_id), seg.c.edge_type, from_leg.c.id, to_leg.c.id, seg.c.order_index, seg.c.transport_type,
+            seg.c.title, seg.c.badge, shifted(seg.c.start_date), shifted(seg.c.end_date),
+            literal(now), literal(CLONE_REVISION), literal(now),
+        )
+        .select_from(seg)
+        .outerjoin(from_leg, and_(from_leg.c.trip_id == new_trip_id, from_leg.c.seq == -seg.c.from_leg_id))
+        .outerjoin(to_leg, and_(to_leg.c.trip_id == new_trip_id, to_leg.c.seq == -seg.c.to_leg_id))
+        .where(seg.c.trip_id == source.id),
+    ))
+    db.execute(update(leg).where(leg.c.trip_id == new_trip_id).values(seq=CLONE_REVISION))
+
+    section = models.TripSection.__table__
+    db.execute(insert(section).from_select(
+        ["trip_id", "kind", "revision", "created_at"],
+        select(literal(new_trip_id), section.c.kind, literal(CLONE_REVISION), literal(now)).where(section.c.trip_id == source.id),
+    ))
+    if include_sections:
+        item = models.SectionItem.__table__
+        old_section = section.alias("old_section")
+        new_section = section.alias("new_section")
+        db.execute(insert(item).from_select(
+            ["section_id", "client_id", "parent_client_id", "kind", "position", "data", "deleted", "revision", "updated_at"],
+            select(
+                new_section.c.id, item.c.client_id, item.c.parent_client_id, item.c.kind, item.c.position,
+                item.c.data, literal(False), literal(CLONE_REVISION), literal(now),
+            )
+            .select_from(item)
+            .join(old_section, old_section.c.id == item.c.section_id)
+            .join(new_section, and_(new_section.c.trip_id == new_trip_id, new_section.c.kind == old_section.c.kind))
+            .where(old_section.c.trip_id == source.id, item.c.deleted.is_(False)),
+        ))
+
+    if include_schedule:
+        event = models.ScheduledEvent.__table__
+        db.execute(insert(event).from_select(
+            ["trip_id", "card_id", "day_index", "hour", "created_by", "created_at", "seq", "updated_at"],
+            select(
+                literal(new_trip_id), event.c.card_id, event.c.day_index, event.c.hour,
+                literal(user.id), literal(now), literal(CLONE_REVISION), literal(now),
+            ).where(event.c.trip_id == source.id),
+        ))
+
+    return new_trip_id
@@ -0,0 +1,125 @@
+"""gzip / brotli response compression.
+
+Responses of a compressible type (JSON, text, calendars) are compressed when
+the client sends a matching ``Accept-Encoding`` and the body reaches
+``COMPRESS_MIN_BYTES``; brotli is preferred when the optional ``brotli``
+package is installed.  Streamed responses (the calendar export) are
+compressed chunk by chunk.  Responses that already carry a
+``Content-Encoding`` pass through untouched.
+"""
+import os
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4  # brotli's default of 11 is far too slow for per-request use
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "application/msgpack")
+
+
+def choose_encoding(accept_encoding: str) -> str | None:
+    accepted = set()
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(name.strip().lower())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+class _Compressor:
+    def __init__(self, encoding: str) -> None:
+        if encoding == "br":
+            self._obj = brotli.Compressor(quality=BROTLI_QUALITY)
+            self._compress = self._obj.process
+            self._flush = self._obj.flush
+            self._finish = self._obj.finish
+        else:
+            # wbits 16+ writes the gzip container
+            self._obj = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self._compress = self._obj.compress
+            self._flush = lambda: self._obj.flush(zlib.Z_SYNC_FLUSH)
+            self._finish = self._obj.flush
+
+    def chunk(self, data: bytes) -> bytes:
+        # Flush so each streamed part reaches the client without waiting for the next
+        return self._compress(data) + self._flush()
+
+    def last(self, data: bytes) -> bytes:
+        return self._compress(data) + self._finish()
+
+
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp, minimum_size: int = COMPRESS_MIN_BYTES) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Message | None = None
+        compressor: _Compressor | None = None
+        passthrough = False
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start, compressor, passthrough
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message.get("headers", []))
+                content_type = headers.get("content-type", "")
+                passthrough = "content-encoding" in headers or not content_type.startswith(COMPRESSIBLE_TYPES)
+                if passthrough:
+                    await send(message)
+                else:
+                    start = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start is not None:
+                response_start, start = start, None
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(response_start)
+                    await send(message)
+                    return
+                compressor = _Compressor(encoding)
+                headers = MutableHeaders(raw=list(response_start.get("headers", [])))
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                if more_body:
+                    del headers["Content-Length"]
+                    await send({**response_start, "headers": headers.raw})
+                    await send({"type": "http.response.body", "body": compressor.chunk(body), "more_body": True})
+                    return
+                compressed = compressor.last(body)
+                headers["Content-Length"] = str(len(compressed))
+                await send({**response_start, "headers": headers.raw})
+                await send({"type": "http.response.body", "body": compressed})
+                return
+            if more_body:
+                await send({"type": "http.response.body", "body": compressor.chunk(body), "more_body": True})
+            else:
+                await send({"type": "http.response.body", "body": compressor.last(body)})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,112 @@
+"""Date column types and range helpers.
+
+Trip, leg and segment dates are stored as real ``DATE`` columns and card
+reservations as ``timestamptz`` so range filters can run as index scans.  The
+API keeps exchanging the strings it always has: ``YYYY-MM-DD`` for dates and
+the JavaScript ``toISOString()`` form for reservation timestamps.
+"""
+from datetime import date, datetime, timezone
+from typing import Annotated, Any
+
+from pydantic import AfterValidator
+from sqlalchemy import Date, DateTime, Integer, and_, func, literal, literal_column, or_
+from sqlalchemy.types import TypeDecorator
+
+
+def parse_date(value: Any) -> date | None:
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(value)
+
+
+def parse_timestamp(value: Any) -> datetime | None:
+    if value is None or value == "":
+        return None
+    if not isinstance(value, datetime):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def format_timestamp(value: datetime) -> str:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    value = value.astimezone(timezone.utc)
+    return f"{value:%Y-%m-%dT%H:%M:%S}.{value.microsecond // 1000:03d}Z"
+
+
+class DateString(TypeDecorator):
+    """``DATE`` column exposed to Python as a ``YYYY-MM-DD`` string."""
+
+    impl = Date
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return parse_date(value)
+
+    def process_result_value(self, value, dialect):
+        return value.isoformat() if value is not None else None
+
+
+class TimestampString(TypeDecorator):
+    """``timestamptz`` column exposed to Python as an ISO-8601 UTC string."""
+
+    impl = DateTime(timezone=True)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return parse_timestamp(value)
+
+    def process_result_value(self, value, dialect):
+        return format_timestamp(value) if value is not None else None
+
+
+def _check_date(value: str | None) -> str | None:
+    parsed = parse_date(value)
+    return parsed.isoformat() if parsed else None
+
+
+def _check_timestamp(value: str | None) -> str | None:
+    parsed = parse_timestamp(value)
+    return format_timestamp(parsed) if parsed else None
+
+
+# Schema field types: validate on the way in so bad input is a 422, not a DB error
+DateStr = Annotated[str | None, AfterValidator(_check_date)]
+TimestampStr = Annotated[str | None, AfterValidator(_check_timestamp)]
+
+
+# Expression indexed on Postgres; LEAST/GREATEST keep reversed or half-open
+# ranges valid (a missing bound collapses the range to the other day).
+DATERANGE_SQL = "daterange(LEAST(start_date, end_date), GREATEST(start_date, end_date), '[]')"
+
+
+def overlaps(dialect_name: str, start_col, end_col, start: date, end: date):
+    """Filter for rows whose inclusive ``[start_col, end_col]`` span meets ``[start, end]``.
+
+    On Postgres this is the ``daterange && daterange`` form matched by the GiST
+    expression indexes (see ``DATERANGE_SQL``); elsewhere plain comparisons.
+    """
+    if dialect_name == "postgresql":
+        bounds = literal_column("'[]'")
+        span = func.daterange(func.least(start_col, end_col), func.greatest(start_col, end_col), bounds)
+        # daterange(NULL, NULL) is unbounded, so undated rows must be excluded explicitly
+        return and_(
+            or_(start_col.is_not(None), end_col.is_not(None)),
+            span.op("&&")(func.daterange(start, end, bounds)),
+        )
+    lo = func.coalesce(start_col, end_col)
+    hi = func.coalesce(end_col, start_col)
+    return and_(lo.is_not(None), lo <= end, hi >= start)
+
+
+def shift_date(dialect_name: str, column, days: int):
+    """SQL expression for ``column`` moved by ``days`` days."""
+    if dialect_name == "postgresql":
+        return column + literal(days, Integer)
+    return func.date(column, f"{days:+d} days")
@@ -0,0 +1,58 @@
+"""Sparse fieldsets: ``?fields=id,title,location`` on list routes.
+
+``fieldset(schema)`` is a dependency that parses the parameter against the
+route's read schema (unknown names are a 400; ``id`` is always included) and
+yields ``None`` when it is absent.  ``load_options`` turns the selection into
+loader options, so the query reads only the selected columns
+(``load_only``) and eager-loads only the selected relationships; the
+serializers' ``only=`` argument trims the output to match.
+"""
+from typing import Any, Callable
+
+from fastapi import HTTPException, Query
+from pydantic import BaseModel
+from sqlalchemy import inspect
+from sqlalchemy.orm import joinedload, load_only, selectinload
+
+ALWAYS = ("id",)
+
+
+def fieldset(schema: type[BaseModel]) -> Callable[..., tuple[str, ...] | None]:
+    allowed = set(schema.model_fields)
+
+    def parse(fields: str | None = Query(None, description="Comma-separated fields to return")) -> tuple[str, ...] | None:
+        if fields is None:
+            return None
+        names = [name.strip() for name in fields.split(",") if name.strip()]
+        unknown = sorted(set(names) - allowed)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+        # Keep the schema's field order so responses are stable whatever order was asked for
+        return tuple(name for name in schema.model_fields if name in names or name in ALWAYS)
+
+    return parse
+
+
+def load_options(entity: type, schema: type[BaseModel], only: tuple[str, ...] | None, always: tuple[str, ...] = ()) -> list[Any]:
+    """Loader options for reading ``schema`` (restricted to ``only``) from ``entity`` rows.
+
+    Collections are loaded with ``selectinload`` and many-to-one references with
+    ``joinedload``.  ``always`` names columns the query itself needs (ordering,
+    side-loading) even when they are not returned.
+    """
+    mapper = inspect(entity)
+    names = set(schema.model_fields if only is None else only)
+    options: list[Any] = []
+    for rel in mapper.relationships:
+        if rel.key in names:
+            attr = getattr(entity, rel.key)
+            options.append(selectinload(attr) if rel.uselist else joinedload(attr))
+    if only is not None:
+        columns = {col.key for col in mapper.column_attrs if col.key in names or col.key in always}
+        columns.update(mapper.get_property_by_column(col).key for col in mapper.primary_key)
+        # Foreign keys behind selected many-to-one references
+        for rel in mapper.relationships:
+            if rel.key in names and not rel.uselist:
+                columns.update(mapper.get_property_by_column(col).key for col in rel.local_columns)
+        options.append(load_only(*(getattr(entity, key) for key in sorted(columns))))
+    return options
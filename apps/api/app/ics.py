@@ -0,0 +1,201 @@
+"""iCalendar (RFC 5545) export of a trip.
+
+Legs and travel segments become all-day events.  Scheduled cards become
+one-hour events at ``trip.start_date + day_index`` and ``hour``, in floating
+local time, so they show at the planned hour wherever the calendar is opened.
+
+The file is rendered as a stream: rows come from server-side cursors
+(``yield_per``) and are written out a chunk at a time, so a long trip is never
+materialised in memory.  Rendered bodies up to ``MAX_CACHED_BYTES`` are kept
+per ``(trip_id, Trip.revision)``; a subscription poll either gets a 304 for
+its ``If-None-Match`` or the cached bytes, and only a changed trip is read
+from the database again.
+"""
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timedelta, timezone
+from typing import Iterator
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app import models
+from app.db import SessionLocal
+
+PRODID = "-//TRVL//Trip calendar//EN"
+UID_DOMAIN = "trvl"
+CHUNK_LINES = 200
+YIELD_PER = 500
+CACHE_SIZE = 128
+MAX_CACHED_BYTES = 1 << 20
+
+_cache: OrderedDict[tuple[int, int], bytes] = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def etag(trip: models.Trip) -> str:
+    return f'W/"trip-{trip.id}-r{trip.revision}"'
+
+
+def cached(trip_id: int, revision: int) -> bytes | None:
+    with _cache_lock:
+        body = _cache.get((trip_id, revision))
+        if body is not None:
+            _cache.move_to_end((trip_id, revision))
+        return body
+
+
+def _store(trip_id: int, revision: int, body: bytes) -> None:
+    with _cache_lock:
+        _cache[(trip_id, revision)] = body
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\r\n", "\\n").replace("\n", "\\n")
+
+
+def fold(line: str) -> bytes:
+    """Encode a content line, folding it at 75 octets without splitting UTF-8 sequences."""
+    raw = line.encode()
+    if len(raw) <= 75:
+        return raw + b"\r\n"
+    parts = []
+    start, limit = 0, 75
+    while start < len(raw):
+        end = min(start + limit, len(raw))
+        while end < len(raw) and (raw[end] & 0xC0) == 0x80:
+            end -= 1
+        parts.append(raw[start:end])
+        start, limit = end, 74  # continuation lines start with a space
+    return b"\r\n ".join(parts) + b"\r\n"
+
+
+def _date(value: date) -> str:
+    return value.strftime("%Y%m%d")
+
+
+def _stamp(value: datetime | None) -> str:
+    value = value or datetime.now(timezone.utc)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def _all_day(uid: str, summary: str, start: str | None, end: str | None, updated_at: datetime | None, categories: str) -> list[str]:
+    first = date.fromisoformat(start or end)
+    last = date.fromisoformat(end or start)
+    first, last = min(first, last), max(first, last)
+    return [
+        "BEGIN:VEVENT",
+        f"UID:{uid}@{UID_DOMAIN}",
+        f"DTSTAMP:{_stamp(updated_at)}",
+        f"DTSTART;VALUE=DATE:{_date(first)}",
+        f"DTEND;VALUE=DATE:{_date(last + timedelta(days=1))}",  # DTEND is exclusive
+        f"SUMMARY:{escape(summary)}",
+        f"CATEGORIES:{categories}",
+        "TRANSP:TRANSPARENT",
+        "END:VEVENT",
+    ]
+
+
+def _lines(db: Session, trip_id: int, name: str, start_date: str | None) -> Iterator[str]:
+    yield from ("BEGIN:VCALENDAR", "VERSION:2.0", f"PRODID:{PRODID}", "CALSCALE:GREGORIAN", "METHOD:PUBLISH")
+    yield f"X-WR-CALNAME:{escape(name)}"
+
+    leg = models.TripLeg
+    legs = db.execute(
+        select(leg.id, leg.name, leg.start_date, leg.end_date, leg.updated_at)
+        .where(leg.trip_id == trip_id)
+        .order_by(leg.order_index, leg.id)
+        .execution_options(yield_per=YIELD_PER)
+    )
+    for row in legs:
+        if row.start_date or row.end_date:
+            yield from _all_day(f"leg-{row.id}", row.name, row.start_date, row.end_date, row.updated_at, "LEG")
+
+    seg = models.TravelSegment
+    segments = db.execute(
+        select(seg.id, seg.title, seg.transport_type, seg.start_date, seg.end_date, seg.updated_at)
+        .where(seg.trip_id == trip_id)
+        .order_by(seg.order_index, seg.id)
+        .execution_options(yield_per=YIELD_PER)
+    )
+    for row in segments:
+        if row.start_date or row.end_date:
+            summary = row.title or row.transport_type.capitalize()
+            yield from _all_day(f"segment-{row.id}", summary, row.start_date, row.end_date, row.updated_at, "TRAVEL")
+
+    if not start_date:
+        yield "END:VCALENDAR"
+        return
+    start = datetime.combine(date.fromisoformat(start_date), datetime.min.time())
+    event, card = models.ScheduledEvent, models.BacklogCard
+    events = db.execute(
+        select(
+            event.id, event.day_index, event.hour, event.updated_at,
+            card.title, card.category, card.location, card.description, card.latitude, card.longitude,
+        )
+        .join(card, card.id == event.card_id)
+        .where(event.trip_id == trip_id)
+        .order_by(event.day_index, event.hour, event.id)
+        .execution_options(yield_per=YIELD_PER)
+    )
+    for row in events:
+        begins = start + timedelta(days=row.day_index, hours=row.hour)
+        yield "BEGIN:VEVENT"
+        yield f"UID:event-{row.id}@{UID_DOMAIN}"
+        yield f"DTSTAMP:{_stamp(row.updated_at)}"
+        yield f"DTSTART:{begins:%Y%m%dT%H%M%S}"
+        yield f"DTEND:{begins + timedelta(hours=1):%Y%m%dT%H%M%S}"
+        yield f"SUMMARY:{escape(row.title)}"
+        yield f"CATEGORIES:{row.category.upper()}"
+        if row.location:
+            yield f"LOCATION:{escape(row.location)}"
+        if row.description:
+            yield f"DESCRIPTION:{escape(row.description)}"
+        if row.latitude is not None and row.longitude is not None:
+            yield f"GEO:{row.latitude:.6f};{row.longitude:.6f}"
+        yield "END:VEVENT"
+    yield "END:VCALENDAR"
+
+
+def render(trip: models.Trip) -> Iterator[bytes]:
+    """Stream the trip's calendar in chunks, caching the whole body when it is small enough.
+
+    Reads through its own session: the stream outlives the request's one.
+    """
+    return _render(trip.id, trip.revision, trip.name, trip.start_date)
+
+
+def _render(trip_id: int, revision: int, name: str, start_date: str | None) -> Iterator[bytes]:
+    db = SessionLocal()
+    try:
+        # A write may land between the ETag check and this read; only cache a matching snapshot
+        current = db.scalar(select(models.Trip.revision).where(models.Trip.id == trip_id))
+        yield from _chunks(_lines(db, trip_id, name, start_date), trip_id, revision if current == revision else None)
+    finally:
+        db.close()
+
+
+def _chunks(lines: Iterator[str], trip_id: int, revision: int | None) -> Iterator[bytes]:
+    chunks: list[bytes] | None = [] if revision is not None else None
+    size = 0
+    buffer: list[bytes] = []
+    for line in lines:
+        buffer.append(fold(line))
+        if len(buffer) >= CHUNK_LINES:
+            chunk = b"".join(buffer)
+            buffer.clear()
+            if chunks is not None:
+                size += len(chunk)
+                if size <= MAX_CACHED_BYTES:
+                    chunks.append(chunk)
+                else:
+                    chunks = None
+            yield chunk
+    chunk = b"".join(buffer)
+    if chunks is not None and size + len(chunk) <= MAX_CACHED_BYTES:
+        _store(trip_id, revision, b"".join(chunks) + chunk)
+    yield chunk
@@ -0,0 +1,185 @@
+"""``Idempotency-Key`` support for mutating requests.
+
+Clients on flaky connections retry POSTs.  When a request carries an
+``Idempotency-Key`` header, the first response (status, headers and body) is
+kept for ``ttl`` seconds and later requests with the same key are answered from
+the store without reaching the routers or the database.  A retry that arrives
+while the original is still running waits for it and then replays its result.
+
+Keys are scoped to the caller's ``Authorization`` header, method and path.
+Reusing a key with a different body is rejected with 422.  5xx responses are
+not stored, so a failed request can be retried with the same key.
+"""
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+HEADER = b"idempotency-key"
+REPLAY_HEADER = (b"idempotent-replayed", b"true")
+MAX_KEY_LENGTH = 255
+
+
+@dataclass
+class StoredResponse:
+    status: int
+    headers: list[tuple[bytes, bytes]]
+    body: bytes
+
+
+@dataclass
+class _Entry:
+    fingerprint: str
+    expires_at: float
+    done: asyncio.Event = field(default_factory=asyncio.Event)
+    response: StoredResponse | None = None
+
+
+class MemoryIdempotencyStore:
+    """Bounded LRU of idempotency entries with per-entry expiry.
+
+    Capacity eviction skips entries whose request is still running, so the
+    store can briefly hold more than ``max_entries``.
+
+    Swap in another object with the same ``begin``/``complete``/``abandon``
+    methods to share keys between workers.
+    """
+
+    def __init__(self, max_entries: int = 10_000, ttl: float = 24 * 3600) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+
+    def _purge(self, now: float) -> None:
+        # Bounded so a store full of in-flight entries cannot spin
+        for _ in range(len(self._entries)):
+            key, entry = next(iter(self._entries.items()))
+            if entry.expires_at <= now:
+                del self._entries[key]
+                continue
+            if len(self._entries) <= self.max_entries:
+                break
+            if entry.done.is_set():
+                del self._entries[key]
+            else:
+                # Still running: evicting it would let a retry start a second execution
+                self._entries.move_to_end(key)
+
+    def begin(self, key: str, fingerprint: str) -> tuple[_Entry, bool]:
+        """Return the entry for ``key`` and whether the caller now owns it."""
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at > now:
+            self._entries.move_to_end(key)
+            return entry, False
+        entry = _Entry(fingerprint=fingerprint, expires_at=now + self.ttl)
+        self._entries[key] = entry
+        self._purge(now)
+        return entry, True
+
+    def complete(self, key: str, entry: _Entry, response: StoredResponse) -> None:
+        entry.response = response
+        entry.done.set()
+
+    def abandon(self, key: str, entry: _Entry) -> None:
+        if self._entries.get(key) is entry:
+            del self._entries[key]
+        entry.done.set()
+
+
+class IdempotencyMiddleware:
+    def __init__(self, app: ASGIApp, store: MemoryIdempotencyStore | None = None, methods: tuple[str, ...] = ("POST",), wait_timeout: float = 30.0) -> None:
+        self.app = app
+        self.store = store or MemoryIdempotencyStore()
+        self.methods = methods
+        self.wait_timeout = wait_timeout
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] not in self.methods:
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        raw_key = headers.get(HEADER)
+        if raw_key is None:
+            await self.app(scope, receive, send)
+            return
+        if not raw_key or len(raw_key) > MAX_KEY_LENGTH:
+            await JSONResponse({"detail": "Invalid Idempotency-Key"}, status_code=400)(scope, receive, send)
+            return
+
+        body = await _read_body(receive)
+        auth = headers.get(b"authorization", b"")
+        key = hashlib.sha256(b"\0".join([auth, scope["method"].encode(), scope["path"].encode(), raw_key])).hexdigest()
+        fingerprint = hashlib.sha256(scope.get("query_string", b"") + b"\0" + body).hexdigest()
+
+        while True:
+            entry, owner = self.store.begin(key, fingerprint)
+            if owner:
+                await self._run(key, entry, body, scope, send)
+                return
+            if entry.fingerprint != fingerprint:
+                response = JSONResponse({"detail": "Idempotency-Key reused with a different request"}, status_code=422)
+                await response(scope, receive, send)
+                return
+            try:
+                await asyncio.wait_for(entry.done.wait(), timeout=self.wait_timeout)
+            except asyncio.TimeoutError:
+                response = JSONResponse({"detail": "A request with this Idempotency-Key is still in progress"}, status_code=409)
+                await response(scope, receive, send)
+                return
+            stored = entry.response
+            if stored is not None:
+                await send({"type": "http.response.start", "status": stored.status, "headers": stored.headers + [REPLAY_HEADER]})
+                await send({"type": "http.response.body", "body": stored.body})
+                return
+            # The original request failed and released the key; take it over
+
+    async def _run(self, key: str, entry: _Entry, body: bytes, scope: Scope, send: Send) -> None:
+        status = 500
+        response_headers: list[tuple[bytes, bytes]] = []
+        chunks: list[bytes] = []
+
+        async def capture(message: Message) -> None:
+            nonlocal status, response_headers
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                response_headers = list(message.get("headers", []))
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, _replay_body(body), capture)
+        except BaseException:
+            self.store.abandon(key, entry)
+            raise
+        if status >= 500:
+            self.store.abandon(key, entry)
+        else:
+            self.store.complete(key, entry, StoredResponse(status, response_headers, b"".join(chunks)))
+
+
+async def _read_body(receive: Receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+def _replay_body(body: bytes) -> Receive:
+    sent = False
+
+    async def receive() -> Message:
+        nonlocal sent
+        if sent:
+            return {"type": "http.disconnect"}
+        sent = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    return receive
@@ -0,0 +1,229 @@
+"""Durable background jobs stored in the ``jobs`` table.
+
+Request handlers call ``enqueue(db, kind, payload)`` inside their own
+transaction and return; the job becomes visible to workers when that
+transaction commits, and is dropped with it on rollback.  Handlers for a
+kind are registered with ``@handler("kind")`` and receive a fresh session and
+the payload; what they return (a dict) is stored as the job's ``result``.
+
+Workers claim one due job at a time with ``SELECT ... FOR UPDATE SKIP
+LOCKED`` (Postgres), so any number of them can poll the table without
+blocking each other or running a job twice; the claim is a guarded
+``UPDATE`` as well, which keeps SQLite correct.  A failed job is retried
+after ``JOB_BACKOFF_SECONDS * 2**(attempt - 1)`` (capped, with jitter) until
+``max_attempts``, then marked ``failed``.  A job left ``running`` by a
+worker that died is picked up again once its lease of ``JOB_LEASE_SECONDS``
+has passed, so handlers should be idempotent.
+
+Workers run inside the API process (``JOB_WORKERS=N`` threads, started in the
+app lifespan) or on their own: ``python -m app.jobs``; set ``JOBS_ENABLED=1``
+for the API in that case, since callers skip optional jobs when no worker is
+known to run.  Workers also delete finished jobs older than
+``JOB_RETENTION_SECONDS``.
+"""
+import logging
+import os
+import random
+import signal
+import socket
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable
+
+from sqlalchemy import and_, delete, or_, select, update
+from sqlalchemy.orm import Session
+
+from app import models
+from app.db import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "0"))  # in-process worker threads
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "1"))
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "300"))
+JOB_BACKOFF_SECONDS = float(os.getenv("JOB_BACKOFF_SECONDS", "5"))
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", str(7 * 24 * 3600)))
+JOB_PURGE_INTERVAL_SECONDS = float(os.getenv("JOB_PURGE_INTERVAL_SECONDS", "3600"))
+# Whether any worker drains the table; without one, jobs would only pile up
+JOBS_ENABLED = JOB_WORKERS > 0 or os.getenv("JOBS_ENABLED") == "1"
+MAX_BACKOFF_SECONDS = 3600
+MAX_ERROR_LENGTH = 2000
+
+Handler = Callable[[Session, dict], dict | None]
+_handlers: dict[str, Handler] = {}
+
+
+def handler(kind: str) -> Callable[[Handler], Handler]:
+    def register(fn: Handler) -> Handler:
+        _handlers[kind] = fn
+        return fn
+    return register
+
+
+def enqueue(
+    db: Session,
+    kind: str,
+    payload: dict | None = None,
+    user: models.User | None = None,
+    delay: float = 0,
+    max_attempts: int = 5,
+) -> models.Job:
+    """Add a job to the caller's transaction; it runs once the caller commits."""
+    if kind not in _handlers:
+        raise ValueError(f"Unknown job kind: {kind}")
+    now = datetime.now(timezone.utc)
+    job = models.Job(
+        kind=kind,
+        payload=payload or {},
+        status="queued",
+        attempts=0,
+        max_attempts=max_attempts,
+        run_at=now + timedelta(seconds=delay),
+        created_by=user.id if user else None,
+        created_at=now,
+        updated_at=now,
+    )
+    db.add(job)
+    return job
+
+
+def backoff(attempts: int) -> float:
+    delay = min(JOB_BACKOFF_SECONDS * 2 ** (attempts - 1), MAX_BACKOFF_SECONDS)
+    return delay * random.uniform(0.9, 1.1)
+
+
+class Worker:
+    def __init__(self, worker_id: str | None = None, session_factory: Callable[[], Session] = SessionLocal) -> None:
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+        self.session_factory = session_factory
+
+    def claim(self) -> int | None:
+        """Mark the next due job as running and return its id."""
+        Job = models.Job
+        now = datetime.now(timezone.utc)
+        with self.session_factory() as db:
+            row = db.execute(
+                select(Job.id, Job.status, Job.attempts)
+                .where(or_(
+                    and_(Job.status == "queued", Job.run_at <= now),
+                    and_(Job.status == "running", Job.locked_at < now - timedelta(seconds=JOB_LEASE_SECONDS)),
+                ))
+                .order_by(Job.run_at, Job.id)
+                .limit(1)
+                .with_for_update(skip_locked=True)
+            ).first()
+            if row is None:
+                return None
+            claimed = db.execute(
+                update(Job)
+                .where(Job.id == row.id, Job.status == row.status, Job.attempts == row.attempts)
+                .values(status="running", locked_by=self.worker_id, locked_at=now, attempts=Job.attempts + 1, updated_at=now)
+            ).rowcount
+            db.commit()
+            return row.id if claimed else None
+
+    def _finish(self, job_id: int, **values: Any) -> None:
+        with self.session_factory() as db:
+            db.execute(
+                update(models.Job)
+                .where(models.Job.id == job_id, models.Job.locked_by == self.worker_id)
+                .values(locked_by=None, locked_at=None, updated_at=datetime.now(timezone.utc), **values)
+            )
+            db.commit()
+
+    def run_one(self) -> bool:
+        """Run the next due job, if any; returns whether one was claimed."""
+        job_id = self.claim()
+        if job_id is None:
+            return False
+        with self.session_factory() as db:
+            job = db.get(models.Job, job_id)
+            kind, payload, attempts, max_attempts = job.kind, job.payload, job.attempts, job.max_attempts
+            fn = _handlers.get(kind)
+            try:
+                if fn is None:
+                    raise LookupError(f"No handler for job kind {kind!r}")
+                result = fn(db, payload)
+                db.commit()
+            except Exception as exc:
+                db.rollback()
+                error = f"{type(exc).__name__}: {exc}"[:MAX_ERROR_LENGTH]
+                if attempts < max_attempts and fn is not None:
+                    logger.warning("Job %s (%s) failed, attempt %s/%s", job_id, kind, attempts, max_attempts, exc_info=True)
+                    retry_at = datetime.now(timezone.utc) + timedelta(seconds=backoff(attempts))
+                    self._finish(job_id, status="queued", run_at=retry_at, last_error=error)
+                else:
+                    logger.error("Job %s (%s) failed permanently", job_id, kind, exc_info=True)
+                    self._finish(job_id, status="failed", last_error=error)
+                return True
+        self._finish(job_id, status="succeeded", result=result, last_error=None)
+        return True
+
+    def run_pending(self, limit: int | None = None) -> int:
+        """Run due jobs until none is left (or ``limit`` ran); returns how many ran."""
+        count = 0
+        while (limit is None or count < limit) and self.run_one():
+            count += 1
+        return count
+
+    def purge(self) -> int:
+        """Delete succeeded and failed jobs last updated before the retention period."""
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=JOB_RETENTION_SECONDS)
+        with self.session_factory() as db:
+            deleted = db.execute(
+                delete(models.Job).where(models.Job.status.in_(("succeeded", "failed")), models.Job.updated_at < cutoff)
+            ).rowcount
+            db.commit()
+        return deleted
+
+    def run_forever(self, stop: threading.Event, poll_interval: float = JOB_POLL_SECONDS) -> None:
+        next_purge = time.monotonic()
+        while not stop.is_set():
+            if time.monotonic() >= next_purge:
+                next_purge = time.monotonic() + JOB_PURGE_INTERVAL_SECONDS
+                try:
+                    self.purge()
+                except Exception:
+                    logger.exception("Job worker %s failed to purge finished jobs", self.worker_id)
+            try:
+                ran = self.run_one()
+            except Exception:
+                logger.exception("Job worker %s failed to poll", self.worker_id)
+                ran = False
+            if not ran:
+                stop.wait(poll_interval)
+
+
+def start_workers(count: int = JOB_WORKERS) -> tuple[threading.Event, list[threading.Thread]]:
+    """Start ``count`` worker threads in this process; set the event to stop them."""
+    stop = threading.Event()
+    threads = []
+    for n in range(count):
+        thread = threading.Thread(target=lambda: Worker().run_forever(stop), name=f"job-worker-{n}", daemon=True)
+        thread.start()
+        threads.append(thread)
+    return stop, threads
+
+
+@handler("sessions.cleanup")
+def cleanup_sessions(db: Session, payload: dict) -> dict:
+    """Delete expired sessions, of one user when the payload names one."""
+    query = delete(models.Session).where(models.Session.expires_at < datetime.now(timezone.utc))
+    if payload.get("user_id") is not None:
+        query = query.where(models.Session.user_id == payload["user_id"])
+    return {"deleted": db.execute(query).rowcount}
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    worker = Worker()
+    logger.info("Job worker %s started", worker.worker_id)
+    worker.run_forever(stop)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""JSON-lines access and application logging off the request path.
+
+Request threads and the event loop only put log records on a bounded queue;
+a background thread formats them as JSON and writes them in batches (every
+record waiting in the queue goes out in one ``write``), to ``LOG_FILE`` with
+size-based rotation or to stdout when ``LOG_FILE`` is unset.  When the queue
+is full records are dropped and counted rather than blocking a request.
+
+``AccessLogMiddleware`` emits one ``trvl.access`` record per request with the
+route template, user and trip id, DB query count and time, and total latency.
+Successful ``GET``s can be sampled with ``ACCESS_LOG_SAMPLE_RATE``; errors and
+writes are always logged.  Run uvicorn with ``--no-access-log`` to drop its
+plain-text duplicate.
+"""
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler
+
+import orjson
+from sqlalchemy import Engine, event
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+STRUCTURED_LOGS = os.getenv("STRUCTURED_LOGS", "1") == "1"
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FILE = os.getenv("LOG_FILE", "")
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_BATCH_SIZE = 512
+# Fraction of 2xx GETs written to the access log
+ACCESS_LOG_SAMPLE_RATE = float(os.getenv("ACCESS_LOG_SAMPLE_RATE", "1"))
+
+access_logger = logging.getLogger("trvl.access")
+
+_STOP = object()
+
+
+@dataclass
+class RequestLog:
+    user_id: int | None = None
+    db_queries: int = 0
+    db_ms: float = 0.0
+
+
+# Shared by reference with the worker threads a request runs on
+_request: ContextVar[RequestLog | None] = ContextVar("request_log", default=None)
+
+
+def note_user(user):
+    """Record the authenticated user on the current request's access log line; returns ``user``."""
+    entry = _request.get()
+    if entry is not None and user is not None:
+        entry.user_id = user.id
+    return user
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if _request.get() is not None:
+        conn.info.setdefault("log_query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    entry = _request.get()
+    starts = conn.info.get("log_query_start")
+    if entry is None or not starts:
+        return
+    entry.db_ms += (time.perf_counter() - starts.pop()) * 1000
+    entry.db_queries += 1
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        data.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        return orjson.dumps(data, default=str).decode()
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Enqueues records unformatted; drops them when the queue is full."""
+
+    def __init__(self, q: queue.Queue) -> None:
+        super().__init__(q)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Freeze %-args now so later mutation of the objects cannot change the line
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class BatchWriter(threading.Thread):
+    """Drains the queue and writes whatever has accumulated in one go, rotating by size."""
+
+    def __init__(self, q: queue.Queue, path: str = "", max_bytes: int = LOG_MAX_BYTES, backup_count: int = LOG_BACKUP_COUNT) -> None:
+        super().__init__(name="log-writer", daemon=True)
+        self.queue = q
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.formatter = JsonFormatter()
+        self._stream = None
+        self._size = 0
+
+    def _open(self) -> None:
+        self._stream = open(self.path, "ab")
+        self._size = self._stream.tell()
+
+    def _rotate(self) -> None:
+        self._stream.close()
+        for n in range(self.backup_count - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{n}"):
+                os.replace(f"{self.path}.{n}", f"{self.path}.{n + 1}")
+        if self.backup_count > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._open()
+
+    def _write(self, data: bytes) -> None:
+        if not self.path:
+            sys.stdout.buffer.write(data)
+            sys.stdout.flush()
+            return
+        if self._stream is None:
+            self._open()
+        self._stream.write(data)
+        self._stream.flush()
+        self._size += len(data)
+        if self.max_bytes and self._size >= self.max_bytes:
+            self._rotate()
+
+    def run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch = [self.queue.get()]
+            while len(batch) < LOG_BATCH_SIZE:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            lines = []
+            for record in batch:
+                if record is _STOP:
+                    stopping = True
+                    continue
+                try:
+                    lines.append(self.formatter.format(record))
+                except Exception:
+                    continue
+            if lines:
+                try:
+                    self._write(("\n".join(lines) + "\n").encode())
+                except OSError:
+                    pass
+        if self._stream is not None:
+            self._stream.close()
+
+
+_handler: NonBlockingQueueHandler | None = None
+_writer: BatchWriter | None = None
+_previous_handlers: list[logging.Handler] = []
+
+
+def start(path: str = LOG_FILE) -> None:
+    """Route the root logger through the queue and start the writer thread."""
+    global _handler, _writer, _previous_handlers
+    if _writer is not None:
+        return
+    q: queue.Queue = queue.Queue(LOG_QUEUE_SIZE)
+    _writer = BatchWriter(q, path)
+    _writer.start()
+    _handler = NonBlockingQueueHandler(q)
+    root = logging.getLogger()
+    _previous_handlers = root.handlers[:]
+    root.handlers = [_handler]
+    root.setLevel(LOG_LEVEL)
+
+
+def stop(timeout: float = 5.0) -> None:
+    """Flush queued records and restore the previous handlers."""
+    global _handler, _writer
+    if _writer is None:
+        return
+    logging.getLogger().handlers = _previous_handlers
+    _writer.queue.put(_STOP)
+    _writer.join(timeout)
+    _handler = _writer = None
+
+
+def dropped() -> int:
+    return _handler.dropped if _handler is not None else 0
+
+
+class AccessLogMiddleware:
+    def __init__(self, app: ASGIApp, sample_rate: float = ACCESS_LOG_SAMPLE_RATE) -> None:
+        self.app = app
+        self.sample_rate = sample_rate
+
+    def _log(self, scope: Scope, entry: RequestLog, status: int, duration_ms: float) -> None:
+        method = scope["method"]
+        if method == "GET" and 200 <= status < 300 and self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return
+        route = scope.get("route")
+        trip_id = scope.get("path_params", {}).get("trip_id")
+        fields = {
+            "method": method,
+            "path": scope["path"],
+            "route": getattr(route, "path", None),
+            "status": status,
+            "user_id": entry.user_id,
+            "trip_id": int(trip_id) if isinstance(trip_id, str) and trip_id.isdigit() else trip_id,
+            "db_queries": entry.db_queries,
+            "db_ms": round(entry.db_ms, 2),
+            "duration_ms": round(duration_ms, 2),
+        }
+        if method == "GET" and 200 <= status < 300 and self.sample_rate < 1:
+            fields["sample_rate"] = self.sample_rate
+        access_logger.info("request", extra={"fields": fields})
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        entry = RequestLog()
+        token = _request.set(entry)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_logged(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_logged)
+        finally:
+            _request.reset(token)
+            self._log(scope, entry, status, (time.perf_counter() - started) * 1000)
@@ -1,33 +1,161 @@
+import asyncio
+import json
+import logging
+import os
+from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import backlog, auth, trips
-
-app = FastAPI(title="TRVL API")
-
-# CORS for local Vite dev server
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=[
-        "http://localhost:5173",
-        "http://127.0.0.1:5173",
-        "https://accounts.google.com",
-        "https://your-app.vercel.app",   # update after you deploy frontend
-    ],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-@app.get("/health")
-def health():
-    return {"status": "ok"}
-
-# Example protected (service role) usage placeholder:
-@app.get("/api/example")
-def example():
-    return {"message": "Hello from FastAPI on Render!"}
-
-app.include_router(backlog.router)
-app.include_router(auth.router)
-app.include_router(trips.router)
+from fastapi.responses import PlainTextResponse
+
+from app import activity, db, jobs, logs, profiling
+from app.compression import CompressionMiddleware
+from app.idempotency import IdempotencyMiddleware
+from app.negotiation import MsgPackMiddleware
+from app.ratelimit import RATE_LIMITS_ENABLED, RateLimitMiddleware
+from app.replicas import ReadYourWritesMiddleware
+from app.singleflight import SingleFlightMiddleware, stats as singleflight_stats
+
+logger = logging.getLogger(__name__)
+
+# Connections to open in the background at startup (0 = connect on first request)
+DB_PREWARM_CONNECTIONS = int(os.getenv("DB_PREWARM_CONNECTIONS", "0"))
+# Schema written at build time by ``python -m app.openapi``; served instead of regenerating it
+OPENAPI_SCHEMA_PATH = os.getenv("OPENAPI_SCHEMA_PATH", "")
+
+
+def prewarm_pool(connections: int) -> None:
+    """Open ``connections`` pooled connections at once so early requests skip the connect."""
+    engine = db.get_engine()
+    opened = []
+    try:
+        for _ in range(connections):
+            conn = engine.connect()
+            opened.append(conn)
+            conn.exec_driver_sql("SELECT 1")
+    except Exception:
+        logger.warning("Database pool pre-warm failed", exc_info=True)
+    finally:
+        for conn in opened:
+            conn.close()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if logs.STRUCTURED_LOGS:
+        logs.start()
+    warmup = None
+    if DB_PREWARM_CONNECTIONS > 0:
+        # Not awaited: the app answers /health while connections are being opened
+        warmup = asyncio.create_task(asyncio.to_thread(prewarm_pool, DB_PREWARM_CONNECTIONS))
+    stop_workers, workers = jobs.start_workers(jobs.JOB_WORKERS)
+    yield
+    stop_workers.set()
+    for worker in workers:
+        await asyncio.to_thread(worker.join)
+    await asyncio.to_thread(activity.stop)
+    if warmup is not None and not warmup.done():
+        await warmup
+    db.dispose_engines()
+    logs.stop()
+
+
+def load_openapi_schema(app: FastAPI, path: str) -> None:
+    try:
+        with open(path) as f:
+            app.openapi_schema = json.load(f)
+    except FileNotFoundError:
+        pass
+
+
+def create_app() -> FastAPI:
+    from app.routers import backlog, auth, trips, sections, avatars, jobs as jobs_router
+
+    app = FastAPI(title="TRVL API", lifespan=lifespan)
+
+    # Merges identical concurrent reads into one handler run
+    app.add_middleware(SingleFlightMiddleware, prefixes=("/trips", "/backlog"))
+
+    # Replays retried POSTs carrying an Idempotency-Key (kept inside CORS so replays get CORS headers)
+    app.add_middleware(IdempotencyMiddleware)
+
+    # Keeps a caller's reads on the primary for a moment after they write (no-op without replicas)
+    app.add_middleware(ReadYourWritesMiddleware)
+
+    # MessagePack bodies for clients that Accept / send application/msgpack
+    app.add_middleware(MsgPackMiddleware)
+
+    # gzip/brotli above COMPRESS_MIN_BYTES; outside idempotency so stored replays stay uncompressed
+    app.add_middleware(CompressionMiddleware)
+
+    # Token buckets per route group and caller; 429s leave before routing or any DB work
+    if RATE_LIMITS_ENABLED:
+        app.add_middleware(RateLimitMiddleware)
+
+    # Opt-in sampling profiles of single requests (X-Profile header or PROFILE_SAMPLE_RATE)
+    app.add_middleware(profiling.ProfilingMiddleware)
+
+    # One JSON line per request, written by a background thread (app/logs.py)
+    app.add_middleware(logs.AccessLogMiddleware)
+
+    # CORS for local Vite dev server
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=[
+            "http://localhost:5173",
+            "http://127.0.0.1:5173",
+            "https://accounts.google.com",
+            "https://your-app.vercel.app",   # update after you deploy frontend
+        ],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    @app.get("/health")
+    def health():
+        return {"status": "ok"}
+
+    @app.get("/health/singleflight")
+    def singleflight_health():
+        return singleflight_stats.as_dict()
+
+    def require_profile_token(token: str | None) -> None:
+        if not profiling.PROFILE_TOKEN:
+            raise HTTPException(status_code=404, detail="Profiling is disabled")
+        if not profiling.authorized(token):
+            raise HTTPException(status_code=403, detail="Invalid profile token")
+
+    @app.get("/admin/profiles")
+    def list_profiles(x_profile_token: str | None = Header(default=None)):
+        require_profile_token(x_profile_token)
+        return [p.summary() for p in profiling.profiles.list()]
+
+    @app.get("/admin/profiles/{profile_id}")
+    def get_profile(profile_id: str, format: str = "json", x_profile_token: str | None = Header(default=None)):
+        require_profile_token(x_profile_token)
+        profile = profiling.profiles.get(profile_id)
+        if profile is None:
+            raise HTTPException(status_code=404, detail="Profile not found")
+        if format == "folded":
+            return PlainTextResponse(profile.folded())
+        return profile.detail()
+
+    # Example protected (service role) usage placeholder:
+    @app.get("/api/example")
+    def example():
+        return {"message": "Hello from FastAPI on Render!"}
+
+    app.include_router(backlog.router)
+    app.include_router(auth.router)
+    app.include_router(trips.router)
+    app.include_router(sections.router)
+    app.include_router(avatars.router)
+    app.include_router(jobs_router.router)
+
+    if OPENAPI_SCHEMA_PATH:
+        load_openapi_schema(app, OPENAPI_SCHEMA_PATH)
+    return app
+
+
+app = create_app()
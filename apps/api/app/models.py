@@ -1,17 +1,25 @@
-from sqlalchemy import Integer, String, Boolean, Numeric, ForeignKey, DateTime, UniqueConstraint
+from sqlalchemy import DDL, JSON, BigInteger, Integer, String, Boolean, Numeric, Float, ForeignKey, DateTime, UniqueConstraint, Index, event
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from datetime import datetime
 
+from .avatars import picture_version
 from .db import Base
+from .dates import DATERANGE_SQL, DateString, TimestampString
 
 
 class BacklogCard(Base):
     __tablename__ = "backlog_cards"
+    __table_args__ = (
+        Index("ix_backlog_cards_reservation_date", "reservation_date"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     category: Mapped[str] = mapped_column(String(30), nullable=False, default="activities")
     title: Mapped[str] = mapped_column(String(200), nullable=False)
     location: Mapped[str] = mapped_column(String(200), default="", nullable=False)
+    latitude: Mapped[float | None] = mapped_column(Float, nullable=True)
+    longitude: Mapped[float | None] = mapped_column(Float, nullable=True)
     distance_from_hotel_km: Mapped[float | None] = mapped_column(Numeric(10, 2), nullable=True)
     cost: Mapped[float | None] = mapped_column(Numeric(10, 2), nullable=True)
     rating: Mapped[float | None] = mapped_column(Numeric(3, 1), nullable=True)
@@ -19,10 +27,11 @@ class BacklogCard(Base):
     requires_reservation: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
     description: Mapped[str] = mapped_column(String(2000), default="", nullable=False)
     reserved: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
-    reservation_date: Mapped[str | None] = mapped_column(String(30), nullable=True)
+    reservation_date: Mapped[str | None] = mapped_column(TimestampString(), nullable=True)
     locked_in: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
     created_by: Mapped[int | None] = mapped_column(ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=datetime.utcnow)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=datetime.utcnow)
 
     creator: Mapped["User | None"] = relationship("User", foreign_keys=[created_by])
 
@@ -40,6 +49,11 @@ class User(Base):
 
     sessions: Mapped[list["Session"]] = relationship(back_populates="user", cascade="all, delete-orphan")
 
+    @property
+    def avatar_url(self) -> str:
+        # Versioned by the picture URL so browsers can cache the thumbnail for good
+        return f"/avatars/{self.id}?v={picture_version(self.picture)}" if self.picture else ""
+
 
 class Session(Base):
     __tablename__ = "sessions"
@@ -55,14 +69,21 @@ class Session(Base):
 
 class Trip(Base):
     __tablename__ = "trips"
+    __table_args__ = (
+        Index("ix_trips_start_date_end_date", "start_date", "end_date"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     name: Mapped[str] = mapped_column(String(200), nullable=False)
-    start_date: Mapped[str | None] = mapped_column(String(10), nullable=True)
-    end_date: Mapped[str | None] = mapped_column(String(10), nullable=True)
+    start_date: Mapped[str | None] = mapped_column(DateString(), nullable=True)
+    end_date: Mapped[str | None] = mapped_column(DateString(), nullable=True)
     created_by: Mapped[int | None] = mapped_column(ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=datetime.utcnow)
     invite_code: Mapped[str] = mapped_column(String(64), nullable=False, default="")
+    # Secret in the calendar subscription URL; calendar apps cannot send an Authorization header
+    calendar_token: Mapped[str] = mapped_column(String(64), nullable=False, default="", server_default="")
+    # Bumped on every change to the trip or its children; keys derived caches
+    revision: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
 
     sections: Mapped[list["TripSection"]] = relationship(back_populates="trip", cascade="all, delete-orphan")
     legs: Mapped[list["TripLeg"]] = relationship(back_populates="trip", cascade="all, delete-orphan")
@@ -71,27 +92,68 @@ class Trip(Base):
     creator: Mapped["User | None"] = relationship("User")
 
 
+class CurrencyRate(Base):
+    __tablename__ = "currency_rates"
+
+    code: Mapped[str] = mapped_column(String(3), primary_key=True)
+    # Units of this currency per one unit of the base currency (app.budget.BASE_CURRENCY)
+    rate: Mapped[float] = mapped_column(Numeric(18, 8), nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=datetime.utcnow)
+
+
 class TripSection(Base):
     __tablename__ = "trip_sections"
+    __table_args__ = (
+        UniqueConstraint("trip_id", "kind", name="uq_trip_section_kind"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     trip_id: Mapped[int] = mapped_column(ForeignKey("trips.id", ondelete="CASCADE"), nullable=False)
-    kind: Mapped[str] = mapped_column(String(30), nullable=False)  # backlog | schedule | travel | packing
+    kind: Mapped[str] = mapped_column(String(30), nullable=False)  # backlog | schedule | travel | packing | overview
+    # Incremented once per batch of item ops; SectionItem.revision records the batch that last touched a row
+    revision: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=datetime.utcnow)
 
     trip: Mapped[Trip] = relationship(back_populates="sections")
 
 
+class SectionItem(Base):
+    __tablename__ = "section_items"
+    __table_args__ = (
+        UniqueConstraint("section_id", "client_id", name="uq_section_item_client_id"),
+        Index("ix_section_items_section_id_revision", "section_id", "revision"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    section_id: Mapped[int] = mapped_column(ForeignKey("trip_sections.id", ondelete="CASCADE"), nullable=False)
+    # Stable id chosen by the client (packing person/item UUIDs, overview field names)
+    client_id: Mapped[str] = mapped_column(String(64), nullable=False)
+    parent_client_id: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    kind: Mapped[str] = mapped_column(String(20), nullable=False, default="item")  # person | item | field
+    position: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    data: Mapped[dict] = mapped_column(JSON().with_variant(JSONB(), "postgresql"), nullable=False, default=dict)
+    deleted: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    revision: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=datetime.utcnow)
+
+
 class TripLeg(Base):
     __tablename__ = "trip_legs"
+    __table_args__ = (
+        Index("ix_trip_legs_trip_id_start_date", "trip_id", "start_date"),
+        Index("ix_trip_legs_trip_id_seq", "trip_id", "seq"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     trip_id: Mapped[int] = mapped_column(ForeignKey("trips.id", ondelete="CASCADE"), nullable=False)
     name: Mapped[str] = mapped_column(String(200), nullable=False)
-    start_date: Mapped[str | None] = mapped_column(String(10), nullable=True)
-    end_date: Mapped[str | None] = mapped_column(String(10), nullable=True)
+    start_date: Mapped[str | None] = mapped_column(DateString(), nullable=True)
+    end_date: Mapped[str | None] = mapped_column(DateString(), nullable=True)
     order_index: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=datetime.utcnow)
+    # Trip.revision at this row's last change (see app.revisions)
+    seq: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=datetime.utcnow)
 
     trip: Mapped[Trip] = relationship(back_populates="legs")
 
@@ -100,6 +162,7 @@ class ScheduledEvent(Base):
     __tablename__ = "scheduled_events"
     __table_args__ = (
         UniqueConstraint("trip_id", "day_index", "hour", name="uq_schedule_slot"),
+        Index("ix_scheduled_events_trip_id_seq", "trip_id", "seq"),
     )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
@@ -109,6 +172,9 @@ class ScheduledEvent(Base):
     hour: Mapped[int] = mapped_column(Integer, nullable=False)
     created_by: Mapped[int | None] = mapped_column(ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=datetime.utcnow)
+    # Trip.revision at this row's last change (see app.revisions)
+    seq: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=datetime.utcnow)
 
     trip: Mapped[Trip] = relationship("Trip")
     card: Mapped[BacklogCard] = relationship("BacklogCard")
@@ -116,6 +182,10 @@ class ScheduledEvent(Base):
 
 class TravelSegment(Base):
     __tablename__ = "travel_segments"
+    __table_args__ = (
+        Index("ix_travel_segments_trip_id_start_date", "trip_id", "start_date"),
+        Index("ix_travel_segments_trip_id_seq", "trip_id", "seq"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     trip_id: Mapped[int] = mapped_column(ForeignKey("trips.id", ondelete="CASCADE"), nullable=False)
@@ -127,9 +197,12 @@ class TravelSegment(Base):
     transport_type: Mapped[str] = mapped_column(String(20), nullable=False, default="plane")
     title: Mapped[str] = mapped_column(String(200), nullable=False, default="")
     badge: Mapped[str] = mapped_column(String(50), nullable=False, default="")
-    start_date: Mapped[str | None] = mapped_column(String(10), nullable=True)
-    end_date: Mapped[str | None] = mapped_column(String(10), nullable=True)
+    start_date: Mapped[str | None] = mapped_column(DateString(), nullable=True)
+    end_date: Mapped[str | None] = mapped_column(DateString(), nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=datetime.utcnow)
+    # Trip.revision at this row's last change (see app.revisions)
+    seq: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=datetime.utcnow)
 
     trip: Mapped[Trip] = relationship(back_populates="travel_segments")
 
@@ -138,12 +211,110 @@ class TripUser(Base):
     __tablename__ = "trip_users"
     __table_args__ = (
         UniqueConstraint("trip_id", "user_id", name="uq_trip_user"),
+        Index("ix_trip_users_trip_id_seq", "trip_id", "seq"),
     )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     trip_id: Mapped[int] = mapped_column(ForeignKey("trips.id", ondelete="CASCADE"), nullable=False)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=datetime.utcnow)
+    # Trip.revision at this row's last change (see app.revisions)
+    seq: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=datetime.utcnow)
 
     trip: Mapped[Trip] = relationship(back_populates="memberships")
     user: Mapped["User"] = relationship()
+
+
+class TripTombstone(Base):
+    """Deleted row of a trip-scoped entity, kept so incremental sync can report it."""
+
+    __tablename__ = "trip_tombstones"
+    __table_args__ = (
+        Index("ix_trip_tombstones_trip_id_seq", "trip_id", "seq"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    trip_id: Mapped[int] = mapped_column(ForeignKey("trips.id", ondelete="CASCADE"), nullable=False)
+    seq: Mapped[int] = mapped_column(Integer, nullable=False)
+    entity: Mapped[str] = mapped_column(String(20), nullable=False)  # leg | segment | event | member | card
+    entity_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    deleted_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=datetime.utcnow)
+
+
+class Job(Base):
+    """Unit of background work; see app.jobs."""
+
+    __tablename__ = "jobs"
+    __table_args__ = (
+        Index("ix_jobs_status_run_at", "status", "run_at"),
+        Index("ix_jobs_created_by_id", "created_by", "id"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    kind: Mapped[str] = mapped_column(String(50), nullable=False)
+    payload: Mapped[dict] = mapped_column(JSON().with_variant(JSONB(), "postgresql"), nullable=False, default=dict)
+    status: Mapped[str] = mapped_column(String(20), nullable=False, default="queued")  # queued | running | succeeded | failed
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    max_attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=5)
+    run_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=datetime.utcnow)
+    locked_by: Mapped[str | None] = mapped_column(String(100), nullable=True)
+    locked_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    last_error: Mapped[str | None] = mapped_column(String(2000), nullable=True)
+    result: Mapped[dict | None] = mapped_column(JSON().with_variant(JSONB(), "postgresql"), nullable=True)
+    created_by: Mapped[int | None] = mapped_column(ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=datetime.utcnow)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=datetime.utcnow)
+
+
+class TripActivity(Base):
+    """Append-only record of a change to a trip; written in batches by app.activity.
+
+    On Postgres the table is partitioned by month of ``occurred_at``; app.activity
+    creates the partitions as it writes.  ``trip_id`` and ``actor_id`` carry no
+    foreign keys so the log outlives the rows it describes and bulk writes skip
+    the checks.
+    """
+
+    __tablename__ = "trip_activity"
+    __table_args__ = (
+        Index("ix_trip_activity_trip_occurred", "trip_id", "occurred_at", "id"),
+        {"postgresql_partition_by": "RANGE (occurred_at)"},
+    )
+
+    # The partition key has to be part of the primary key; ids come from app.activity
+    occurred_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True)
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=False)
+    trip_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    actor_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    entity: Mapped[str] = mapped_column(String(20), nullable=False)  # trip | leg | segment | member | invite | calendar | schedule | section | card
+    entity_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    action: Mapped[str] = mapped_column(String(20), nullable=False)  # create | update | delete
+    changes: Mapped[dict] = mapped_column(JSON().with_variant(JSONB(), "postgresql"), nullable=False, default=dict)
+
+
+# GiST indexes over inclusive date ranges back the overlap queries in app.dates.overlaps
+for _table in (Trip.__table__, TripLeg.__table__, TravelSegment.__table__):
+    event.listen(
+        _table,
+        "after_create",
+        DDL(
+            f"CREATE INDEX ix_{_table.name}_daterange ON {_table.name} USING gist ({DATERANGE_SQL})"
+        ).execute_if(dialect="postgresql"),
+    )
+
+
+# Full-text search column and trigram index for app.search (Postgres only)
+SEARCH_TS_CONFIG = "simple"
+SEARCH_VECTOR_SQL = (
+    f"setweight(to_tsvector('{SEARCH_TS_CONFIG}', title), 'A') || "
+    f"setweight(to_tsvector('{SEARCH_TS_CONFIG}', location), 'B') || "
+    f"setweight(to_tsvector('{SEARCH_TS_CONFIG}', description), 'C')"
+)
+for _statement in (
+    f"ALTER TABLE backlog_cards ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ({SEARCH_VECTOR_SQL}) STORED",
+    "CREATE INDEX ix_backlog_cards_search_vector ON backlog_cards USING gin (search_vector)",
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX ix_backlog_cards_location_trgm ON backlog_cards USING gin (location gin_trgm_ops)",
+):
+    event.listen(BacklogCard.__table__, "after_create", DDL(_statement).execute_if(dialect="postgresql"))
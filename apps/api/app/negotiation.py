@@ -0,0 +1,192 @@
+"""MessagePack as an alternative to JSON, chosen by ``Accept`` / ``Content-Type``.
+
+A request that prefers ``application/msgpack`` over JSON in its ``Accept``
+header gets MessagePack bodies; everything else keeps getting JSON.  The
+list renderers in ``app.serialization`` encode straight to MessagePack, so
+datetimes go out as MessagePack timestamps and numeric columns as floats.
+Routes of routers built with ``route_class=MsgPackRoute`` pack their
+``response_model`` the same way, so a type does not depend on the endpoint.
+Remaining JSON responses (plain dicts, errors) are converted here.  A body
+sent with ``Content-Type: application/msgpack`` is decoded and handed to the
+routers as JSON, so every route accepts both.
+"""
+import functools
+import inspect
+from contextvars import ContextVar
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from typing import Any, Callable
+
+import msgpack
+import orjson
+from fastapi.routing import APIRoute
+from pydantic import TypeAdapter
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse, Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.idempotency import _read_body, _replay_body
+
+MEDIA_TYPE = "application/msgpack"
+MEDIA_TYPES = (MEDIA_TYPE, "application/x-msgpack")
+JSON_MEDIA_TYPE = "application/json"
+
+_wants: ContextVar[bool] = ContextVar("wants_msgpack", default=False)
+
+
+def wants_msgpack() -> bool:
+    """Whether the current request asked for MessagePack."""
+    return _wants.get()
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, datetime):
+        # Naive values come from columns stored in UTC (SQLite drops the offset)
+        return obj.replace(tzinfo=timezone.utc)
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, date):
+        return obj.isoformat()
+    raise TypeError(f"Cannot encode {type(obj).__name__} as MessagePack")
+
+
+def packb(content: Any) -> bytes:
+    return msgpack.packb(content, default=_default, datetime=True)
+
+
+def unpackb(data: bytes) -> Any:
+    return msgpack.unpackb(data, timestamp=3, strict_map_key=False)
+
+
+class MsgPackRoute(APIRoute):
+    """Packs the validated response model itself when the caller wants MessagePack.
+
+    The endpoint is wrapped so its return value is dumped in Python mode
+    (datetimes stay datetimes) instead of going through FastAPI's JSON
+    serialization and being converted afterwards.
+    """
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any) -> None:
+        route = self
+        if inspect.iscoroutinefunction(endpoint):
+            @functools.wraps(endpoint)
+            async def negotiated(*args: Any, **values: Any) -> Any:
+                return route._negotiate(await endpoint(*args, **values))
+        else:
+            @functools.wraps(endpoint)
+            def negotiated(*args: Any, **values: Any) -> Any:
+                return route._negotiate(endpoint(*args, **values))
+        super().__init__(path, negotiated, **kwargs)
+        self._adapter = TypeAdapter(self.response_model) if self.response_field is not None else None
+
+    def _negotiate(self, content: Any) -> Any:
+        if self._adapter is None or isinstance(content, Response) or not wants_msgpack():
+            return content
+        value = self._adapter.validate_python(content, from_attributes=True)
+        body = packb(self._adapter.dump_python(
+            value,
+            include=self.response_model_include,
+            exclude=self.response_model_exclude,
+            by_alias=self.response_model_by_alias,
+            exclude_unset=self.response_model_exclude_unset,
+            exclude_defaults=self.response_model_exclude_defaults,
+            exclude_none=self.response_model_exclude_none,
+        ))
+        return Response(content=body, status_code=self.status_code or 200, media_type=MEDIA_TYPE)
+
+
+def _quality(params: str) -> float:
+    for param in params.split(";"):
+        name, _, value = param.strip().partition("=")
+        if name == "q":
+            try:
+                return float(value)
+            except ValueError:
+                return 0.0
+    return 1.0
+
+
+def prefers_msgpack(accept: str) -> bool:
+    msgpack_q = json_q = 0.0
+    for part in accept.split(","):
+        media, _, params = part.strip().partition(";")
+        media = media.strip().lower()
+        if media in MEDIA_TYPES:
+            msgpack_q = max(msgpack_q, _quality(params))
+        elif media == JSON_MEDIA_TYPE:
+            json_q = max(json_q, _quality(params))
+    return msgpack_q > 0 and msgpack_q >= json_q
+
+
+def _media_type(content_type: str) -> str:
+    return content_type.partition(";")[0].strip().lower()
+
+
+class MsgPackMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        want = prefers_msgpack(headers.get("accept", ""))
+
+        if _media_type(headers.get("content-type", "")) in MEDIA_TYPES:
+            try:
+                body = orjson.dumps(unpackb(await _read_body(receive)), option=orjson.OPT_UTC_Z)
+            except (ValueError, TypeError, msgpack.UnpackException, orjson.JSONEncodeError):
+                await JSONResponse({"detail": "Invalid MessagePack body"}, status_code=400)(scope, receive, send)
+                return
+            request_headers = MutableHeaders(scope={**scope, "headers": list(scope["headers"])})
+            request_headers["content-type"] = JSON_MEDIA_TYPE
+            request_headers["content-length"] = str(len(body))
+            scope = {**scope, "headers": request_headers.raw}
+            receive = _replay_body(body)
+
+        start: Message | None = None
+        target: str | None = None
+        chunks: list[bytes] = []
+
+        async def send_negotiated(message: Message) -> None:
+            nonlocal start, target
+            if message["type"] == "http.response.start":
+                media_type = _media_type(Headers(raw=message.get("headers", [])).get("content-type", ""))
+                if media_type not in (JSON_MEDIA_TYPE, *MEDIA_TYPES):
+                    await send(message)
+                    return
+                response_headers = MutableHeaders(raw=list(message.get("headers", [])))
+                response_headers.add_vary_header("Accept")
+                message = {**message, "headers": response_headers.raw}
+                # Convert only when the body is not already what was asked for; stored
+                # idempotent replays can be in either format
+                if want != (media_type in MEDIA_TYPES):
+                    target = MEDIA_TYPE if want else JSON_MEDIA_TYPE
+                    start = message
+                    return
+                await send(message)
+                return
+            if target is None or message["type"] != "http.response.body":
+                await send(message)
+                return
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+            body = b"".join(chunks)
+            if body:
+                if target == MEDIA_TYPE:
+                    body = packb(orjson.loads(body))
+                else:
+                    body = orjson.dumps(unpackb(body), option=orjson.OPT_UTC_Z)
+            response_headers = MutableHeaders(raw=list(start.get("headers", [])))
+            response_headers["content-type"] = target
+            response_headers["content-length"] = str(len(body))
+            await send({**start, "headers": response_headers.raw})
+            await send({"type": "http.response.body", "body": body})
+
+        token = _wants.set(want)
+        try:
+            await self.app(scope, receive, send_negotiated)
+        finally:
+            _wants.reset(token)
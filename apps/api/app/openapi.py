@@ -0,0 +1,25 @@
+"""Write the OpenAPI schema to a file at build time.
+
+    python -m app.openapi openapi.json
+
+Deploys that set ``OPENAPI_SCHEMA_PATH`` to the written file serve it as is,
+so ``/docs`` and ``/openapi.json`` never pay for schema generation at runtime.
+Regenerate it whenever routes or schemas change.
+"""
+import json
+import sys
+
+from app.main import create_app
+
+
+def main() -> None:
+    path = sys.argv[1] if len(sys.argv) > 1 else "openapi.json"
+    app = create_app()
+    app.openapi_schema = None  # ignore a previously written file
+    with open(path, "w") as f:
+        json.dump(app.openapi(), f, separators=(",", ":"))
+    print(f"Wrote {path}")
+
+
+if __name__ == "__main__":
+    main()
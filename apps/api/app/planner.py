@@ -0,0 +1,242 @@
+"""Automatic day planner: fills a trip's schedule grid from backlog cards.
+
+The planner is a pure function over plain dataclasses so it can be benchmarked
+and reused without a database.  It works in two phases:
+
+1. Greedy: cards are taken by value (or value per unit of cost when a budget
+   is set) and each goes into the least busy allowed day, at the first free
+   hour its category prefers.
+2. Local search: unscheduled cards repeatedly try to replace a lower-value
+   scheduled card in a slot they may use, as long as the budget still holds,
+   then any budget freed up is refilled with insertions.
+
+Hard constraints: fixed slots (locked-in cards already on the schedule) stay
+put, reserved cards go to their reservation day (and hour, clamped to the
+planning window, when the reservation has a time), one card per slot,
+each card at most once, ``max_per_day`` events per day and the optional total
+``budget``.
+"""
+from dataclasses import dataclass, field
+from datetime import date
+
+CATEGORY_HOURS = {
+    "food": (12, 19, 13, 20, 8, 18),
+    "clubs": (22, 23, 21),
+    "hotels": (),  # accommodation is not an hourly slot
+}
+DEFAULT_HOURS = (10, 14, 16, 11, 15, 9, 17, 13, 18, 20)
+LOCKED_IN_BONUS = 100.0
+MAX_SEARCH_PASSES = 20
+
+
+@dataclass
+class PlanCard:
+    id: int
+    category: str = "activities"
+    location: str = ""
+    cost: float = 0.0
+    rating: float | None = None
+    desire_to_go: float | None = None
+    locked_in: bool = False
+    # Set when the card has a reservation inside the trip; no hour (a date-only
+    # reservation) lets the planner pick one within the day
+    reservation_day: int | None = None
+    reservation_hour: int | None = None
+    # Day indexes the card may use; None means any day
+    days: frozenset[int] | None = None
+
+    @property
+    def value(self) -> float:
+        value = (self.desire_to_go if self.desire_to_go is not None else 1.0) + 0.5 * (self.rating or 0.0)
+        return value + (LOCKED_IN_BONUS if self.locked_in else 0.0)
+
+
+@dataclass
+class PlanLeg:
+    name: str
+    first_day: int
+    last_day: int
+
+
+@dataclass
+class Plan:
+    slots: dict[tuple[int, int], int] = field(default_factory=dict)  # (day, hour) -> card id
+    fixed: set[tuple[int, int]] = field(default_factory=set)
+    total_value: float = 0.0
+    total_cost: float = 0.0
+    unscheduled: list[int] = field(default_factory=list)
+
+
+def day_index(start: date, day: date) -> int:
+    return (day - start).days
+
+
+def leg_days(card_location: str, legs: list[PlanLeg]) -> frozenset[int] | None:
+    """Days of the legs whose name appears in the card's location, if any do."""
+    location = card_location.lower()
+    days: set[int] = set()
+    for leg in legs:
+        if leg.name and leg.name.lower() in location:
+            days.update(range(leg.first_day, leg.last_day + 1))
+    return frozenset(days) if days else None
+
+
+class _State:
+    def __init__(self, num_days: int, hours: list[int], max_per_day: int, budget: float | None, cards: dict[int, PlanCard]) -> None:
+        self.num_days = num_days
+        self.hours = hours
+        self.hour_set = set(hours)
+        self.max_per_day = max_per_day
+        self.budget = budget
+        self.cards = cards
+        self.slots: dict[tuple[int, int], int] = {}
+        self.where: dict[int, tuple[int, int]] = {}
+        self.per_day = [0] * num_days
+        self.fixed: set[tuple[int, int]] = set()
+        self.cost = 0.0
+
+    def place(self, card: PlanCard, slot: tuple[int, int], fixed: bool = False) -> None:
+        self.slots[slot] = card.id
+        self.where[card.id] = slot
+        self.per_day[slot[0]] += 1
+        self.cost += card.cost
+        if fixed:
+            self.fixed.add(slot)
+
+    def remove(self, card: PlanCard) -> tuple[int, int]:
+        slot = self.where.pop(card.id)
+        del self.slots[slot]
+        self.per_day[slot[0]] -= 1
+        self.cost -= card.cost
+        return slot
+
+    def fits_budget(self, extra: float) -> bool:
+        return self.budget is None or self.cost + extra <= self.budget + 1e-9
+
+    def preferred_hours(self, card: PlanCard) -> list[int]:
+        preferred = CATEGORY_HOURS.get(card.category, DEFAULT_HOURS)
+        return [h for h in preferred if h in self.hour_set]
+
+    def reserved_hours(self, card: PlanCard) -> list[int]:
+        """Hours a reserved card may take on its day: its own (clamped into the window), or any."""
+        if card.reservation_hour is not None:
+            return [min(max(card.reservation_hour, self.hours[0]), self.hours[-1])]
+        preferred = self.preferred_hours(card)
+        return preferred + [h for h in self.hours if h not in preferred]
+
+    def allowed_day(self, card: PlanCard, day: int) -> bool:
+        return 0 <= day < self.num_days and (card.days is None or day in card.days)
+
+    def best_slot(self, card: PlanCard) -> tuple[int, int] | None:
+        if card.reservation_day is not None:
+            day = card.reservation_day
+            if self.per_day[day] >= self.max_per_day:
+                return None
+            for hour in self.reserved_hours(card):
+                if (day, hour) not in self.slots:
+                    return (day, hour)
+            return None
+        hours = self.preferred_hours(card)
+        if not hours:
+            return None
+        days = range(self.num_days) if card.days is None else sorted(card.days)
+        # Least busy day first keeps the plan balanced; earliest day breaks ties
+        for day in sorted((d for d in days if 0 <= d < self.num_days), key=lambda d: (self.per_day[d], d)):
+            if self.per_day[day] >= self.max_per_day:
+                continue
+            for hour in hours:
+                if (day, hour) not in self.slots:
+                    return (day, hour)
+        return None
+
+    def can_take(self, card: PlanCard, slot: tuple[int, int]) -> bool:
+        """Whether ``card`` may sit in ``slot`` once it is vacated."""
+        if card.reservation_day is not None:
+            return slot[0] == card.reservation_day and slot[1] in self.reserved_hours(card)
+        return self.allowed_day(card, slot[0]) and slot[1] in self.preferred_hours(card)
+
+
+def plan_schedule(
+    cards: list[PlanCard],
+    num_days: int,
+    fixed: dict[tuple[int, int], int] | None = None,
+    max_per_day: int = 4,
+    budget: float | None = None,
+    day_start_hour: int = 8,
+    day_end_hour: int = 23,
+) -> Plan:
+    """Plan ``cards`` over ``num_days`` days; ``fixed`` maps (day, hour) to card ids that must stay."""
+    by_id = {card.id: card for card in cards}
+    state = _State(num_days, list(range(day_start_hour, day_end_hour + 1)), max_per_day, budget, by_id)
+
+    for slot, card_id in (fixed or {}).items():
+        card = by_id.get(card_id)
+        if card is not None and 0 <= slot[0] < num_days:
+            state.place(card, slot, fixed=True)
+    if not state.hours:
+        # An empty window has no slot to offer; only the fixed cards stay
+        return Plan(
+            slots=dict(state.slots),
+            fixed=set(state.fixed),
+            total_value=round(sum(by_id[cid].value for cid in state.slots.values()), 4),
+            total_cost=round(state.cost, 2),
+            unscheduled=sorted(c.id for c in cards if c.id not in state.where),
+        )
+
+    def priority(card: PlanCard) -> tuple:
+        # Reservations first (they have exactly one slot), then by value density under a budget
+        density = card.value / (1.0 + card.cost) if budget is not None else card.value
+        return (card.reservation_day is None, -density, card.id)
+
+    pending = sorted((c for c in cards if c.id not in state.where), key=priority)
+    unscheduled: list[PlanCard] = []
+    for card in pending:
+        slot = state.best_slot(card) if state.fits_budget(card.cost) else None
+        if slot is None:
+            unscheduled.append(card)
+        else:
+            state.place(card, slot)
+
+    _improve(state, unscheduled)
+
+    plan = Plan(slots=dict(state.slots), fixed=set(state.fixed), total_cost=round(state.cost, 2))
+    plan.total_value = round(sum(by_id[cid].value for cid in state.slots.values()), 4)
+    plan.unscheduled = sorted(c.id for c in unscheduled)
+    return plan
+
+
+def _improve(state: _State, unscheduled: list[PlanCard]) -> None:
+    for _ in range(MAX_SEARCH_PASSES):
+        improved = False
+        unscheduled.sort(key=lambda c: -c.value)
+        # Cheapest-to-lose scheduled cards first
+        movable = sorted(
+            (state.cards[cid] for slot, cid in state.slots.items() if slot not in state.fixed),
+            key=lambda c: c.value,
+        )
+        still_unscheduled: list[PlanCard] = []
+        for card in unscheduled:
+            slot = state.best_slot(card) if state.fits_budget(card.cost) else None
+            if slot is not None:
+                state.place(card, slot)
+                improved = True
+                continue
+            swapped = False
+            for victim in movable:
+                if victim.value >= card.value:
+                    break
+                if victim.id not in state.where:
+                    continue
+                victim_slot = state.where[victim.id]
+                if not state.can_take(card, victim_slot) or not state.fits_budget(card.cost - victim.cost):
+                    continue
+                state.remove(victim)
+                state.place(card, victim_slot)
+                still_unscheduled.append(victim)
+                swapped = improved = True
+                break
+            if not swapped:
+                still_unscheduled.append(card)
+        unscheduled[:] = still_unscheduled
+        if not improved:
+            return
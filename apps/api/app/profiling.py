@@ -0,0 +1,234 @@
+"""On-demand sampling profiles of single requests.
+
+A request is profiled when it carries ``X-Profile: <PROFILE_TOKEN>`` or is
+picked at random with probability ``PROFILE_SAMPLE_RATE`` (default 0).  While
+it runs, a background thread snapshots the stacks of the threads working on
+it every ``PROFILE_INTERVAL_MS`` (2 ms): the event loop thread, and worker
+threads from their first database query on.  Each sample is classified as
+``db`` (SQLAlchemy or the driver), ``serialization`` (Pydantic, JSON encoders,
+``app.serialization``), ``handler`` (other code under ``app/``) or
+``framework``.  Database time and query count are measured exactly from
+SQLAlchemy cursor events.
+
+Only one request per process is profiled at a time; others pass through
+untouched, so the overhead outside a profile is one context variable lookup
+per query.  Samples of the event loop thread can include other requests it
+interleaves with.  The last ``PROFILE_BUFFER_SIZE`` profiles are kept in
+memory and served from ``GET /admin/profiles`` (same token, sent as
+``X-Profile-Token``); ``?format=folded`` on a single profile returns folded
+stacks for flamegraph.pl or speedscope.
+"""
+import os
+import random
+import secrets
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+from sqlalchemy import Engine, event
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "2"))
+PROFILE_BUFFER_SIZE = int(os.getenv("PROFILE_BUFFER_SIZE", "50"))
+
+MAX_DEPTH = 64
+EXCLUDED_PREFIXES = ("/admin/profiles", "/health")
+ID_HEADER = b"x-profile-id"
+
+# Leaf frames of a thread with nothing to do (idle loop, idle worker)
+_IDLE_FILES = ("selectors.py", "threading.py", "queue.py")
+_DB_MARKERS = ("/sqlalchemy/", "/psycopg/", "/psycopg2/", "sqlite3")
+_SERIALIZATION_MARKERS = ("/pydantic/", "/pydantic_core/", "/orjson/", "/json/", "fastapi/encoders.py", "app/serialization.py")
+_APP_MARKER = f"{os.sep}app{os.sep}"
+
+_current: ContextVar["Profile | None"] = ContextVar("profile", default=None)
+_active = threading.Lock()
+
+
+@dataclass
+class Profile:
+    id: str
+    method: str
+    path: str
+    reason: str  # header | sampled
+    started_at: datetime
+    status: int = 0
+    total_ms: float = 0.0
+    db_ms: float = 0.0
+    db_queries: int = 0
+    threads: set[int] = field(default_factory=set)
+    stacks: Counter = field(default_factory=Counter)
+    categories: Counter = field(default_factory=Counter)
+
+    def add_sample(self, frame) -> None:
+        if frame.f_code.co_filename.endswith(_IDLE_FILES):
+            return
+        names = []
+        files = []
+        while frame is not None and len(names) < MAX_DEPTH:
+            code = frame.f_code
+            files.append(code.co_filename)
+            names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+            frame = frame.f_back
+        self.stacks[";".join(reversed(names))] += 1
+        self.categories[_category(files)] += 1
+
+    def summary(self) -> dict:
+        samples = sum(self.categories.values())
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "reason": self.reason,
+            "started_at": self.started_at.isoformat(),
+            "status": self.status,
+            "total_ms": round(self.total_ms, 2),
+            "db_ms": round(self.db_ms, 2),
+            "db_queries": self.db_queries,
+            "samples": samples,
+            # Sampled thread time per category; worker and loop threads can overlap
+            "breakdown_ms": {k: round(v * PROFILE_INTERVAL_MS, 1) for k, v in self.categories.most_common()},
+        }
+
+    def detail(self, top: int = 50) -> dict:
+        return {**self.summary(), "stacks": [{"stack": s, "samples": n} for s, n in self.stacks.most_common(top)]}
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {n}\n" for stack, n in self.stacks.most_common())
+
+
+def _category(files: list[str]) -> str:
+    if any(marker in f for f in files for marker in _DB_MARKERS):
+        return "db"
+    if any(marker in f for f in files for marker in _SERIALIZATION_MARKERS):
+        return "serialization"
+    if any(_APP_MARKER in f for f in files):
+        return "handler"
+    return "framework"
+
+
+class ProfileBuffer:
+    """The most recent profiles, oldest dropped first."""
+
+    def __init__(self, size: int) -> None:
+        self._items: deque[Profile] = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, profile: Profile) -> None:
+        with self._lock:
+            self._items.append(profile)
+
+    def list(self) -> list[Profile]:
+        with self._lock:
+            return list(reversed(self._items))
+
+    def get(self, profile_id: str) -> Profile | None:
+        with self._lock:
+            return next((p for p in self._items if p.id == profile_id), None)
+
+
+profiles = ProfileBuffer(PROFILE_BUFFER_SIZE)
+
+
+class _Sampler(threading.Thread):
+    def __init__(self, profile: Profile, interval: float) -> None:
+        super().__init__(name=f"profile-{profile.id}", daemon=True)
+        self.profile = profile
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self.stopped.wait(self.interval):
+            frames = sys._current_frames()
+            for ident in list(self.profile.threads):
+                frame = frames.get(ident)
+                if frame is not None:
+                    self.profile.add_sample(frame)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    profile = _current.get()
+    if profile is None:
+        return
+    profile.threads.add(threading.get_ident())
+    conn.info.setdefault("profile_query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    profile = _current.get()
+    starts = conn.info.get("profile_query_start")
+    if profile is None or not starts:
+        return
+    profile.db_ms += (time.perf_counter() - starts.pop()) * 1000
+    profile.db_queries += 1
+
+
+def authorized(token: str | None) -> bool:
+    # Compared as bytes: compare_digest rejects non-ASCII str, and headers may carry any latin-1
+    return (
+        bool(PROFILE_TOKEN)
+        and token is not None
+        and secrets.compare_digest(token.encode("latin-1", "replace"), PROFILE_TOKEN.encode())
+    )
+
+
+class ProfilingMiddleware:
+    def __init__(self, app: ASGIApp, sample_rate: float = PROFILE_SAMPLE_RATE, interval_ms: float = PROFILE_INTERVAL_MS) -> None:
+        self.app = app
+        self.sample_rate = sample_rate
+        self.interval = interval_ms / 1000
+
+    def _reason(self, scope: Scope) -> str | None:
+        if scope["path"].startswith(EXCLUDED_PREFIXES):
+            return None
+        header = dict(scope["headers"]).get(b"x-profile")
+        if header is not None and authorized(header.decode("latin-1")):
+            return "header"
+        if self.sample_rate and random.random() < self.sample_rate:
+            return "sampled"
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        reason = self._reason(scope)
+        if reason is None or not _active.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        profile = Profile(
+            id=secrets.token_hex(6),
+            method=scope["method"],
+            path=scope["path"],
+            reason=reason,
+            started_at=datetime.now(timezone.utc),
+            threads={threading.get_ident()},
+        )
+        sampler = _Sampler(profile, self.interval)
+        started = time.perf_counter()
+
+        async def send_profiled(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                message = {**message, "headers": [*message.get("headers", []), (ID_HEADER, profile.id.encode())]}
+            await send(message)
+
+        token = _current.set(profile)
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_profiled)
+        finally:
+            sampler.stopped.set()
+            _current.reset(token)
+            profile.total_ms = (time.perf_counter() - started) * 1000
+            profiles.add(profile)
+            _active.release()
@@ -0,0 +1,203 @@
+"""Token-bucket rate limits per route group, checked before any handler runs.
+
+Each request is matched against ``GROUPS`` by method and path; a match takes
+one token from the bucket of ``(group, caller[, trip_id])``, where the caller
+is the ``Authorization`` value once the auth dependency has seen it resolve to
+a session (``note_verified``) and the client address otherwise (run uvicorn
+with ``--proxy-headers`` behind a proxy).  Made-up tokens therefore share
+their address's bucket instead of each getting a fresh one.  An empty bucket answers 429
+with ``Retry-After`` from the middleware, so no DB session is opened and no
+threadpool slot is taken.
+
+Limits are ``burst/seconds`` (a full bucket of ``burst`` refilled over
+``seconds``) and can be overridden with ``RATE_LIMITS``, e.g.
+``RATE_LIMITS="auth=5/60,trip_reads=0"`` (0 disables a group).  Buckets live
+in process memory; pass another ``backend`` with the same ``take`` coroutine
+to share them between workers.
+"""
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
+from typing import Protocol
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+RATE_LIMITS_ENABLED = os.getenv("RATE_LIMITS_ENABLED", "1") == "1"
+MATCH_CACHE_SIZE = 10_000
+VERIFIED_CACHE_SIZE = 100_000
+
+# Authorization values known to belong to a session, least recently seen first.
+# Written from threadpool workers, read from the event loop.
+_verified: OrderedDict[bytes, None] = OrderedDict()
+_verified_lock = threading.Lock()
+
+
+def note_verified(authorization: str) -> None:
+    """Record that ``authorization`` resolved to a session, so it gets its own buckets."""
+    value = authorization.encode("latin-1")
+    with _verified_lock:
+        _verified[value] = None
+        _verified.move_to_end(value)
+        if len(_verified) > VERIFIED_CACHE_SIZE:
+            _verified.popitem(last=False)
+
+
+@dataclass(frozen=True)
+class Limit:
+    burst: int
+    seconds: float
+    rate: float = field(init=False)  # tokens per second
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "rate", self.burst / self.seconds)
+
+
+@dataclass(frozen=True)
+class RouteGroup:
+    name: str
+    methods: frozenset[str]
+    prefix: str
+    limit: Limit
+    suffix: str = ""
+    per_trip: bool = False  # key buckets by the numeric segment between prefix and suffix as well
+
+
+GROUPS = (
+    RouteGroup("auth", frozenset({"POST"}), "/auth/", Limit(10, 60)),
+    RouteGroup(
+        "schedule_saves", frozenset({"POST", "PUT"}), "/trips/", Limit(10, 10), suffix="/schedule", per_trip=True,
+    ),
+    RouteGroup("backlog_writes", frozenset({"POST", "PUT", "PATCH", "DELETE"}), "/backlog", Limit(30, 10)),
+    RouteGroup("trip_reads", frozenset({"GET", "HEAD"}), "/trips", Limit(120, 10)),
+)
+
+
+def configure(groups: tuple[RouteGroup, ...], spec: str) -> tuple[RouteGroup, ...]:
+    """Apply ``name=burst/seconds`` overrides; ``name=0`` drops the group."""
+    overrides: dict[str, Limit | None] = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, value = item.partition("=")
+        if value.strip() == "0":
+            overrides[name.strip()] = None
+            continue
+        burst, _, seconds = value.partition("/")
+        overrides[name.strip()] = Limit(int(burst), float(seconds or 1))
+    configured = []
+    for group in groups:
+        if group.name not in overrides:
+            configured.append(group)
+        elif overrides[group.name] is not None:
+            configured.append(replace(group, limit=overrides[group.name]))
+    return tuple(configured)
+
+
+class RateLimitBackend(Protocol):
+    async def take(self, key: tuple, limit: Limit, now: float) -> float:
+        """Take one token; return 0 if allowed, else seconds until one is available."""
+        ...
+
+
+# A backend may also offer ``take_nowait`` (same signature, plain function) when it
+# never waits; the middleware then skips creating a coroutine per request.
+
+
+@dataclass
+class MemoryBackend:
+    """LRU of ``key -> [tokens, updated_at]`` buckets; only touched from the event loop.
+
+    Past ``max_keys`` the least recently used bucket is dropped, which at worst
+    refills the bucket of a caller idle longer than every other one.
+    """
+
+    max_keys: int = 100_000
+    _buckets: OrderedDict[tuple, list[float]] = field(default_factory=OrderedDict)
+
+    async def take(self, key: tuple, limit: Limit, now: float) -> float:
+        return self.take_nowait(key, limit, now)
+
+    def take_nowait(self, key: tuple, limit: Limit, now: float) -> float:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_keys:
+                self._buckets.popitem(last=False)
+            self._buckets[key] = [limit.burst - 1.0, now]
+            return 0.0
+        self._buckets.move_to_end(key)
+        tokens, updated_at = bucket
+        rate = limit.rate
+        tokens += (now - updated_at) * rate
+        if tokens > limit.burst:
+            tokens = limit.burst
+        bucket[1] = now
+        if tokens >= 1.0:
+            bucket[0] = tokens - 1.0
+            return 0.0
+        bucket[0] = tokens
+        return (1.0 - tokens) / rate
+
+
+class RateLimitMiddleware:
+    def __init__(self, app: ASGIApp, groups: tuple[RouteGroup, ...] | None = None, backend: RateLimitBackend | None = None) -> None:
+        self.app = app
+        self.groups = configure(GROUPS, os.getenv("RATE_LIMITS", "")) if groups is None else groups
+        self.backend = backend or MemoryBackend()
+        self._take_nowait = getattr(self.backend, "take_nowait", None)
+        # (method, path) -> match; paths repeat, so most requests are one dict lookup
+        self._matches: dict[tuple[str, str], tuple[RouteGroup, str | None] | None] = {}
+
+    def _match(self, method: str, path: str) -> tuple[RouteGroup, str | None] | None:
+        for group in self.groups:
+            if method not in group.methods or not path.startswith(group.prefix):
+                continue
+            if not group.suffix:
+                return group, None
+            if path.endswith(group.suffix):
+                middle = path[len(group.prefix):-len(group.suffix)]
+                if middle.isdigit():
+                    return group, middle if group.per_trip else None
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        route = (scope["method"], scope["path"])
+        try:
+            matched = self._matches[route]
+        except KeyError:
+            if len(self._matches) >= MATCH_CACHE_SIZE:
+                self._matches.clear()
+            matched = self._matches[route] = self._match(*route)
+        if matched is None:
+            await self.app(scope, receive, send)
+            return
+        group, trip_id = matched
+        caller = None
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                if value in _verified:
+                    caller = value
+                break
+        if caller is None:
+            client = scope.get("client")
+            caller = client[0] if client else ""
+        key = (group.name, caller, trip_id)
+        if self._take_nowait is not None:
+            retry_after = self._take_nowait(key, group.limit, time.monotonic())
+        else:
+            retry_after = await self.backend.take(key, group.limit, time.monotonic())
+        if not retry_after:
+            await self.app(scope, receive, send)
+            return
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": b'{"detail":"Too many requests"}'})
@@ -0,0 +1,162 @@
+"""Read-replica routing for read-only handlers.
+
+Set ``DATABASE_REPLICA_URLS`` to a comma-separated list of replica URLs and
+read-only list endpoints take their session from ``get_read_db`` instead of
+``get_db``.  Replicas are used round-robin; one that fails a ``SELECT 1`` check
+is skipped for ``REPLICA_RETRY_SECONDS`` before being tried again, and with no
+healthy replica reads fall back to the primary.
+
+Read-your-writes: ``ReadYourWritesMiddleware`` remembers callers (by
+``Authorization`` header) that just sent a successful write, and for
+``REPLICA_STICKY_SECONDS`` afterwards their reads stay on the primary so they
+never see a replica that has not caught up.  The window is per process; with
+several workers behind a non-sticky load balancer, set it above the worst
+replica lag.
+
+Authentication (``get_current_user``) keeps using the primary, so a session
+created a moment ago is always found.
+"""
+import hashlib
+import itertools
+import os
+import threading
+import time
+
+from sqlalchemy import Engine, event, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.db import REPLICA_URLS, SessionLocal, get_replica_engines
+
+REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+REPLICA_RETRY_SECONDS = float(os.getenv("REPLICA_RETRY_SECONDS", "30"))
+HEALTH_CHECK_SECONDS = 5.0
+READ_METHODS = ("GET", "HEAD", "OPTIONS")
+MAX_TRACKED_WRITERS = 100_000
+
+ReadSessionLocal = sessionmaker(autoflush=False, autocommit=False)
+
+
+@event.listens_for(ReadSessionLocal, "before_flush")
+def _refuse_writes(session, flush_context, instances) -> None:
+    raise RuntimeError("Replica sessions are read-only; use get_db for writes")
+
+
+class ReplicaPool:
+    def __init__(self, engines: list[Engine]) -> None:
+        self.engines = engines
+        self._cycle = itertools.cycle(range(len(engines))) if engines else None
+        self._lock = threading.Lock()
+        self._down_until = [0.0] * len(engines)
+        self._checked_at = [0.0] * len(engines)
+
+    def _healthy(self, index: int, now: float) -> bool:
+        if self._down_until[index] > now:
+            return False
+        if now - self._checked_at[index] < HEALTH_CHECK_SECONDS:
+            return True
+        try:
+            with self.engines[index].connect() as conn:
+                conn.execute(text("SELECT 1"))
+        except Exception:
+            self.mark_down(index)
+            return False
+        self._checked_at[index] = now
+        return True
+
+    def mark_down(self, index: int) -> None:
+        self._down_until[index] = time.monotonic() + REPLICA_RETRY_SECONDS
+        self._checked_at[index] = 0.0
+
+    def pick(self) -> Engine | None:
+        """Next healthy replica in round-robin order, or None."""
+        if self._cycle is None:
+            return None
+        now = time.monotonic()
+        for _ in range(len(self.engines)):
+            with self._lock:
+                index = next(self._cycle)
+            if self._healthy(index, now):
+                return self.engines[index]
+        return None
+
+
+_pool: ReplicaPool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ReplicaPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ReplicaPool(get_replica_engines())
+    return _pool
+
+_recent_writers: dict[str, float] = {}
+_writers_lock = threading.Lock()
+
+
+def _caller_key(authorization: bytes | str | None) -> str | None:
+    if not authorization:
+        return None
+    if isinstance(authorization, str):
+        authorization = authorization.encode()
+    return hashlib.sha256(authorization).hexdigest()
+
+
+def record_write(key: str | None) -> None:
+    if key is None:
+        return
+    now = time.monotonic()
+    with _writers_lock:
+        _recent_writers[key] = now + REPLICA_STICKY_SECONDS
+        if len(_recent_writers) > MAX_TRACKED_WRITERS:
+            for stale in [k for k, until in _recent_writers.items() if until <= now]:
+                del _recent_writers[stale]
+
+
+def wrote_recently(key: str | None) -> bool:
+    if key is None:
+        return False
+    until = _recent_writers.get(key)
+    return until is not None and until > time.monotonic()
+
+
+def get_read_db(request: Request):
+    """Session for read-only handlers: a replica unless the caller just wrote."""
+    replica = None
+    if REPLICA_URLS and not wrote_recently(_caller_key(request.headers.get("authorization"))):
+        replica = get_pool().pick()
+    db = ReadSessionLocal(bind=replica) if replica is not None else SessionLocal()
+    try:
+        yield db
+    except OperationalError:
+        if replica is not None:
+            pool = get_pool()
+            pool.mark_down(pool.engines.index(replica))
+        raise
+    finally:
+        db.close()
+
+
+class ReadYourWritesMiddleware:
+    """Starts a caller's sticky-primary window after each successful write request."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] in READ_METHODS or not REPLICA_URLS:
+            await self.app(scope, receive, send)
+            return
+        key = _caller_key(dict(scope["headers"]).get(b"authorization"))
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                record_write(key)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
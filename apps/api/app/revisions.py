@@ -0,0 +1,73 @@
+"""Per-trip revision counter and change sequence.
+
+``Trip.revision`` is bumped in the same transaction as any write to the trip,
+its legs, segments, schedule or memberships, and for every trip that schedules
+an edited backlog card.  Caches of derived data (budgets, exports) key on it.
+
+The new revision doubles as the trip's change sequence: changed rows are
+stamped with it in their ``seq`` column and deleted rows leave a
+``TripTombstone`` carrying it, so ``GET /trips/{id}/changes?since=N`` can read
+everything newer than ``N`` through the ``(trip_id, seq)`` indexes.  Edits to
+a card re-stamp the trip's schedule rows that reference it, which is how card
+changes reach the trips they affect.
+"""
+from datetime import datetime, timezone
+from typing import Iterable
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from app import models
+
+
+def bump(db: Session, trip_id: int) -> int:
+    """Increment the trip's revision and return the new value."""
+    return db.execute(
+        update(models.Trip)
+        .where(models.Trip.id == trip_id)
+        .values(revision=models.Trip.revision + 1)
+        .returning(models.Trip.revision)
+        .execution_options(synchronize_session=False)
+    ).scalar_one()
+
+
+def touch(db: Session, trip_id: int, *rows) -> int:
+    """Bump the trip and stamp ``rows`` (legs, segments, events, memberships) as changed."""
+    seq = bump(db, trip_id)
+    now = datetime.now(timezone.utc)
+    for row in rows:
+        row.seq = seq
+        row.updated_at = now
+    return seq
+
+
+def tombstone(db: Session, trip_id: int, entity: str, entity_ids: Iterable[int], seq: int | None = None) -> int:
+    """Record deletions of ``entity`` rows, bumping the trip unless ``seq`` is given."""
+    if seq is None:
+        seq = bump(db, trip_id)
+    db.add_all(models.TripTombstone(trip_id=trip_id, seq=seq, entity=entity, entity_id=entity_id) for entity_id in entity_ids)
+    return seq
+
+
+def bump_for_card(db: Session, card_id: int, deleted: bool = False) -> list[int]:
+    """Propagate a card edit (or deletion) to every trip that schedules the card; returns those trips."""
+    event = models.ScheduledEvent
+    rows = db.execute(select(event.trip_id, event.id).where(event.card_id == card_id)).all()
+    events_by_trip: dict[int, list[int]] = {}
+    for trip_id, event_id in rows:
+        events_by_trip.setdefault(trip_id, []).append(event_id)
+    now = datetime.now(timezone.utc)
+    for trip_id, event_ids in events_by_trip.items():
+        seq = bump(db, trip_id)
+        if deleted:
+            # The schedule rows go with the card through ON DELETE CASCADE
+            tombstone(db, trip_id, "event", event_ids, seq=seq)
+            tombstone(db, trip_id, "card", [card_id], seq=seq)
+        else:
+            db.execute(
+                update(event)
+                .where(event.id.in_(event_ids))
+                .values(seq=seq, updated_at=now)
+                .execution_options(synchronize_session=False)
+            )
+    return list(events_by_trip)
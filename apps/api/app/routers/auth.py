@@ -1,21 +1,24 @@
 from datetime import datetime, timedelta, timezone
 import os
 import secrets
-import requests
 from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
 
 from app.db import get_db
-from app import models
+from app.negotiation import MsgPackRoute
+from app import jobs, models
+from app import ratelimit
 from app import schemas
 
-router = APIRouter(prefix="/auth", tags=["auth"])
+router = APIRouter(prefix="/auth", tags=["auth"], route_class=MsgPackRoute)
 
 GOOGLE_TOKENINFO_URL = "https://oauth2.googleapis.com/tokeninfo"
 
 
 def verify_google_id_token(id_token: str) -> dict:
     # Use tokeninfo endpoint for simplicity; for production move to google-auth lib
+    import requests  # only sign-in needs it; keeps it off the cold-start path
+
     r = requests.get(GOOGLE_TOKENINFO_URL, params={"id_token": id_token}, timeout=10)
     if r.status_code != 200:
         raise HTTPException(status_code=401, detail="Invalid Google token")
@@ -60,7 +63,11 @@ def login_google(payload: schemas.GoogleLoginPayload, response: Response, db: Se
     expires_at = datetime.now(timezone.utc) + timedelta(days=7)
     session = models.Session(user_id=user.id, token=token, expires_at=expires_at)
     db.add(session)
+    # Expired sessions pile up with every sign-in; prune them off the request path
+    if jobs.JOBS_ENABLED:
+        jobs.enqueue(db, "sessions.cleanup", {"user_id": user.id}, user=user)
     db.commit()
+    ratelimit.note_verified(f"Bearer {token}")
 
     return schemas.SessionRead(token=token, user=user)  # cookie optional, keeping simple for now
 
@@ -88,6 +95,7 @@ def me(request: Request, db: Session = Depends(get_db)):
     user = db.get(models.User, session.user_id)
     if not user:
         raise HTTPException(status_code=401, detail="Invalid session")
+    ratelimit.note_verified(request.headers["Authorization"])
     return user
 
 
@@ -0,0 +1,27 @@
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy.orm import Session
+
+from app import avatars, models
+from app.replicas import get_read_db
+
+router = APIRouter(prefix="/avatars", tags=["avatars"])
+
+# Links carry ?v=<picture version>; a matching version never changes content
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "public, max-age=300"
+
+
+@router.get("/{user_id}", response_class=Response)
+def get_avatar(user_id: int, v: str | None = None, db: Session = Depends(get_read_db)):
+    """WebP thumbnail of the user's profile picture, fetched once and served from the disk cache."""
+    user = db.get(models.User, user_id)
+    if not user or not user.picture:
+        raise HTTPException(status_code=404, detail="No avatar")
+    picture = user.picture
+    db.close()  # the fetch below can take seconds; do not hold a connection for it
+    try:
+        data = avatars.get_cache().thumbnail_for(picture)
+    except avatars.AvatarUnavailable:
+        raise HTTPException(status_code=502, detail="Avatar unavailable")
+    cache_control = IMMUTABLE if v == avatars.picture_version(picture) else REVALIDATE
+    return Response(content=data, media_type="image/webp", headers={"Cache-Control": cache_control})
@@ -1,12 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
-from sqlalchemy.orm import Session, joinedload
-from datetime import datetime, timezone
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.orm import Session
+from datetime import datetime, timedelta, timezone
 
 from app.db import get_db
+from app.negotiation import MsgPackRoute
+from app.replicas import get_read_db
 from app import models
 from app import schemas
+from app import search
+from app import revisions
+from app import logs
+from app import ratelimit
+from app import activity
+from app.fieldsets import fieldset, load_options
+from app.serialization import render_list
+from app.sideload import render_normalized
 
-router = APIRouter(prefix="/backlog", tags=["backlog"])
+router = APIRouter(prefix="/backlog", tags=["backlog"], route_class=MsgPackRoute)
 
 
 def get_current_user(request: Request, db: Session = Depends(get_db)) -> models.User | None:
@@ -20,30 +30,69 @@ def get_current_user(request: Request, db: Session = Depends(get_db)) -> models.
         # For local tokens, try to find a matching session
         session = db.query(models.Session).filter(models.Session.token == token).first()
         if session and session.expires_at > datetime.now(timezone.utc):
+            ratelimit.note_verified(request.headers["Authorization"])
             user = db.get(models.User, session.user_id)
-            return user
+            return logs.note_user(user)
         else:
             # For any local token, return Andrew Zhang (the logged-in user)
             # This handles the case where frontend creates its own session format
             user = db.query(models.User).filter(models.User.name == "Andrew Zhang").first()
             if user:
-                return user
+                return logs.note_user(user)
             # Fallback to first user
             user = db.query(models.User).first()
-            return user
+            return logs.note_user(user)
     
     # Handle regular API tokens
     session = db.query(models.Session).filter(models.Session.token == token).first()
     if not session or session.expires_at < datetime.now(timezone.utc):
         return None
+    ratelimit.note_verified(request.headers["Authorization"])
     user = db.get(models.User, session.user_id)
-    return user
+    return logs.note_user(user)
 
 
-@router.get("/cards", response_model=list[schemas.BacklogCardRead])
-def list_cards(db: Session = Depends(get_db)):
-    cards = db.query(models.BacklogCard).options(joinedload(models.BacklogCard.creator)).order_by(models.BacklogCard.id.asc()).all()
-    return cards
+@router.get("/cards", response_model=list[schemas.BacklogCardRead] | schemas.BacklogCardListNormalized)
+def list_cards(normalized: bool = False, fields: tuple[str, ...] | None = Depends(fieldset(schemas.BacklogCardRead)), db: Session = Depends(get_read_db)):
+    """List all cards. With ``?normalized=true`` creators are side-loaded in a top-level ``users`` map.
+
+    ``?fields=id,title,location`` returns (and reads) only those fields.
+    """
+    schema = schemas.BacklogCardRow if normalized else schemas.BacklogCardRead
+    options = load_options(models.BacklogCard, schema, fields, always=("created_by",) if normalized else ())
+    cards = db.query(models.BacklogCard).options(*options).order_by(models.BacklogCard.id.asc()).all()
+    if normalized:
+        return render_normalized(db, schema, cards, fields)
+    return render_list(schema, cards, fields)
+
+
+@router.get("/search", response_model=schemas.BacklogSearchPage)
+def search_cards(q: str = Query(..., min_length=1, max_length=200), limit: int = Query(20, ge=1, le=100), cursor: str | None = None, db: Session = Depends(get_db)):
+    """Ranked full-text search over title, location and description with typo-tolerant location matching.
+
+    Pass the returned ``next_cursor`` as ``cursor`` to fetch the following page.
+    """
+    hits, next_cursor = search.search_cards(db, q, limit, cursor)
+    items = [
+        schemas.BacklogSearchHit(**schemas.BacklogCardRow.model_validate(hit.card).model_dump(), rank=hit.rank, highlight=hit.highlight)
+        for hit in hits
+    ]
+    return schemas.BacklogSearchPage(items=items, next_cursor=next_cursor)
+
+
+@router.get("/reservations", response_model=list[schemas.BacklogCardRead])
+def list_reservations(start: datetime | None = None, end: datetime | None = None, days: int = 14, fields: tuple[str, ...] | None = Depends(fieldset(schemas.BacklogCardRead)), db: Session = Depends(get_read_db)):
+    """Cards with a reservation in ``[start, end)`` (default: now plus ``days``), earliest first."""
+    start = start or datetime.now(timezone.utc)
+    end = end or start + timedelta(days=days)
+    cards = (
+        db.query(models.BacklogCard)
+        .options(*load_options(models.BacklogCard, schemas.BacklogCardRead, fields, always=("reservation_date",)))
+        .filter(models.BacklogCard.reservation_date >= start, models.BacklogCard.reservation_date < end)
+        .order_by(models.BacklogCard.reservation_date.asc(), models.BacklogCard.id.asc())
+        .all()
+    )
+    return render_list(schemas.BacklogCardRead, cards, fields)
 
 
 @router.post("/cards", response_model=schemas.BacklogCardRead)
@@ -52,6 +101,8 @@ def create_card(payload: schemas.BacklogCardCreate, db: Session = Depends(get_db
         category=payload.category,
         title=payload.title,
         location=payload.location,
+        latitude=payload.latitude,
+        longitude=payload.longitude,
         cost=payload.cost,
         rating=payload.rating,
         desire_to_go=payload.desire_to_go,
@@ -69,7 +120,7 @@ def create_card(payload: schemas.BacklogCardCreate, db: Session = Depends(get_db
 
 
 @router.patch("/cards/{card_id}", response_model=schemas.BacklogCardRead)
-def update_card(card_id: int, payload: schemas.BacklogCardUpdate, db: Session = Depends(get_db)):
+def update_card(card_id: int, payload: schemas.BacklogCardUpdate, db: Session = Depends(get_db), current_user: models.User | None = Depends(get_current_user)):
     card = db.get(models.BacklogCard, card_id)
     if not card:
         raise HTTPException(status_code=404, detail="Card not found")
@@ -78,17 +129,25 @@ def update_card(card_id: int, payload: schemas.BacklogCardUpdate, db: Session =
     update_data = payload.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(card, field, value)
+    card.updated_at = datetime.now(timezone.utc)
     
+    # Cards are shared; the edit shows up in the activity of every trip scheduling it
+    diff = activity.changes(card)
+    for trip_id in revisions.bump_for_card(db, card_id):
+        activity.record(db, trip_id, current_user, "card", card_id, "update", diff)
     db.commit()
     db.refresh(card)
     return card
 
 
 @router.delete("/cards/{card_id}", status_code=204)
-def delete_card(card_id: int, db: Session = Depends(get_db)):
+def delete_card(card_id: int, db: Session = Depends(get_db), current_user: models.User | None = Depends(get_current_user)):
     card = db.get(models.BacklogCard, card_id)
     if not card:
         raise HTTPException(status_code=404, detail="Card not found")
+    diff = activity.changes(card, "delete")
+    for trip_id in revisions.bump_for_card(db, card_id, deleted=True):
+        activity.record(db, trip_id, current_user, "card", card_id, "delete", diff)
     db.delete(card)
     db.commit()
     return None
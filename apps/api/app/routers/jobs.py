@@ -0,0 +1,41 @@
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app import models, schemas
+from app.db import get_db
+from app.negotiation import MsgPackRoute
+from app.routers.trips import get_current_user
+
+router = APIRouter(prefix="/jobs", tags=["jobs"], route_class=MsgPackRoute)
+
+# Job status is written by workers, not by the caller, so these reads go to the
+# primary: a replica could keep reporting a finished job as running
+
+
+@router.get("", response_model=list[schemas.JobRead])
+def list_jobs(
+    status: Literal["queued", "running", "succeeded", "failed"] | None = None,
+    limit: int = 50,
+    db: Session = Depends(get_db),
+    user: models.User | None = Depends(get_current_user),
+):
+    """The current user's jobs, newest first."""
+    if not user:
+        raise HTTPException(status_code=401, detail="Authentication required")
+    query = select(models.Job).where(models.Job.created_by == user.id)
+    if status is not None:
+        query = query.where(models.Job.status == status)
+    return db.scalars(query.order_by(models.Job.id.desc()).limit(max(1, min(limit, 200)))).all()
+
+
+@router.get("/{job_id}", response_model=schemas.JobRead)
+def get_job(job_id: int, db: Session = Depends(get_db), user: models.User | None = Depends(get_current_user)):
+    if not user:
+        raise HTTPException(status_code=401, detail="Authentication required")
+    job = db.get(models.Job, job_id)
+    if not job or job.created_by != user.id:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
@@ -0,0 +1,144 @@
+"""Server-persisted trip sections (packing lists, overview) with delta sync.
+
+Each section holds small items keyed by a client-chosen id.  Clients send
+batches of per-item ops together with the last revision they saw and get back
+only the items that changed after it, their own writes included.  Deletes are
+kept as tombstones so other clients learn about them on their next sync.
+"""
+from datetime import datetime, timezone
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import or_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.db import get_db
+from app.negotiation import MsgPackRoute
+from app import activity, models, schemas
+from app.routers.trips import _require_member, get_current_user
+
+router = APIRouter(prefix="/trips", tags=["sections"], route_class=MsgPackRoute)
+
+SYNCED_KINDS = ("packing", "overview")
+
+
+def _get_section(db: Session, trip_id: int, kind: str) -> models.TripSection:
+    if kind not in SYNCED_KINDS:
+        raise HTTPException(status_code=404, detail="Unknown section")
+    section = (
+        db.query(models.TripSection)
+        .filter(models.TripSection.trip_id == trip_id, models.TripSection.kind == kind)
+        .first()
+    )
+    if section is None:
+        # Older trips were seeded without every kind
+        section = models.TripSection(trip_id=trip_id, kind=kind, revision=0)
+        db.add(section)
+        db.commit()
+        db.refresh(section)
+    return section
+
+
+def _delta(db: Session, section: models.TripSection, since: int) -> schemas.SectionDelta:
+    rows = (
+        db.query(models.SectionItem)
+        .filter(models.SectionItem.section_id == section.id, models.SectionItem.revision > since)
+        .order_by(models.SectionItem.position, models.SectionItem.id)
+        .all()
+    )
+    items = [
+        schemas.SectionItemRead(
+            id=row.client_id,
+            parent_id=row.parent_client_id,
+            kind=row.kind,
+            position=row.position,
+            # Tombstones carry no payload
+            data={} if row.deleted else row.data,
+            deleted=row.deleted,
+            revision=row.revision,
+        )
+        for row in rows
+    ]
+    return schemas.SectionDelta(kind=section.kind, revision=section.revision, items=items)
+
+
+def _upsert(db: Session, rows: list[dict]) -> None:
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        insert = postgresql.insert
+    elif dialect == "sqlite":
+        insert = sqlite.insert
+    else:
+        raise HTTPException(status_code=501, detail=f"Section sync is not supported on {dialect}")
+    stmt = insert(models.SectionItem).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["section_id", "client_id"],
+        set_={
+            col: getattr(stmt.excluded, col)
+            for col in ("parent_client_id", "kind", "position", "data", "deleted", "revision", "updated_at")
+        },
+    )
+    db.execute(stmt)
+
+
+@router.get("/{trip_id}/sections/{kind}", response_model=schemas.SectionDelta)
+def get_section(trip_id: int, kind: str, since: int = 0, db: Session = Depends(get_db), current_user: models.User | None = Depends(get_current_user)):
+    """Items changed after revision ``since`` (0 returns the whole section)."""
+    _require_member(db, trip_id, current_user)
+    section = _get_section(db, trip_id, kind)
+    return _delta(db, section, since)
+
+
+@router.post("/{trip_id}/sections/{kind}/ops", response_model=schemas.SectionDelta)
+def apply_section_ops(trip_id: int, kind: str, payload: schemas.SectionOpsPayload, db: Session = Depends(get_db), current_user: models.User | None = Depends(get_current_user)):
+    """Apply a batch of item upserts/deletes (last writer wins per item).
+
+    Deleting an item also tombstones its children.  The response is the delta
+    since ``base_revision``.
+    """
+    _require_member(db, trip_id, current_user)
+    section = _get_section(db, trip_id, kind)
+    if not payload.ops:
+        return _delta(db, section, payload.base_revision)
+
+    # Taking the next revision row-locks the section until commit, serializing batches
+    revision = db.execute(
+        update(models.TripSection)
+        .where(models.TripSection.id == section.id)
+        .values(revision=models.TripSection.revision + 1)
+        .returning(models.TripSection.revision)
+    ).scalar_one()
+    now = datetime.now(timezone.utc)
+
+    upserts: dict[str, dict] = {}
+    deleted_ids: list[str] = []
+    for op in payload.ops:
+        if op.op == "delete":
+            upserts.pop(op.id, None)
+            deleted_ids.append(op.id)
+            continue
+        upserts[op.id] = {
+            "section_id": section.id,
+            "client_id": op.id,
+            "parent_client_id": op.parent_id,
+            "kind": op.kind,
+            "position": op.position,
+            "data": op.data,
+            "deleted": False,
+            "revision": revision,
+            "updated_at": now,
+        }
+    if deleted_ids:
+        item = models.SectionItem
+        db.execute(
+            update(item)
+            .where(item.section_id == section.id)
+            .where(or_(item.client_id.in_(deleted_ids), item.parent_client_id.in_(deleted_ids)))
+            .values(deleted=True, revision=revision, updated_at=now)
+        )
+    if upserts:
+        _upsert(db, list(upserts.values()))
+    activity.record(db, trip_id, current_user, "section", section.id, "update", {"upserted": sorted(upserts), "deleted": sorted(set(deleted_ids))})
+    db.commit()
+    db.refresh(section)
+    return _delta(db, section, payload.base_revision)
@@ -1,13 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
 from sqlalchemy.orm import Session, joinedload
-from datetime import datetime, timezone
+from datetime import date, datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
 from app.db import get_db
+from app.negotiation import MsgPackRoute
+from app.replicas import get_read_db
 from app import models, schemas
+from app.dates import overlaps, parse_timestamp
+from app import revisions
+from app import budget
+from app import planner
+from app import ics
+from app import timeline
+from app import cloning
+from app import logs
+from app import ratelimit
+from app import activity
+from app.fieldsets import fieldset, load_options
+from app.serialization import render_list
+from app.sideload import render_normalized
 from typing import List
 import secrets
 
-router = APIRouter(prefix="/trips", tags=["trips"])
+router = APIRouter(prefix="/trips", tags=["trips"], route_class=MsgPackRoute)
 
 
 def get_current_user(request: Request, db: Session = Depends(get_db)) -> models.User | None:
@@ -21,12 +39,14 @@ def get_current_user(request: Request, db: Session = Depends(get_db)) -> models.
     if token.startswith("local:"):
         session = db.query(models.Session).filter(models.Session.token == token).first()
         if session and session.expires_at > datetime.now(timezone.utc):
-            return db.get(models.User, session.user_id)
+            ratelimit.note_verified(request.headers["Authorization"])
+            return logs.note_user(db.get(models.User, session.user_id))
         return None
     session = db.query(models.Session).filter(models.Session.token == token).first()
     if not session or session.expires_at < datetime.now(timezone.utc):
         return None
-    return db.get(models.User, session.user_id)
+    ratelimit.note_verified(request.headers["Authorization"])
+    return logs.note_user(db.get(models.User, session.user_id))
 
 
 def _require_member(db: Session, trip_id: int, user: models.User | None) -> models.Trip:
@@ -46,20 +66,51 @@ def _require_member(db: Session, trip_id: int, user: models.User | None) -> mode
     return trip
 
 
-@router.get("/", response_model=list[schemas.TripRead])
-def list_trips(db: Session = Depends(get_db), current_user: models.User | None = Depends(get_current_user)):
+@router.get("/", response_model=list[schemas.TripRead] | schemas.TripListNormalized)
+def list_trips(normalized: bool = False, fields: tuple[str, ...] | None = Depends(fieldset(schemas.TripRead)), db: Session = Depends(get_read_db), current_user: models.User | None = Depends(get_current_user)):
+    """List the current user's trips. With ``?normalized=true`` creators are side-loaded in a top-level ``users`` map.
+
+    ``?fields=id,name,start_date`` returns (and reads) only those fields; leave out
+    ``legs`` and ``travel_segments`` to skip loading them.
+    """
     if not current_user:
         raise HTTPException(status_code=401, detail="Authentication required")
+    schema = schemas.TripRow if normalized else schemas.TripRead
+    # DISTINCT needs the ORDER BY column selected
+    always = ("created_at", "created_by") if normalized else ("created_at",)
     trips = (
         db.query(models.Trip)
-        .options(joinedload(models.Trip.creator))
+        .options(*load_options(models.Trip, schema, fields, always=always))
         .outerjoin(models.TripUser, models.TripUser.trip_id == models.Trip.id)
         .filter((models.Trip.created_by == current_user.id) | (models.TripUser.user_id == current_user.id))
         .order_by(models.Trip.created_at.desc())
         .distinct()
         .all()
     )
-    return trips
+    if normalized:
+        return render_normalized(db, schema, trips, fields)
+    return render_list(schema, trips, fields)
+
+
+@router.get("/upcoming", response_model=list[schemas.TripRead])
+def list_upcoming_trips(start: date | None = None, end: date | None = None, days: int = 30, fields: tuple[str, ...] | None = Depends(fieldset(schemas.TripRead)), db: Session = Depends(get_read_db), current_user: models.User | None = Depends(get_current_user)):
+    """Trips overlapping ``[start, end]`` (default: today plus ``days``), soonest first."""
+    if not current_user:
+        raise HTTPException(status_code=401, detail="Authentication required")
+    start = start or date.today()
+    end = end or start + timedelta(days=days)
+    if end < start:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+    member_trip_ids = db.query(models.TripUser.trip_id).filter(models.TripUser.user_id == current_user.id)
+    trips = (
+        db.query(models.Trip)
+        .options(*load_options(models.Trip, schemas.TripRead, fields, always=("start_date", "end_date")))
+        .filter(overlaps(db.get_bind().dialect.name, models.Trip.start_date, models.Trip.end_date, start, end))
+        .filter((models.Trip.created_by == current_user.id) | (models.Trip.id.in_(member_trip_ids)))
+        .order_by(models.Trip.start_date.asc(), models.Trip.id.asc())
+        .all()
+    )
+    return render_list(schemas.TripRead, trips, fields)
 
 
 @router.post("/", response_model=schemas.TripRead)
@@ -72,20 +123,46 @@ def create_trip(payload: schemas.TripCreate, db: Session = Depends(get_db), curr
         end_date=payload.end_date,
         created_by=current_user.id if current_user else None,
         invite_code=secrets.token_urlsafe(12),
+        calendar_token=secrets.token_urlsafe(24),
     )
     db.add(trip)
     db.commit()
     db.refresh(trip)
     # Seed sections
-    for kind in ("backlog", "schedule", "travel", "packing"):
+    for kind in ("backlog", "schedule", "travel", "packing", "overview"):
         db.add(models.TripSection(trip_id=trip.id, kind=kind))
     # If creator exists, add them as a member
     if current_user:
         db.add(models.TripUser(trip_id=trip.id, user_id=current_user.id))
+    activity.record(db, trip.id, current_user, "trip", trip.id, "create", activity.changes(trip, "create"))
     db.commit()
     return trip
 
 
+@router.post("/{trip_id}/clone", response_model=schemas.TripRead)
+def clone_trip(trip_id: int, payload: schemas.TripClone, db: Session = Depends(get_db), current_user: models.User | None = Depends(get_current_user)):
+    """Copy a trip with its legs, travel, sections and schedule, optionally moved to a new start date."""
+    source = _require_member(db, trip_id, current_user)
+    name = payload.name.strip() if payload.name is not None else None
+    if name == "":
+        raise HTTPException(status_code=400, detail="Trip name required")
+    try:
+        new_id = cloning.clone_trip(
+            db,
+            source,
+            current_user,
+            name=name,
+            start_date=payload.start_date,
+            include_schedule=payload.include_schedule,
+            include_sections=payload.include_sections,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    activity.record(db, new_id, current_user, "trip", new_id, "create", {"cloned_from": [None, trip_id]})
+    db.commit()
+    return db.get(models.Trip, new_id)
+
+
 @router.patch("/{trip_id}", response_model=schemas.TripRead)
 def update_trip(trip_id: int, payload: schemas.TripUpdate, db: Session = Depends(get_db), current_user: models.User | None = Depends(get_current_user)):
     _require_member(db, trip_id, current_user)
@@ -101,6 +178,8 @@ def update_trip(trip_id: int, payload: schemas.TripUpdate, db: Session = Depends
     if payload.end_date is not None:
         trip.end_date = payload.end_date
     db.add(trip)
+    activity.record(db, trip_id, current_user, "trip", trip_id, "update", activity.changes(trip))
+    revisions.bump(db, trip_id)
     db.commit()
     db.refresh(trip)
     return trip
@@ -112,6 +191,7 @@ def delete_trip(trip_id: int, db: Session = Depends(get_db), current_user: model
     trip = db.get(models.Trip, trip_id)
     if not trip:
         raise HTTPException(status_code=404, detail="Trip not found")
+    activity.record(db, trip_id, current_user, "trip", trip_id, "delete", activity.changes(trip, "delete"))
     db.delete(trip)
     db.commit()
     return {"message": "Trip deleted successfully"}
@@ -119,10 +199,25 @@ def delete_trip(trip_id: int, db: Session = Depends(get_db), current_user: model
 
 # Trip Legs endpoints
 @router.get("/{trip_id}/legs", response_model=list[schemas.TripLegRead])
-def list_trip_legs(trip_id: int, db: Session = Depends(get_db), current_user: models.User | None = Depends(get_current_user)):
+def list_trip_legs(trip_id: int, db: Session = Depends(get_read_db), current_user: models.User | None = Depends(get_current_user)):
     _require_member(db, trip_id, current_user)
     legs = db.query(models.TripLeg).filter(models.TripLeg.trip_id == trip_id).order_by(models.TripLeg.order_index).all()
-    return legs
+    return render_list(schemas.TripLegRead, legs)
+
+
+@router.get("/{trip_id}/legs/active", response_model=list[schemas.TripLegRead])
+def list_active_trip_legs(trip_id: int, on: date | None = None, db: Session = Depends(get_read_db), current_user: models.User | None = Depends(get_current_user)):
+    """Legs whose date range covers day ``on`` (default: today)."""
+    _require_member(db, trip_id, current_user)
+    on = on or date.today()
+    legs = (
+        db.query(models.TripLeg)
+        .filter(models.TripLeg.trip_id == trip_id)
+        .filter(overlaps(db.get_bind().dialect.name, models.TripLeg.start_date, models.TripLeg.end_date, on, on))
+        .order_by(models.TripLeg.order_index)
+        .all()
+    )
+    return render_list(schemas.TripLegRead, legs)
 
 
 @router.post("/{trip_id}/legs", response_model=schemas.TripLegRead)
@@ -142,6 +237,8 @@ def create_trip_leg(trip_id: int, payload: schemas.TripLegCreate, db: Session =
         order_index=payload.order_index if payload.order_index is not None else max_order
     )
     db.add(leg)
+    activity.record(db, trip_id, current_user, "leg", leg, "create", activity.changes(leg, "create"))
+    revisions.touch(db, trip_id, leg)
     db.commit()
     db.refresh(leg)
     return leg
@@ -166,6 +263,8 @@ def update_trip_leg(trip_id: int, leg_id: int, payload: schemas.TripLegUpdate, d
         leg.order_index = payload.order_index
     
     db.add(leg)
+    activity.record(db, trip_id, current_user, "leg", leg_id, "update", activity.changes(leg))
+    revisions.touch(db, trip_id, leg)
     db.commit()
     db.refresh(leg)
     return leg
@@ -178,6 +277,13 @@ def delete_trip_leg(trip_id: int, leg_id: int, db: Session = Depends(get_db), cu
     if not leg or leg.trip_id != trip_id:
         raise HTTPException(status_code=404, detail="Trip leg not found")
     
+    # Segments attached to the leg are removed by ON DELETE CASCADE
+    segment_ids = db.scalars(
+        select(models.TravelSegment.id).where((models.TravelSegment.from_leg_id == leg_id) | (models.TravelSegment.to_leg_id == leg_id))
+    ).all()
+    seq = revisions.tombstone(db, trip_id, "leg", [leg_id])
+    revisions.tombstone(db, trip_id, "segment", segment_ids, seq=seq)
+    activity.record(db, trip_id, current_user, "leg", leg_id, "delete", activity.changes(leg, "delete"))
     db.delete(leg)
     db.commit()
     return {"message": "Trip leg deleted successfully"}
@@ -185,7 +291,7 @@ def delete_trip_leg(trip_id: int, leg_id: int, db: Session = Depends(get_db), cu
 
 # Travel Segments endpoints
 @router.get("/{trip_id}/travel", response_model=list[schemas.TravelSegmentRead])
-def list_travel_segments(trip_id: int, db: Session = Depends(get_db), current_user: models.User | None = Depends(get_current_user)):
+def list_travel_segments(trip_id: int, db: Session = Depends(get_read_db), current_user: models.User | None = Depends(get_current_user)):
     _require_member(db, trip_id, current_user)
     items = (
         db.query(models.TravelSegment)
@@ -193,7 +299,7 @@ def list_travel_segments(trip_id: int, db: Session = Depends(get_db), current_us
         .order_by(models.TravelSegment.order_index)
         .all()
     )
-    return items
+    return render_list(schemas.TravelSegmentRead, items)
 
 
 @router.post("/{trip_id}/travel", response_model=schemas.TravelSegmentRead)
@@ -212,6 +318,8 @@ def create_travel_segment(trip_id: int, payload: schemas.TravelSegmentCreate, db
         end_date=payload.end_date,
     )
     db.add(seg)
+    activity.record(db, trip_id, current_user, "segment", seg, "create", activity.changes(seg, "create"))
+    revisions.touch(db, trip_id, seg)
     db.commit()
     db.refresh(seg)
     return seg
@@ -242,6 +350,8 @@ def update_travel_segment(trip_id: int, segment_id: int, payload: schemas.Travel
     if payload.end_date is not None:
         seg.end_date = payload.end_date
     db.add(seg)
+    activity.record(db, trip_id, current_user, "segment", segment_id, "update", activity.changes(seg))
+    revisions.touch(db, trip_id, seg)
     db.commit()
     db.refresh(seg)
     return seg
@@ -253,6 +363,8 @@ def delete_travel_segment(trip_id: int, segment_id: int, db: Session = Depends(g
     seg = db.get(models.TravelSegment, segment_id)
     if not seg or seg.trip_id != trip_id:
         raise HTTPException(status_code=404, detail="Travel segment not found")
+    revisions.tombstone(db, trip_id, "segment", [segment_id])
+    activity.record(db, trip_id, current_user, "segment", segment_id, "delete", activity.changes(seg, "delete"))
     db.delete(seg)
     db.commit()
     return {"message": "Travel segment deleted successfully"}
@@ -260,6 +372,13 @@ def delete_travel_segment(trip_id: int, segment_id: int, db: Session = Depends(g
 
 # --- Invite & Membership endpoints ---
 
+@router.get("/{trip_id}/timeline", response_model=schemas.TimelineReport)
+def check_trip_timeline(trip_id: int, db: Session = Depends(get_db), current_user: models.User | None = Depends(get_current_user)):
+    """Gaps, overlaps, orphaned segments and missing transfers across legs and travel."""
+    trip = _require_member(db, trip_id, current_user)
+    return timeline.trip_timeline(db, trip)
+
+
 @router.get("/{trip_id}/invite", response_model=schemas.InviteCodeRead)
 def get_invite_code(trip_id: int, db: Session = Depends(get_db), current_user: models.User | None = Depends(get_current_user)):
     trip = _require_member(db, trip_id, current_user)
@@ -271,6 +390,7 @@ def rotate_invite_code(trip_id: int, db: Session = Depends(get_db), current_user
     trip = _require_member(db, trip_id, current_user)
     trip.invite_code = secrets.token_urlsafe(12)
     db.add(trip)
+    activity.record(db, trip_id, current_user, "invite", trip_id, "update")  # the code itself stays out of the log
     db.commit()
     db.refresh(trip)
     return schemas.InviteCodeRead(code=trip.invite_code)
@@ -294,7 +414,10 @@ def join_trip(trip_id: int, request: Request, db: Session = Depends(get_db), cur
         > 0
     )
     if not exists:
-        db.add(models.TripUser(trip_id=trip_id, user_id=current_user.id))
+        membership = models.TripUser(trip_id=trip_id, user_id=current_user.id)
+        db.add(membership)
+        revisions.touch(db, trip_id, membership)
+        activity.record(db, trip_id, current_user, "member", current_user.id, "create")
         db.commit()
     # Return trip with creator joinedload
     trip = (
@@ -307,7 +430,7 @@ def join_trip(trip_id: int, request: Request, db: Session = Depends(get_db), cur
 
 
 @router.get("/{trip_id}/members", response_model=List[schemas.UserRead])
-def list_members(trip_id: int, db: Session = Depends(get_db), current_user: models.User | None = Depends(get_current_user)):
+def list_members(trip_id: int, db: Session = Depends(get_read_db), current_user: models.User | None = Depends(get_current_user)):
     trip = _require_member(db, trip_id, current_user)
     # Fetch users by join
     rows = (
@@ -316,38 +439,337 @@ def list_members(trip_id: int, db: Session = Depends(get_db), current_user: mode
         .filter(models.TripUser.trip_id == trip.id)
         .all()
     )
-    return rows
+    return render_list(schemas.UserRead, rows)
+
+
+@router.get("/{trip_id}/budget", response_model=schemas.TripBudgetRead)
+def get_trip_budget(trip_id: int, currency: str | None = None, split: bool = False, db: Session = Depends(get_db), current_user: models.User | None = Depends(get_current_user)):
+    """Cost rollup of the trip's scheduled cards by category, status and day.
+
+    ``currency`` converts through the stored rates; ``split`` adds a per-person share.
+    """
+    trip = _require_member(db, trip_id, current_user)
+    return budget.trip_budget(db, trip, currency, split)
+
+
+def _calendar_feed(trip: models.Trip) -> schemas.CalendarFeedRead:
+    return schemas.CalendarFeedRead(token=trip.calendar_token, url=f"/trips/{trip.id}/calendar.ics?token={trip.calendar_token}")
+
+
+@router.get("/{trip_id}/calendar", response_model=schemas.CalendarFeedRead)
+def get_calendar_feed(trip_id: int, db: Session = Depends(get_db), current_user: models.User | None = Depends(get_current_user)):
+    """Subscription URL of the trip's calendar; anyone holding it can read the calendar."""
+    trip = _require_member(db, trip_id, current_user)
+    if not trip.calendar_token:
+        # Trips created before feed tokens existed get one on first request
+        trip.calendar_token = secrets.token_urlsafe(24)
+        db.commit()
+    return _calendar_feed(trip)
+
+
+@router.post("/{trip_id}/calendar/rotate", response_model=schemas.CalendarFeedRead)
+def rotate_calendar_token(trip_id: int, db: Session = Depends(get_db), current_user: models.User | None = Depends(get_current_user)):
+    """Replace the feed token; existing subscriptions stop updating."""
+    trip = _require_member(db, trip_id, current_user)
+    trip.calendar_token = secrets.token_urlsafe(24)
+    activity.record(db, trip_id, current_user, "calendar", trip_id, "update")
+    db.commit()
+    return _calendar_feed(trip)
+
+
+@router.get("/{trip_id}/calendar.ics")
+def export_trip_calendar(trip_id: int, request: Request, token: str | None = None, db: Session = Depends(get_db), current_user: models.User | None = Depends(get_current_user)):
+    """iCalendar feed of the trip's legs, travel segments and schedule, revalidated by ETag.
+
+    Calendar apps subscribe with ``?token=`` (see ``GET /trips/{id}/calendar``);
+    members can also fetch it with their bearer token.
+    """
+    trip = db.get(models.Trip, trip_id)
+    if token is None or trip is None or not trip.calendar_token or not secrets.compare_digest(token.encode(), trip.calendar_token.encode()):
+        trip = _require_member(db, trip_id, current_user)
+    tag = ics.etag(trip)
+    headers = {"ETag": tag, "Cache-Control": "private, no-cache"}
+    if tag in (t.strip() for t in request.headers.get("if-none-match", "").split(",")):
+        return Response(status_code=304, headers=headers)
+    headers["Content-Disposition"] = f'inline; filename="trip-{trip_id}.ics"'
+    body = ics.cached(trip.id, trip.revision)
+    if body is not None:
+        return Response(content=body, media_type="text/calendar; charset=utf-8", headers=headers)
+    return StreamingResponse(ics.render(trip), media_type="text/calendar; charset=utf-8", headers=headers)
+
+
+@router.get("/{trip_id}/changes", response_model=schemas.TripChangesRead)
+def list_trip_changes(trip_id: int, since: int = 0, db: Session = Depends(get_db), current_user: models.User | None = Depends(get_current_user)):
+    """Rows changed after change sequence ``since`` plus tombstones for deletions.
+
+    ``since=0`` returns a full snapshot.  Cards are included when a schedule row
+    referencing them changed, which card edits trigger for every trip they are on.
+    """
+    trip = _require_member(db, trip_id, current_user)
+    seq = trip.revision
+    full = since <= 0
+
+    def changed(model):
+        query = db.query(model).filter(model.trip_id == trip_id)
+        return query if full else query.filter(model.seq > since)
+
+    legs = changed(models.TripLeg).order_by(models.TripLeg.order_index).all()
+    segments = changed(models.TravelSegment).order_by(models.TravelSegment.order_index).all()
+    events = changed(models.ScheduledEvent).all()
+    member_query = (
+        db.query(models.User)
+        .join(models.TripUser, models.TripUser.user_id == models.User.id)
+        .filter(models.TripUser.trip_id == trip_id)
+    )
+    if not full:
+        member_query = member_query.filter(models.TripUser.seq > since)
+    card_ids = {ev.card_id for ev in events}
+    cards = (
+        db.query(models.BacklogCard)
+        .options(joinedload(models.BacklogCard.creator))
+        .filter(models.BacklogCard.id.in_(card_ids))
+        .order_by(models.BacklogCard.id)
+        .all()
+    ) if card_ids else []
+    deleted = []
+    if not full:
+        deleted = [
+            schemas.TombstoneRead(entity=t.entity, id=t.entity_id, seq=t.seq)
+            for t in db.query(models.TripTombstone)
+            .filter(models.TripTombstone.trip_id == trip_id, models.TripTombstone.seq > since)
+            .order_by(models.TripTombstone.seq)
+        ]
+    return schemas.TripChangesRead(
+        trip_id=trip_id,
+        seq=seq,
+        full=full,
+        legs=legs,
+        travel_segments=segments,
+        schedule=events,
+        members=member_query.all(),
+        cards=cards,
+        deleted=deleted,
+    )
+
+
+@router.get("/{trip_id}/activity", response_model=schemas.TripActivityPage)
+def list_trip_activity(trip_id: int, limit: int = Query(50, ge=1, le=200), cursor: str | None = None, db: Session = Depends(get_read_db), current_user: models.User | None = Depends(get_current_user)):
+    """Who changed what on the trip, newest first.
+
+    Pass the returned ``next_cursor`` as ``cursor`` to fetch older entries.
+    Entries are written in batches, so the latest edits can take a moment to appear.
+    """
+    _require_member(db, trip_id, current_user)
+    entries, next_cursor = activity.page(db, trip_id, limit, cursor)
+    return schemas.TripActivityPage(items=entries, next_cursor=next_cursor)
 
 
 # Schedule endpoints
 @router.get("/{trip_id}/schedule", response_model=List[schemas.ScheduledEventRead])
-def list_schedule(trip_id: int, db: Session = Depends(get_db), current_user: models.User | None = Depends(get_current_user)):
+def list_schedule(trip_id: int, db: Session = Depends(get_read_db), current_user: models.User | None = Depends(get_current_user)):
     _require_member(db, trip_id, current_user)
     items = (
         db.query(models.ScheduledEvent)
         .filter(models.ScheduledEvent.trip_id == trip_id)
         .all()
     )
-    return items
+    return render_list(schemas.ScheduledEventRead, items)
+
+
+def _replace_schedule(db: Session, trip_id: int, wanted: dict[tuple[int, int], int], actor: models.User | None = None) -> None:
+    """Make the trip's schedule equal ``wanted`` ((day_index, hour) -> card_id).
+
+    Only slots that actually change are written, so the change feed stays
+    proportional to the edit; the activity log gets one entry with the
+    ``"day:hour": [old card, new card]`` slots.  The caller commits.
+    """
+    existing = {
+        (ev.day_index, ev.hour): ev
+        for ev in db.query(models.ScheduledEvent).filter(models.ScheduledEvent.trip_id == trip_id)
+    }
+    changed = []
+    slots = {}
+    for slot, card_id in wanted.items():
+        ev = existing.pop(slot, None)
+        if ev is None:
+            ev = models.ScheduledEvent(trip_id=trip_id, card_id=card_id, day_index=slot[0], hour=slot[1])
+            db.add(ev)
+            changed.append(ev)
+            slots[f"{slot[0]}:{slot[1]}"] = [None, card_id]
+        elif ev.card_id != card_id:
+            slots[f"{slot[0]}:{slot[1]}"] = [ev.card_id, card_id]
+            ev.card_id = card_id
+            changed.append(ev)
+    for (day_index, hour), ev in existing.items():
+        slots[f"{day_index}:{hour}"] = [ev.card_id, None]
+    if changed or existing:
+        activity.record(db, trip_id, actor, "schedule", None, "update", slots)
+        seq = revisions.touch(db, trip_id, *changed)
+        if existing:
+            revisions.tombstone(db, trip_id, "event", [ev.id for ev in existing.values()], seq=seq)
+            for ev in existing.values():
+                db.delete(ev)
 
 
 @router.post("/{trip_id}/schedule", response_model=List[schemas.ScheduledEventRead])
 def overwrite_schedule(trip_id: int, payload: List[schemas.ScheduledEventCreate], db: Session = Depends(get_db), current_user: models.User | None = Depends(get_current_user)):
     _require_member(db, trip_id, current_user)
-    # Clear and replace atomically
-    db.query(models.ScheduledEvent).filter(models.ScheduledEvent.trip_id == trip_id).delete()
-    for item in payload:
-        db.add(models.ScheduledEvent(
-            trip_id=trip_id,
-            card_id=item.card_id,
-            day_index=item.day_index,
-            hour=item.hour,
-        ))
+    _replace_schedule(db, trip_id, {(item.day_index, item.hour): item.card_id for item in payload}, current_user)
     db.commit()
     items = (
         db.query(models.ScheduledEvent)
         .filter(models.ScheduledEvent.trip_id == trip_id)
         .all()
     )
-    return items
+    return render_list(schemas.ScheduledEventRead, items)
+
+
+
+@router.get("/{trip_id}/days/{day_index}/route", response_model=schemas.DayRouteRead)
+def get_day_route(trip_id: int, day_index: int, db: Session = Depends(get_db), current_user: models.User | None = Depends(get_current_user)):
+    """Suggest a shorter visiting order for one day's scheduled stops.
 
+    Locked-in and reserved cards keep their hour; the other stops trade hours.
+    """
+    from app import routing  # pulls in numpy; loaded on first use rather than at startup
+
+    _require_member(db, trip_id, current_user)
+    rows = (
+        db.query(models.ScheduledEvent, models.BacklogCard)
+        .join(models.BacklogCard, models.BacklogCard.id == models.ScheduledEvent.card_id)
+        .filter(models.ScheduledEvent.trip_id == trip_id, models.ScheduledEvent.day_index == day_index)
+        .all()
+    )
+    stops = []
+    unrouted = []
+    for ev, card in rows:
+        if card.latitude is None or card.longitude is None:
+            unrouted.append(ev.id)
+            continue
+        stops.append(routing.Stop(
+            event_id=ev.id,
+            card_id=card.id,
+            hour=ev.hour,
+            latitude=card.latitude,
+            longitude=card.longitude,
+            locked=card.locked_in or card.reservation_date is not None,
+        ))
+    route = routing.route_for_day(stops)
+    return schemas.DayRouteRead(
+        trip_id=trip_id,
+        day_index=day_index,
+        stops=[
+            schemas.RouteStopRead(
+                event_id=stop.event_id,
+                card_id=stop.card_id,
+                hour=hour,
+                scheduled_hour=stop.hour,
+                latitude=stop.latitude,
+                longitude=stop.longitude,
+                locked=stop.locked,
+            )
+            for stop, hour in zip(route.stops, route.hours)
+        ],
+        distance_km=route.distance_km,
+        original_distance_km=route.original_distance_km,
+        unrouted=sorted(unrouted),
+    )
+
+
+@router.post("/{trip_id}/plan", response_model=schemas.PlanRead)
+def plan_trip_schedule(trip_id: int, payload: schemas.PlanRequest, db: Session = Depends(get_db), current_user: models.User | None = Depends(get_current_user)):
+    """Propose a schedule from backlog cards; with ``apply`` it replaces the trip's schedule.
+
+    Locked-in cards already on the schedule keep their slots (whether or not
+    ``card_ids`` lists them), reserved cards
+    go to their reservation day and hour, and cards whose location names a leg
+    are kept to that leg's days.  Reservation times are read in
+    ``payload.timezone``; a reservation at midnight UTC is what the web client
+    saves for a date without a time, so it pins only the day.
+    """
+    trip = _require_member(db, trip_id, current_user)
+    try:
+        local_zone = ZoneInfo(payload.timezone)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise HTTPException(status_code=400, detail="Unknown timezone")
+    legs = db.query(models.TripLeg).filter(models.TripLeg.trip_id == trip_id).order_by(models.TripLeg.order_index).all()
+    leg_dates = [d for leg in legs for d in (leg.start_date, leg.end_date) if d]
+    start = trip.start_date or (min(leg_dates) if leg_dates else None)
+    end = trip.end_date or (max(leg_dates) if leg_dates else None)
+    if not start or not end or end < start:
+        raise HTTPException(status_code=400, detail="Trip needs start and end dates to plan")
+    start_day = date.fromisoformat(start)
+    num_days = planner.day_index(start_day, date.fromisoformat(end)) + 1
+
+    plan_legs = [
+        planner.PlanLeg(
+            name=leg.name,
+            first_day=planner.day_index(start_day, date.fromisoformat(leg.start_date or start)),
+            last_day=planner.day_index(start_day, date.fromisoformat(leg.end_date or end)),
+        )
+        for leg in legs
+    ]
+    # Locked-in events stay where they are whatever the request plans; their
+    # cards join the plan so that applying it keeps them
+    locked = (
+        db.query(models.ScheduledEvent)
+        .join(models.BacklogCard, models.BacklogCard.id == models.ScheduledEvent.card_id)
+        .filter(models.ScheduledEvent.trip_id == trip_id, models.BacklogCard.locked_in.is_(True))
+        .all()
+    )
+    locked_ids = {ev.card_id for ev in locked}
+    query = db.query(models.BacklogCard)
+    if payload.card_ids is not None:
+        query = query.filter(models.BacklogCard.id.in_(set(payload.card_ids) | locked_ids))
+    cards = []
+    for card in query:
+        plan_card = planner.PlanCard(
+            id=card.id,
+            category=card.category,
+            location=card.location,
+            cost=float(card.cost or 0),
+            rating=float(card.rating) if card.rating is not None else None,
+            desire_to_go=float(card.desire_to_go) if card.desire_to_go is not None else None,
+            locked_in=card.locked_in,
+            days=planner.leg_days(card.location, plan_legs),
+        )
+        if card.reservation_date:
+            reserved_at = parse_timestamp(card.reservation_date).astimezone(timezone.utc)
+            if reserved_at.time() == time(0):
+                reserved_day, reserved_hour = reserved_at.date(), None
+            else:
+                local = reserved_at.astimezone(local_zone)
+                reserved_day, reserved_hour = local.date(), local.hour
+            day = planner.day_index(start_day, reserved_day)
+            if 0 <= day < num_days:
+                plan_card.reservation_day, plan_card.reservation_hour = day, reserved_hour
+            elif card.id not in locked_ids:
+                continue  # reserved for another time; cannot go on this trip
+        cards.append(plan_card)
+
+    fixed = {(ev.day_index, ev.hour): ev.card_id for ev in locked}
+    plan = planner.plan_schedule(
+        cards,
+        num_days,
+        fixed=fixed,
+        max_per_day=payload.max_per_day,
+        budget=payload.budget,
+        day_start_hour=payload.day_start_hour,
+        day_end_hour=payload.day_end_hour,
+    )
+    # Locked-in events past the trip's current end are outside the grid but still kept
+    slots = {**fixed, **plan.slots}
+    if payload.apply:
+        _replace_schedule(db, trip_id, slots, current_user)
+        db.commit()
+    events = [
+        schemas.ScheduledEventCreate(trip_id=trip_id, card_id=card_id, day_index=day, hour=hour)
+        for (day, hour), card_id in sorted(slots.items())
+    ]
+    return schemas.PlanRead(
+        events=events,
+        total_value=plan.total_value,
+        total_cost=plan.total_cost,
+        unscheduled=plan.unscheduled,
+        applied=payload.apply,
+    )
@@ -0,0 +1,197 @@
+"""Visiting order for one day's scheduled stops.
+
+Stops are the day's scheduled cards that have coordinates, taken in hour
+order.  Locked stops (locked-in or reserved cards) keep their position in that
+order, and so their hour; the others are re-sequenced to shorten the walk:
+
+1. A great-circle distance matrix is built in one broadcast numpy expression.
+2. Nearest-neighbour construction from a handful of outlying starts, filling
+   locked positions as they come up.
+3. 2-opt reversals inside runs of free positions, plus swaps of free stops
+   across locked ones, until no move helps.  All candidate moves are scored
+   at once as two matrices and the best one is applied.
+
+The path is open: a zero-cost depot at both ends means the day may start and
+end anywhere.  A result is never longer than the scheduled order.  Routes are
+cached by a hash of the day's stops, so unchanged days are not recomputed.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+MAX_STARTS = 8
+MAX_MOVES_PER_STOP = 10
+CACHE_SIZE = 512
+
+
+@dataclass(frozen=True)
+class Stop:
+    event_id: int
+    card_id: int
+    hour: int
+    latitude: float
+    longitude: float
+    locked: bool = False
+
+
+@dataclass(frozen=True)
+class Route:
+    stops: tuple[Stop, ...]  # visiting order
+    hours: tuple[int, ...]  # the day's hours, in order; stops[i] takes hours[i]
+    distance_km: float
+    original_distance_km: float
+
+
+def distance_matrix(latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+    """Haversine distances in km between every pair of points."""
+    lat = np.radians(latitudes)
+    lng = np.radians(longitudes)
+    dlat = lat[:, None] - lat[None, :]
+    dlng = lng[:, None] - lng[None, :]
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def path_length(dist: np.ndarray, path: np.ndarray) -> float:
+    return float(dist[path[:-1], path[1:]].sum())
+
+
+def _nearest_neighbour(dist: np.ndarray, fixed: np.ndarray, anchors: np.ndarray, start: int | None) -> np.ndarray:
+    """Build a depot-to-depot path; ``anchors[pos]`` is the node pinned at ``pos`` or -1."""
+    size = len(fixed)
+    depot = dist.shape[0] - 1
+    path = np.full(size, depot)
+    available = np.ones(dist.shape[0], dtype=bool)
+    available[depot] = False
+    available[anchors[anchors >= 0]] = False
+    current = depot
+    for pos in range(1, size - 1):
+        if fixed[pos]:
+            node = anchors[pos]
+        elif current == depot and start is not None and available[start]:
+            node = start
+        else:
+            row = np.where(available, dist[current], np.inf)
+            node = int(np.argmin(row))
+            available[node] = False
+        available[node] = False
+        path[pos] = node
+        current = node
+    return path
+
+
+def _two_opt_and_swap(dist: np.ndarray, path: np.ndarray, fixed: np.ndarray) -> np.ndarray:
+    """Apply the best 2-opt or swap move until none shortens ``path``; relies on ``dist`` being symmetric."""
+    size = len(path)
+    # Moves only touch interior positions; masks are over (first, second) position pairs
+    run = np.cumsum(fixed)[1:-1]
+    free = ~fixed[1:-1]
+    pair_free = free[:, None] & free[None, :]
+    first, second = np.indices((size - 2, size - 2))
+    reverse_ok = pair_free & (second > first) & (run[:, None] == run[None, :])
+    swap_ok = pair_free & (second > first + 1)
+    if not reverse_ok.any() and not swap_ok.any():
+        return path
+
+    for _ in range(MAX_MOVES_PER_STOP * size):
+        node, prev, nxt = path[1:-1], path[:-2], path[2:]
+        link_in = dist[prev, node]
+        link_out = dist[node, nxt]
+        # Reversing positions i..j replaces links (i-1, i) and (j, j+1)
+        reverse = dist[np.ix_(prev, node)] + dist[np.ix_(node, nxt)] - link_in[:, None] - link_out[None, :]
+        # Swapping non-adjacent i and j replaces all four of their links
+        around = dist[np.ix_(node, prev)] + dist[np.ix_(node, nxt)]
+        swap = around + around.T - (link_in + link_out)[:, None] - (link_in + link_out)[None, :]
+
+        reverse = np.where(reverse_ok, reverse, np.inf)
+        swap = np.where(swap_ok, swap, np.inf)
+        r = int(np.argmin(reverse))
+        w = int(np.argmin(swap))
+        if min(reverse.flat[r], swap.flat[w]) >= -1e-9:
+            break
+        if reverse.flat[r] <= swap.flat[w]:
+            i, j = divmod(r, size - 2)
+            path[i + 1:j + 2] = path[i + 1:j + 2][::-1].copy()
+        else:
+            i, j = divmod(w, size - 2)
+            path[i + 1], path[j + 1] = path[j + 1], path[i + 1]
+    return path
+
+
+def optimize_day(stops: list[Stop]) -> Route:
+    """Reorder ``stops`` (any order) to shorten the day's route; see the module docstring."""
+    stops = sorted(stops, key=lambda s: (s.hour, s.event_id))
+    hours = tuple(s.hour for s in stops)
+    count = len(stops)
+    if count < 3:
+        return Route(tuple(stops), hours, _length(stops), _length(stops))
+
+    # Node count is the depot; path positions 0 and count + 1 hold it
+    lat = np.array([s.latitude for s in stops] + [0.0])
+    lng = np.array([s.longitude for s in stops] + [0.0])
+    dist = distance_matrix(lat, lng)
+    dist[count, :] = 0.0
+    dist[:, count] = 0.0
+
+    fixed = np.zeros(count + 2, dtype=bool)
+    fixed[[0, count + 1]] = True
+    anchors = np.full(count + 2, -1)
+    for pos, stop in enumerate(stops, start=1):
+        if stop.locked:
+            fixed[pos] = True
+            anchors[pos] = pos - 1
+
+    original = np.array([count] + list(range(count)) + [count])
+    best, best_length = original, path_length(dist, original)
+    free_nodes = [i for i, s in enumerate(stops) if not s.locked]
+    if free_nodes:
+        # Open paths tend to start at an outlying stop
+        centre = np.array([lat[:count].mean(), lng[:count].mean()])
+        spread = (lat[free_nodes] - centre[0]) ** 2 + (lng[free_nodes] - centre[1]) ** 2
+        starts = [free_nodes[i] for i in np.argsort(-spread)[:MAX_STARTS]] if not fixed[1] else [None]
+        for start in starts:
+            path = _two_opt_and_swap(dist, _nearest_neighbour(dist, fixed, anchors, start), fixed)
+            length = path_length(dist, path)
+            if length < best_length - 1e-9:
+                best, best_length = path, length
+
+    ordered = tuple(stops[node] for node in best[1:-1])
+    return Route(ordered, hours, round(best_length, 3), round(path_length(dist, original), 3))
+
+
+def _length(stops: list[Stop]) -> float:
+    if len(stops) < 2:
+        return 0.0
+    dist = distance_matrix(np.array([s.latitude for s in stops]), np.array([s.longitude for s in stops]))
+    return round(float(np.diagonal(dist, offset=1).sum()), 3)
+
+
+def content_hash(stops: list[Stop]) -> str:
+    digest = hashlib.sha256()
+    for stop in sorted(stops, key=lambda s: (s.hour, s.event_id)):
+        digest.update(repr((stop.event_id, stop.card_id, stop.hour, stop.latitude, stop.longitude, stop.locked)).encode())
+    return digest.hexdigest()
+
+
+_cache: OrderedDict[str, Route] = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def route_for_day(stops: list[Stop]) -> Route:
+    """``optimize_day`` behind an LRU keyed by ``content_hash``."""
+    key = content_hash(stops)
+    with _cache_lock:
+        route = _cache.get(key)
+        if route is not None:
+            _cache.move_to_end(key)
+            return route
+    route = optimize_day(stops)
+    with _cache_lock:
+        _cache[key] = route
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return route
@@ -1,19 +1,23 @@
-from pydantic import BaseModel, Field
-from typing import Optional
+from pydantic import BaseModel, Field, model_validator
+from typing import Any, Literal, Optional
 from datetime import datetime
 
+from app.dates import DateStr, TimestampStr
+
 
 class BacklogCardBase(BaseModel):
   category: str = "activities"
   title: str
   location: str = ""
+  latitude: Optional[float] = None
+  longitude: Optional[float] = None
   cost: Optional[float] = None
   rating: Optional[float] = None
   desire_to_go: Optional[float] = None
   requires_reservation: bool = False
   description: str = ""
   reserved: bool = False
-  reservation_date: Optional[str] = None
+  reservation_date: Optional[TimestampStr] = None
   locked_in: bool = False
 
 
@@ -25,31 +29,53 @@ class BacklogCardUpdate(BaseModel):
   category: Optional[str] = None
   title: Optional[str] = None
   location: Optional[str] = None
+  latitude: Optional[float] = None
+  longitude: Optional[float] = None
   cost: Optional[float] = None
   rating: Optional[float] = None
   desire_to_go: Optional[float] = None
   requires_reservation: Optional[bool] = None
   description: Optional[str] = None
   reserved: Optional[bool] = None
-  reservation_date: Optional[str] = None
+  reservation_date: Optional[TimestampStr] = None
   locked_in: Optional[bool] = None
 
 
-class BacklogCardRead(BacklogCardBase):
+class BacklogCardRow(BacklogCardBase):
   id: int
   created_by: Optional[int] = None
   created_at: Optional[datetime] = None
-  creator: Optional["UserRead"] = None
 
   class Config:
     from_attributes = True
 
 
+class BacklogCardRead(BacklogCardRow):
+  creator: Optional["UserRead"] = None
+
+
+class BacklogCardListNormalized(BaseModel):
+  """Cards without embedded creators; referenced users are side-loaded once."""
+  items: list[BacklogCardRow]
+  users: dict[int, "UserRead"] = {}
+
+
+class BacklogSearchHit(BacklogCardRow):
+  rank: float
+  highlight: str = ""
+
+
+class BacklogSearchPage(BaseModel):
+  items: list[BacklogSearchHit]
+  next_cursor: Optional[str] = None
+
+
 class UserRead(BaseModel):
   id: int
   email: str
   name: str
   picture: str
+  avatar_url: str = ""
 
   class Config:
     from_attributes = True
@@ -66,8 +92,8 @@ class SessionRead(BaseModel):
 
 class TripBase(BaseModel):
   name: str
-  start_date: Optional[str] = None
-  end_date: Optional[str] = None
+  start_date: Optional[DateStr] = None
+  end_date: Optional[DateStr] = None
   created_by: Optional[int] = None
 
 
@@ -75,27 +101,43 @@ class TripCreate(TripBase):
   pass
 
 
-class TripRead(TripBase):
+class TripClone(BaseModel):
+  name: Optional[str] = None
+  start_date: Optional[DateStr] = None  # shift every date so the copy starts here
+  include_schedule: bool = True
+  include_sections: bool = True
+
+
+class TripRow(TripBase):
   id: int
   legs: list["TripLegRead"] = []
   travel_segments: list["TravelSegmentRead"] = []
   created_by: Optional[int] = None
-  creator: Optional["UserRead"] = None
 
   class Config:
     from_attributes = True
 
 
+class TripRead(TripRow):
+  creator: Optional["UserRead"] = None
+
+
+class TripListNormalized(BaseModel):
+  """Trips without embedded creators; referenced users are side-loaded once."""
+  items: list[TripRow]
+  users: dict[int, "UserRead"] = {}
+
+
 class TripUpdate(BaseModel):
   name: Optional[str] = None
-  start_date: Optional[str | None] = None
-  end_date: Optional[str | None] = None
+  start_date: Optional[DateStr] = None
+  end_date: Optional[DateStr] = None
 
 
 class TripLegBase(BaseModel):
   name: str
-  start_date: Optional[str] = None
-  end_date: Optional[str] = None
+  start_date: Optional[DateStr] = None
+  end_date: Optional[DateStr] = None
   order_index: int = 0
 
 
@@ -112,8 +154,8 @@ class TripLegRead(TripLegBase):
 
 class TripLegUpdate(BaseModel):
   name: Optional[str] = None
-  start_date: Optional[str | None] = None
-  end_date: Optional[str | None] = None
+  start_date: Optional[DateStr] = None
+  end_date: Optional[DateStr] = None
   order_index: Optional[int] = None
 
 
@@ -125,8 +167,8 @@ class TravelSegmentBase(BaseModel):
   to_leg_id: Optional[int] = None
   title: str = ""
   badge: str = ""
-  start_date: Optional[str] = None
-  end_date: Optional[str] = None
+  start_date: Optional[DateStr] = None
+  end_date: Optional[DateStr] = None
 
 
 class TravelSegmentCreate(TravelSegmentBase):
@@ -148,8 +190,8 @@ class TravelSegmentUpdate(BaseModel):
   to_leg_id: Optional[int | None] = None
   title: Optional[str] = None
   badge: Optional[str] = None
-  start_date: Optional[str | None] = None
-  end_date: Optional[str | None] = None
+  start_date: Optional[DateStr] = None
+  end_date: Optional[DateStr] = None
 
 
 class ScheduledEventBase(BaseModel):
@@ -172,6 +214,176 @@ class ScheduledEventRead(ScheduledEventBase):
     from_attributes = True
 
 
+class BudgetBucket(BaseModel):
+  key: str
+  total: float
+  count: int
+
+
+class BudgetDay(BaseModel):
+  day_index: int
+  total: float
+  count: int
+
+
+class TripBudgetRead(BaseModel):
+  trip_id: int
+  revision: int
+  currency: str
+  total: float
+  people: int
+  per_person: Optional[float] = None
+  by_category: list[BudgetBucket] = []
+  by_status: list[BudgetBucket] = []  # locked_in | reserved | planned
+  by_day: list[BudgetDay] = []
+
+
+class SectionItemOp(BaseModel):
+  op: Literal["upsert", "delete"] = "upsert"
+  id: str = Field(..., min_length=1, max_length=64)
+  parent_id: Optional[str] = Field(None, max_length=64)
+  kind: str = "item"  # person | item | field
+  position: int = 0
+  data: dict[str, Any] = {}
+
+
+class SectionOpsPayload(BaseModel):
+  base_revision: int = 0
+  ops: list[SectionItemOp] = Field(default_factory=list, max_length=500)
+
+
+class SectionItemRead(BaseModel):
+  id: str
+  parent_id: Optional[str] = None
+  kind: str
+  position: int
+  data: dict[str, Any]
+  deleted: bool = False
+  revision: int
+
+
+class SectionDelta(BaseModel):
+  kind: str
+  revision: int
+  items: list[SectionItemRead] = []
+
+
+class PlanRequest(BaseModel):
+  card_ids: Optional[list[int]] = None  # defaults to every backlog card
+  budget: Optional[float] = Field(None, ge=0)
+  max_per_day: int = Field(4, ge=1, le=24)
+  day_start_hour: int = Field(8, ge=0, le=23)
+  day_end_hour: int = Field(23, ge=0, le=23)
+  timezone: str = "UTC"  # IANA name; reservation times are placed in this zone's hours
+  apply: bool = False
+
+  @model_validator(mode="after")
+  def check_hours(self) -> "PlanRequest":
+    if self.day_start_hour > self.day_end_hour:
+      raise ValueError("day_start_hour must not be after day_end_hour")
+    return self
+
+
+class PlanRead(BaseModel):
+  events: list[ScheduledEventCreate]
+  total_value: float
+  total_cost: float
+  unscheduled: list[int] = []
+  applied: bool = False
+
+
+class RouteStopRead(BaseModel):
+  event_id: int
+  card_id: int
+  hour: int  # hour this stop takes in the suggested order
+  scheduled_hour: int
+  latitude: float
+  longitude: float
+  locked: bool = False
+
+
+class DayRouteRead(BaseModel):
+  trip_id: int
+  day_index: int
+  stops: list[RouteStopRead]
+  distance_km: float
+  original_distance_km: float
+  unrouted: list[int] = []  # event ids whose cards have no coordinates
+
+
+class TimelineIssue(BaseModel):
+  kind: Literal["overlap", "gap", "orphaned_segment", "misplaced_segment", "missing_transfer", "undated"]
+  message: str
+  leg_ids: list[int] = []
+  segment_ids: list[int] = []
+  start_date: Optional[str] = None
+  end_date: Optional[str] = None
+
+
+class TimelineReport(BaseModel):
+  trip_id: int
+  revision: int
+  ok: bool
+  issues: list[TimelineIssue] = []
+
+
+class TombstoneRead(BaseModel):
+  entity: str  # leg | segment | event | member | card
+  id: int
+  seq: int
+
+
+class TripChangesRead(BaseModel):
+  trip_id: int
+  seq: int  # pass back as ?since= on the next poll
+  full: bool = False
+  legs: list[TripLegRead] = []
+  travel_segments: list[TravelSegmentRead] = []
+  schedule: list[ScheduledEventRead] = []
+  members: list[UserRead] = []
+  cards: list[BacklogCardRead] = []
+  deleted: list[TombstoneRead] = []
+
+
 class InviteCodeRead(BaseModel):
   code: str
 
+
+class CalendarFeedRead(BaseModel):
+  token: str
+  url: str  # path of the subscription feed, token included
+
+
+
+class JobRead(BaseModel):
+  id: int
+  kind: str
+  status: str  # queued | running | succeeded | failed
+  attempts: int
+  max_attempts: int
+  run_at: datetime
+  last_error: Optional[str] = None
+  result: Optional[dict[str, Any]] = None
+  created_at: datetime
+  updated_at: datetime
+
+  class Config:
+    from_attributes = True
+
+
+class TripActivityRead(BaseModel):
+  id: int
+  occurred_at: datetime
+  actor_id: Optional[int] = None
+  entity: str  # trip | leg | segment | member | invite | calendar | schedule | section | card
+  entity_id: Optional[int] = None
+  action: str  # create | update | delete
+  changes: dict[str, Any] = {}  # column or "day:hour" slot -> [old, new]; sections: upserted/deleted item ids
+
+  class Config:
+    from_attributes = True
+
+
+class TripActivityPage(BaseModel):
+  items: list[TripActivityRead]
+  next_cursor: Optional[str] = None
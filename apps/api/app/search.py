@@ -0,0 +1,281 @@
+"""Full-text and fuzzy search over backlog cards.
+
+On Postgres cards carry a generated ``search_vector`` tsvector (title weighted
+A, location B, description C) behind a GIN index, and ``location`` has a
+``pg_trgm`` GIN index for typo-tolerant matching.  Other engines (SQLite in
+local dev) use ``InvertedIndex``, an in-process equivalent kept fresh by ORM
+events.
+
+Results are ordered by ``(rank DESC, id ASC)`` and paginated with an opaque
+keyset cursor encoding the last row's ``(rank, id)``.  Highlights are HTML:
+card text is escaped and only the ``<b>`` markers around matches are markup.
+"""
+import heapq
+import html
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+
+from fastapi import HTTPException
+from sqlalchemy import Float, and_, cast, event, func, literal_column, or_, select
+from sqlalchemy.orm import Session, object_session
+
+from app import models
+
+TS_CONFIG = models.SEARCH_TS_CONFIG
+TRIGRAM_THRESHOLD = 0.3  # pg_trgm's default for the % operator
+# The document is HTML-escaped before ts_headline, so no "<" in the output can
+# come from card text and these markers are the only tags
+HEADLINE_OPTIONS = "StartSel=<b>, StopSel=</b>, MaxWords=35, MinWords=15"
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+@dataclass
+class SearchHit:
+    card: models.BacklogCard
+    rank: float
+    highlight: str
+
+
+def encode_cursor(rank: float, card_id: int) -> str:
+    return f"{rank!r}:{card_id}"
+
+
+def decode_cursor(cursor: str) -> tuple[float, int]:
+    try:
+        rank, card_id = cursor.rsplit(":", 1)
+        return float(rank), int(card_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def search_cards(db: Session, q: str, limit: int, cursor: str | None = None) -> tuple[list[SearchHit], str | None]:
+    """Return one page of hits for ``q`` and the cursor for the next page, if any."""
+    after = decode_cursor(cursor) if cursor else None
+    if db.get_bind().dialect.name == "postgresql":
+        hits = _search_postgres(db, q, limit + 1, after)
+    else:
+        hits = _index.search(db, q, limit + 1, after)
+    next_cursor = None
+    if len(hits) > limit:
+        hits = hits[:limit]
+        next_cursor = encode_cursor(hits[-1].rank, hits[-1].card.id)
+    return hits, next_cursor
+
+
+# --- Postgres ---
+
+def _search_postgres(db: Session, q: str, limit: int, after: tuple[float, int] | None) -> list[SearchHit]:
+    card = models.BacklogCard
+    vector = literal_column("backlog_cards.search_vector")
+    tsquery = func.websearch_to_tsquery(TS_CONFIG, q)
+    # Both functions return real; as double precision the value survives the cursor's
+    # round trip through a Python float, so ties with the cursor row compare equal
+    rank = cast(func.ts_rank_cd(vector, tsquery) + func.similarity(card.location, q), Float(53))
+    matches = or_(vector.op("@@")(tsquery), card.location.op("%")(q))
+    ranked = select(card.id.label("id"), rank.label("rank")).where(matches).subquery()
+    page = select(ranked.c.id, ranked.c.rank)
+    if after:
+        after_rank, after_id = after
+        page = page.where(or_(ranked.c.rank < after_rank, and_(ranked.c.rank == after_rank, ranked.c.id > after_id)))
+    page = page.order_by(ranked.c.rank.desc(), ranked.c.id.asc()).limit(limit)
+    ranks = {row.id: float(row.rank) for row in db.execute(page)}
+    if not ranks:
+        return []
+
+    document = card.title + " " + card.location + " " + card.description
+    headline = func.ts_headline(TS_CONFIG, _escape_sql(document), tsquery, HEADLINE_OPTIONS)
+    rows = db.query(card, headline).filter(card.id.in_(ranks)).all()
+    hits = [SearchHit(card=c, rank=ranks[c.id], highlight=h) for c, h in rows]
+    hits.sort(key=lambda h: (-h.rank, h.card.id))
+    return hits
+
+
+def _escape_sql(text):
+    """SQL equivalent of ``html.escape`` (``&`` first, so entities are not escaped twice)."""
+    for char, entity in (("&", "&amp;"), ("<", "&lt;"), (">", "&gt;"), ('"', "&quot;"), ("'", "&#x27;")):
+        text = func.replace(text, char, entity)
+    return text
+
+
+# --- In-process fallback ---
+
+FIELD_WEIGHTS = {"title": 1.0, "location": 0.4, "description": 0.2}  # ts_rank's A/B/C weights
+
+
+def tokenize(text: str) -> list[str]:
+    return [w.lower() for w in _WORD.findall(text)]
+
+
+def trigrams(text: str) -> set[str]:
+    """pg_trgm-style trigrams: each word is padded with two leading and one trailing space."""
+    out: set[str] = set()
+    for word in tokenize(text):
+        padded = f"  {word} "
+        out.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return out
+
+
+def similarity(a: set[str], b: set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    shared = len(a & b)
+    return shared / (len(a) + len(b) - shared)
+
+
+def headline(text: str, terms: set[str], max_words: int = 35) -> str:
+    words = text.split()
+    hit = next((i for i, w in enumerate(words) if set(tokenize(w)) & terms), 0)
+    start = max(0, hit - max_words // 3)
+    out = []
+    for word in words[start:start + max_words]:
+        escaped = html.escape(word)
+        out.append(f"<b>{escaped}</b>" if set(tokenize(word)) & terms else escaped)
+    return " ".join(out)
+
+
+class InvertedIndex:
+    """Term -> {card_id: weighted tf} postings plus a location trigram index.
+
+    Built lazily from the database on first use.  Cards written in a session
+    are marked dirty when it commits (dropped if it rolls back) and re-read
+    before the next search, so neither uncommitted nor rolled-back writes
+    reach the index.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._built = False
+        self._dirty: set[int] = set()
+        self._postings: dict[str, dict[int, float]] = defaultdict(dict)
+        self._doc_terms: dict[int, set[str]] = {}
+        self._trigrams: dict[str, set[int]] = defaultdict(set)
+        self._doc_trigrams: dict[int, set[str]] = {}
+
+    def mark_dirty(self, card_id: int) -> None:
+        with self._lock:
+            self._dirty.add(card_id)
+
+    def _remove(self, card_id: int) -> None:
+        for term in self._doc_terms.pop(card_id, ()):
+            postings = self._postings[term]
+            postings.pop(card_id, None)
+            if not postings:
+                del self._postings[term]
+        for gram in self._doc_trigrams.pop(card_id, ()):
+            ids = self._trigrams[gram]
+            ids.discard(card_id)
+            if not ids:
+                del self._trigrams[gram]
+
+    def _add(self, card: models.BacklogCard) -> None:
+        weights: dict[str, float] = defaultdict(float)
+        for field, weight in FIELD_WEIGHTS.items():
+            for term in tokenize(getattr(card, field) or ""):
+                weights[term] += weight
+        for term, weight in weights.items():
+            self._postings[term][card.id] = weight
+        self._doc_terms[card.id] = set(weights)
+        grams = trigrams(card.location or "")
+        for gram in grams:
+            self._trigrams[gram].add(card.id)
+        self._doc_trigrams[card.id] = grams
+
+    def _refresh(self, db: Session) -> None:
+        card = models.BacklogCard
+        if not self._built:
+            for row in db.query(card).yield_per(1000):
+                self._add(row)
+            self._built = True
+            self._dirty.clear()
+            return
+        if self._dirty:
+            ids, self._dirty = self._dirty, set()
+            for card_id in ids:
+                self._remove(card_id)
+            for row in db.query(card).filter(card.id.in_(ids)):
+                self._add(row)
+
+    def search(self, db: Session, q: str, limit: int, after: tuple[float, int] | None) -> list[SearchHit]:
+        terms = set(tokenize(q))
+        query_grams = trigrams(q)
+        with self._lock:
+            self._refresh(db)
+            total = max(len(self._doc_terms), 1)
+            scores: dict[int, float] = {}
+            # All terms must match, like websearch_to_tsquery's implicit AND
+            postings = sorted((self._postings.get(t, {}) for t in terms), key=len)
+            if postings and postings[0]:
+                weighted = [(p, math.log(1 + total / len(p))) for p in postings]
+                (first, first_idf), rest = weighted[0], weighted[1:]
+                for card_id, weight in first.items():
+                    score = weight * first_idf
+                    for p, idf in rest:
+                        w = p.get(card_id)
+                        if w is None:
+                            break
+                        score += w * idf
+                    else:
+                        scores[card_id] = score
+            # similarity <= shared / len(query_grams), so rarer overlaps can be skipped outright
+            shared: Counter[int] = Counter()
+            for gram in query_grams:
+                shared.update(self._trigrams.get(gram, ()))
+            min_shared = TRIGRAM_THRESHOLD * len(query_grams)
+            for card_id, count in shared.items():
+                if count < min_shared and card_id not in scores:
+                    continue
+                sim = similarity(query_grams, self._doc_trigrams[card_id])
+                if sim >= TRIGRAM_THRESHOLD or card_id in scores:
+                    scores[card_id] = scores.get(card_id, 0.0) + sim
+
+        ranked = scores.items()
+        if after:
+            after_rank, after_id = after
+            ranked = ((i, r) for i, r in ranked if r < after_rank or (r == after_rank and i > after_id))
+        ordered = heapq.nsmallest(limit, ranked, key=lambda kv: (-kv[1], kv[0]))
+        if not ordered:
+            return []
+        cards = {c.id: c for c in db.query(models.BacklogCard).filter(models.BacklogCard.id.in_([i for i, _ in ordered]))}
+        hits = []
+        for card_id, rank in ordered:
+            c = cards.get(card_id)
+            if c is None:
+                continue
+            text = f"{c.title} {c.location} {c.description}"
+            hits.append(SearchHit(card=c, rank=rank, highlight=headline(text, terms)))
+        return hits
+
+
+_index = InvertedIndex()
+
+
+_WRITTEN = "search_written_cards"
+
+
+@event.listens_for(models.BacklogCard, "after_insert")
+@event.listens_for(models.BacklogCard, "after_update")
+@event.listens_for(models.BacklogCard, "after_delete")
+def _note_card_written(mapper, connection, target) -> None:
+    # Flush time is too early to mark the index: another session searching before
+    # the commit would re-read the old row and clear the flag
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_WRITTEN, set()).add(target.id)
+    else:
+        _index.mark_dirty(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _mark_written_dirty(session: Session) -> None:
+    for card_id in session.info.pop(_WRITTEN, ()):
+        _index.mark_dirty(card_id)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _drop_written(session: Session, transaction) -> None:
+    if transaction.parent is None:
+        session.info.pop(_WRITTEN, None)  # rolled back; committed ids were taken above
@@ -0,0 +1,35 @@
+"""Side-loading of user references for normalized list responses.
+
+Instead of embedding a full ``UserRead`` in every row, normalized responses
+return ``{"items": [...], "users": {id: user}}`` where rows keep only
+``created_by`` and every referenced user appears exactly once.
+"""
+from typing import Any, Iterable
+
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
+from app import models, schemas
+from app import serialization
+
+
+def load_users(db: Session, user_ids: Iterable[int | None]) -> dict[int, models.User]:
+    """Fetch the given users with a single ``IN`` query."""
+    ids = {uid for uid in user_ids if uid is not None}
+    if not ids:
+        return {}
+    rows = db.query(models.User).filter(models.User.id.in_(ids)).all()
+    return {user.id: user for user in rows}
+
+
+def render_normalized(db: Session, model: type[BaseModel], rows: list[Any], only: tuple[str, ...] | None = None) -> Any:
+    users = load_users(db, (row.created_by for row in rows))
+    if not serialization.FAST_JSON and only is None:
+        return {"items": rows, "users": users}
+    project_row = serialization.projector(model, only)
+    project_user = serialization.projector(schemas.UserRead)
+    body = {
+        "items": [project_row(row) for row in rows],
+        "users": {str(uid): project_user(user) for uid, user in users.items()},
+    }
+    return serialization.render(body)
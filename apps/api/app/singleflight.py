@@ -0,0 +1,155 @@
+"""Single-flight coalescing for concurrent identical reads.
+
+Browser tabs often fire the same ``GET /trips/`` or ``GET /backlog/cards`` at
+the same moment.  While one such request is being handled, identical ones
+(same method, path, query string, ``Authorization``/``Cookie``,
+content-negotiation and conditional headers) wait for it and are sent a copy of its response
+instead of running their own query and serialization.  Nothing is kept once
+the leading request finishes; it only merges requests that overlap in time.
+A request only joins a leader that started after its caller's last
+successful write had responded, so a refetch right after a write is never
+handed a response read before it.
+
+Followers get an ``X-Coalesced: true`` header.  If the leading request fails
+before responding, each waiter runs on its own.
+"""
+import asyncio
+import hashlib
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Conditional and range headers change the response (304, 206), so a follower
+# without them must not be handed the leader's
+KEY_HEADERS = (
+    b"authorization", b"cookie", b"accept", b"accept-encoding",
+    b"if-none-match", b"if-modified-since", b"range",
+)
+COALESCED_HEADER = (b"x-coalesced", b"true")
+CALLER_HEADERS = (b"authorization", b"cookie")
+MAX_WRITERS = 100_000  # callers whose last write is remembered
+
+
+@dataclass
+class SingleFlightStats:
+    leaders: int = 0
+    coalesced: int = 0
+    fallbacks: int = 0  # followers that ran themselves after the leader failed
+    in_flight: int = 0
+    by_path: dict[str, int] = field(default_factory=dict)  # coalesced count per path
+
+    def as_dict(self) -> dict:
+        return {
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "fallbacks": self.fallbacks,
+            "in_flight": self.in_flight,
+            "by_path": dict(self.by_path),
+        }
+
+
+stats = SingleFlightStats()
+
+
+@dataclass
+class _Flight:
+    done: asyncio.Future
+    started: int  # write sequence when the leader started
+
+
+class SingleFlightMiddleware:
+    def __init__(self, app: ASGIApp, prefixes: tuple[str, ...] = ("/",), methods: tuple[str, ...] = ("GET", "HEAD")) -> None:
+        self.app = app
+        self.prefixes = prefixes
+        self.methods = methods
+        self.stats = stats
+        self._flights: dict[str, _Flight] = {}
+        # Bumped after every successful write; caller -> sequence of its last one
+        self._write_seq = 0
+        self._last_write: OrderedDict[tuple[bytes, ...], int] = OrderedDict()
+
+    def _key(self, scope: Scope) -> str:
+        headers = dict(scope["headers"])
+        parts = [scope["method"].encode(), scope["path"].encode(), scope.get("query_string", b"")]
+        parts.extend(headers.get(name, b"") for name in KEY_HEADERS)
+        return hashlib.sha256(b"\0".join(parts)).hexdigest()
+
+    @staticmethod
+    def _caller(scope: Scope) -> tuple[bytes, ...]:
+        headers = dict(scope["headers"])
+        return tuple(headers.get(name, b"") for name in CALLER_HEADERS)
+
+    async def _write(self, scope: Scope, receive: Receive, send: Send) -> None:
+        caller = self._caller(scope)
+
+        async def send_wrapper(message: Message) -> None:
+            # The handler has committed by the time it responds
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                self._write_seq += 1
+                self._last_write[caller] = self._write_seq
+                self._last_write.move_to_end(caller)
+                if len(self._last_write) > MAX_WRITERS:
+                    self._last_write.popitem(last=False)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        if scope["method"] not in self.methods:
+            await self._write(scope, receive, send)
+            return
+        if not scope["path"].startswith(self.prefixes):
+            await self.app(scope, receive, send)
+            return
+        key = self._key(scope)
+        flight = self._flights.get(key)
+        if flight is not None and flight.started < self._last_write.get(self._caller(scope), 0):
+            flight = None  # the leader may have read before this caller's write; run separately
+        if flight is not None:
+            try:
+                status, headers, body = await asyncio.shield(flight.done)
+            except Exception:
+                self.stats.fallbacks += 1
+                await self.app(scope, receive, send)
+                return
+            self.stats.coalesced += 1
+            self.stats.by_path[scope["path"]] = self.stats.by_path.get(scope["path"], 0) + 1
+            await send({"type": "http.response.start", "status": status, "headers": headers + [COALESCED_HEADER]})
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        flight = _Flight(done=asyncio.get_running_loop().create_future(), started=self._write_seq)
+        self._flights[key] = flight
+        self.stats.leaders += 1
+        self.stats.in_flight += 1
+        status = 500
+        response_headers: list[tuple[bytes, bytes]] = []
+        chunks: list[bytes] = []
+
+        async def capture(message: Message) -> None:
+            nonlocal status, response_headers
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                response_headers = list(message.get("headers", []))
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, capture)
+        except BaseException:
+            if not flight.done.done():
+                flight.done.set_exception(RuntimeError("leading request failed"))
+                # Mark retrieved so an unawaited failure is not logged
+                flight.done.exception()
+            raise
+        else:
+            flight.done.set_result((status, response_headers, b"".join(chunks)))
+        finally:
+            self.stats.in_flight -= 1
+            if self._flights.get(key) is flight:
+                del self._flights[key]
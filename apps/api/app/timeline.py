@@ -0,0 +1,213 @@
+"""Consistency checks for a trip's legs and travel segments.
+
+Reported issues:
+
+- ``overlap``: two legs share more than a travel day, or two transfer
+  segments (departure / between / return) overlap.
+- ``gap``: days between the trip start, consecutive legs and the trip end that
+  no leg or segment covers.
+- ``orphaned_segment``: a segment whose leg references are missing, belong to
+  another trip, or do not fit its ``edge_type``.
+- ``misplaced_segment``: a dated transfer outside the window its legs leave
+  for it (a ``between`` segment should run from the first leg's last day to
+  the second leg's first day).
+- ``missing_transfer``: consecutive legs (by ``order_index``) without a
+  ``between`` segment, or no departure / return when there are legs.
+- ``undated``: a leg without dates; it is left out of the date checks.
+
+Legs and segments are closed day intervals.  Overlaps come from one sweep over
+the intervals sorted by start with a heap of open intervals, and gap coverage
+is answered by bisecting the merged union of covered days, so a check is
+O(n log n + k) for k reported overlaps.
+
+Reports are cached per ``(trip_id, Trip.revision)``; every leg or segment
+write bumps the revision, so the first read after a change recomputes.
+"""
+import bisect
+import heapq
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Iterable
+
+from sqlalchemy.orm import Session
+
+from app import models, schemas
+
+TRANSFER_TYPES = ("departure", "between", "return")
+CACHE_SIZE = 512
+
+_cache: OrderedDict[tuple[int, int], schemas.TimelineReport] = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class Interval:
+    start: date
+    end: date
+    key: tuple[str, int]  # ("leg" | "segment", id)
+
+
+def interval(key: tuple[str, int], start: str | None, end: str | None) -> Interval | None:
+    if not start and not end:
+        return None
+    first = date.fromisoformat(start or end)
+    last = date.fromisoformat(end or start)
+    return Interval(min(first, last), max(first, last), key)
+
+
+def overlapping_pairs(intervals: Iterable[Interval], touching: bool = False) -> list[tuple[Interval, Interval]]:
+    """All pairs that share a day; with ``touching=False`` sharing only an end day does not count."""
+    pairs = []
+    active: list[tuple[date, int, Interval]] = []  # (end, tiebreak, interval) min-heap
+    for n, item in enumerate(sorted(intervals, key=lambda i: (i.start, i.end, i.key))):
+        while active and (active[0][0] < item.start or (not touching and active[0][0] == item.start)):
+            heapq.heappop(active)
+        pairs.extend((other, item) for _, _, other in active)
+        heapq.heappush(active, (item.end, n, item))
+    return pairs
+
+
+class Coverage:
+    """Union of day intervals, merged once and queried by bisection."""
+
+    def __init__(self, intervals: Iterable[Interval]) -> None:
+        merged: list[list[date]] = []
+        for item in sorted(intervals, key=lambda i: i.start):
+            if merged and item.start <= merged[-1][1] + timedelta(days=1):
+                merged[-1][1] = max(merged[-1][1], item.end)
+            else:
+                merged.append([item.start, item.end])
+        self._starts = [m[0] for m in merged]
+        self._ends = [m[1] for m in merged]
+
+    def uncovered(self, start: date, end: date) -> list[tuple[date, date]]:
+        """Maximal runs of days in ``[start, end]`` outside the union."""
+        out = []
+        day = start
+        i = max(bisect.bisect_right(self._starts, start) - 1, 0)
+        while day <= end:
+            if i < len(self._starts) and self._starts[i] <= day <= self._ends[i]:
+                day = self._ends[i] + timedelta(days=1)
+                i += 1
+                continue
+            if i < len(self._starts) and self._ends[i] < day:
+                i += 1
+                continue
+            stop = min(end, self._starts[i] - timedelta(days=1)) if i < len(self._starts) else end
+            out.append((day, stop))
+            day = stop + timedelta(days=1)
+        return out
+
+
+def _issue(kind: str, message: str, legs: Iterable[int] = (), segments: Iterable[int] = (), start: date | None = None, end: date | None = None) -> schemas.TimelineIssue:
+    return schemas.TimelineIssue(
+        kind=kind,
+        message=message,
+        leg_ids=sorted(set(legs)),
+        segment_ids=sorted(segments),
+        start_date=start.isoformat() if start else None,
+        end_date=end.isoformat() if end else None,
+    )
+
+
+def _ids(items: Iterable[Interval], kind: str) -> list[int]:
+    return [i.key[1] for i in items if i.key[0] == kind]
+
+
+def check(trip: models.Trip, legs: list[models.TripLeg], segments: list[models.TravelSegment]) -> list[schemas.TimelineIssue]:
+    issues: list[schemas.TimelineIssue] = []
+    legs = sorted(legs, key=lambda leg: (leg.order_index, leg.id))
+    leg_by_id = {leg.id: leg for leg in legs}
+
+    leg_spans: dict[int, Interval] = {}
+    for leg in legs:
+        span = interval(("leg", leg.id), leg.start_date, leg.end_date)
+        if span is None:
+            issues.append(_issue("undated", f"Leg '{leg.name}' has no dates", legs=[leg.id]))
+        else:
+            leg_spans[leg.id] = span
+
+    for a, b in overlapping_pairs(leg_spans.values()):
+        start, end = b.start, min(a.end, b.end)
+        issues.append(_issue("overlap", "Legs overlap", legs=[a.key[1], b.key[1]], start=start, end=end))
+
+    transfers: list[Interval] = []
+    seg_spans: list[Interval] = []
+    between: set[tuple[int, int]] = set()
+    edge_types = {seg.edge_type for seg in segments}
+    for seg in segments:
+        span = interval(("segment", seg.id), seg.start_date, seg.end_date)
+        if span is not None:
+            seg_spans.append(span)
+        refs = [ref for ref in (seg.from_leg_id, seg.to_leg_id) if ref is not None]
+        missing = [ref for ref in refs if ref not in leg_by_id]
+        if missing:
+            issues.append(_issue("orphaned_segment", "Segment references legs outside this trip", segments=[seg.id], legs=missing))
+            continue
+        if seg.edge_type == "between":
+            if seg.from_leg_id is None or seg.to_leg_id is None or seg.from_leg_id == seg.to_leg_id:
+                issues.append(_issue("orphaned_segment", "Between segment needs two different legs", segments=[seg.id], legs=refs))
+                continue
+            between.add((seg.from_leg_id, seg.to_leg_id))
+        elif seg.edge_type == "leg" and seg.from_leg_id is None:
+            issues.append(_issue("orphaned_segment", "Leg segment has no leg", segments=[seg.id]))
+            continue
+        if seg.edge_type in TRANSFER_TYPES and span is not None:
+            transfers.append(span)
+            # The window a transfer should fall in, from the legs it connects
+            before = leg_spans.get(seg.from_leg_id) if seg.from_leg_id else None
+            after = leg_spans.get(seg.to_leg_id) if seg.to_leg_id else None
+            lo = before.end if before else None
+            hi = after.start if after else None
+            if (lo and span.start < lo) or (hi and span.end > hi):
+                issues.append(_issue("misplaced_segment", "Segment dates fall outside the legs it connects", segments=[seg.id], legs=refs, start=span.start, end=span.end))
+
+    for a, b in overlapping_pairs(transfers):
+        issues.append(_issue("overlap", "Travel segments overlap", segments=[a.key[1], b.key[1]], start=b.start, end=min(a.end, b.end)))
+
+    for prev, nxt in zip(legs, legs[1:]):
+        if (prev.id, nxt.id) not in between:
+            issues.append(_issue("missing_transfer", f"No travel from '{prev.name}' to '{nxt.name}'", legs=[prev.id, nxt.id]))
+    if legs and "departure" not in edge_types:
+        issues.append(_issue("missing_transfer", "No departure travel", legs=[legs[0].id]))
+    if legs and "return" not in edge_types:
+        issues.append(_issue("missing_transfer", "No return travel", legs=[legs[-1].id]))
+
+    covered = list(leg_spans.values()) + seg_spans
+    if covered:
+        coverage = Coverage(covered)
+        first = min(i.start for i in covered)
+        last = max(i.end for i in covered)
+        if trip.start_date:
+            first = min(first, date.fromisoformat(trip.start_date))
+        if trip.end_date:
+            last = max(last, date.fromisoformat(trip.end_date))
+        ordered = sorted(leg_spans.values(), key=lambda i: i.start)
+        starts = [i.start for i in ordered]
+        for start, end in coverage.uncovered(first, last):
+            # Name the legs on either side of the gap
+            k = bisect.bisect_left(starts, end)
+            around = ordered[max(k - 1, 0):k + 1]
+            issues.append(_issue("gap", "No leg or travel covers these days", legs=_ids(around, "leg"), start=start, end=end))
+
+    return issues
+
+
+def trip_timeline(db: Session, trip: models.Trip) -> schemas.TimelineReport:
+    key = (trip.id, trip.revision)
+    with _cache_lock:
+        report = _cache.get(key)
+        if report is not None:
+            _cache.move_to_end(key)
+            return report
+    legs = db.query(models.TripLeg).filter(models.TripLeg.trip_id == trip.id).all()
+    segments = db.query(models.TravelSegment).filter(models.TravelSegment.trip_id == trip.id).all()
+    issues = check(trip, legs, segments)
+    report = schemas.TimelineReport(trip_id=trip.id, revision=trip.revision, ok=not issues, issues=issues)
+    with _cache_lock:
+        _cache[key] = report
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return report
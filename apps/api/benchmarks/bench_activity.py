@@ -0,0 +1,110 @@
+"""Cost of the activity log on the mutation path, and of the batched writer.
+
+Times ``PATCH /trips/{id}/legs/{leg_id}`` (the router function, on a
+temporary SQLite database) with activity recording on and off, the work
+recording adds per entry (diff, staging, hand-off at commit), then how fast
+the writer stores a backlog of entries in one batch.
+
+Run from apps/api:  python -m benchmarks.bench_activity
+"""
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime, timezone
+
+_db_dir = tempfile.mkdtemp()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/bench.db")
+
+from app import activity, db, models, schemas
+from app.routers import trips
+
+N = 2_000
+BATCH = 10_000
+
+
+def seed() -> tuple[int, int, int]:
+    db.Base.metadata.create_all(db.get_engine())
+    with db.SessionLocal() as session:
+        user = models.User(google_sub="sub", email="user@example.com", name="User", picture="")
+        session.add(user)
+        session.flush()
+        trip = models.Trip(name="Bench", created_by=user.id, invite_code="code")
+        session.add(trip)
+        session.flush()
+        session.add(models.TripUser(trip_id=trip.id, user_id=user.id))
+        leg = models.TripLeg(trip_id=trip.id, name="Leg", order_index=0)
+        session.add(leg)
+        session.commit()
+        return user.id, trip.id, leg.id
+
+
+def time_updates(user_id: int, trip_id: int, leg_id: int) -> list[float]:
+    samples = []
+    for i in range(N):
+        with db.SessionLocal() as session:
+            user = session.get(models.User, user_id)
+            payload = schemas.TripLegUpdate(name=f"Leg {i}")
+            start = time.perf_counter()
+            trips.update_trip_leg(trip_id, leg_id, payload, db=session, current_user=user)
+            samples.append(time.perf_counter() - start)
+    return samples
+
+
+def report(label: str, samples: list[float]) -> None:
+    samples = sorted(samples)
+    print(
+        f"  {label:22} mean {statistics.fmean(samples) * 1e6:7.0f} µs"
+        f"  p50 {samples[len(samples) // 2] * 1e6:7.0f} µs  p99 {samples[int(len(samples) * 0.99)] * 1e6:7.0f} µs"
+    )
+
+
+def main() -> None:
+    user_id, trip_id, leg_id = seed()
+    record = activity.record
+    print(f"PATCH leg, {N} updates")
+    # Interleave rounds so drift in the machine affects both sides alike
+    on: list[float] = []
+    off: list[float] = []
+    for _ in range(3):
+        activity.record = lambda *args, **kwargs: None
+        off += time_updates(user_id, trip_id, leg_id)
+        activity.record = record
+        on += time_updates(user_id, trip_id, leg_id)
+    activity.stop()
+    report("without activity", off)
+    report("with activity", on)
+
+    class NullWriter:
+        def put(self, entry: activity.Entry) -> None:
+            pass
+
+    get_writer = activity.get_writer
+    activity.get_writer = lambda: NullWriter()
+    with db.SessionLocal() as session:
+        leg = session.get(models.TripLeg, leg_id)
+        user = session.get(models.User, user_id)
+        elapsed = 0.0
+        for i in range(N):
+            leg.name = f"Renamed {i}"
+            start = time.perf_counter()
+            activity.record(session, trip_id, user, "leg", leg_id, "update", activity.changes(leg))
+            activity._after_commit(session)
+            elapsed += time.perf_counter() - start
+    activity.get_writer = get_writer
+    print(f"Recording: {elapsed / N * 1e6:.1f} µs per entry")
+
+    now = datetime.now(timezone.utc)
+    entries = [
+        activity.Entry(activity.next_id(), now, trip_id, user_id, "leg", leg_id, "update", {"name": ["a", "b"]})
+        for _ in range(BATCH)
+    ]
+    writer = activity.ActivityWriter()
+    start = time.perf_counter()
+    writer.write(entries)
+    elapsed = time.perf_counter() - start
+    print(f"Writer: {BATCH} entries in one batch, {elapsed * 1000:.0f} ms ({BATCH / elapsed:,.0f} entries/s)")
+
+
+if __name__ == "__main__":
+    main()
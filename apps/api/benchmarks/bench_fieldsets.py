@@ -0,0 +1,87 @@
+"""Bytes on the wire and latency of GET /backlog/cards for a 5k-card backlog.
+
+Compares the full payload with a sparse fieldset, the normalized form, and
+each of them uncompressed, gzip and brotli (when installed), through the
+whole app on a temporary SQLite database.
+
+Run from apps/api:  python -m benchmarks.bench_fieldsets
+"""
+import os
+import tempfile
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+
+_db_dir = tempfile.mkdtemp()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/bench.db")
+os.environ.setdefault("STRUCTURED_LOGS", "0")
+
+from fastapi.testclient import TestClient
+
+from app import compression, db, models
+from app.main import create_app
+
+N = 5_000
+REPEAT = 5
+VARIANTS = [
+    ("full", "/backlog/cards"),
+    ("fields=id,title,location", "/backlog/cards?fields=id,title,location"),
+    ("fields=...,category,cost", "/backlog/cards?fields=id,title,location,category,cost,reservation_date"),
+    ("normalized", "/backlog/cards?normalized=true"),
+]
+
+
+def seed() -> None:
+    db.Base.metadata.create_all(db.get_engine())
+    now = datetime.now(timezone.utc)
+    with db.SessionLocal() as session:
+        users = [
+            models.User(google_sub=f"sub-{i}", email=f"user{i}@example.com", name=f"User {i}", picture=f"https://example.com/{i}.png")
+            for i in range(1, 6)
+        ]
+        session.add_all(users)
+        session.flush()
+        session.add_all(
+            models.BacklogCard(
+                category="food" if i % 3 else "activities",
+                title=f"Card {i} – café",
+                location="Lisbon",
+                cost=Decimal("12.50") if i % 2 else None,
+                rating=Decimal("4.5"),
+                description=f"Card {i} notes. " + "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 12,
+                created_by=users[i % len(users)].id,
+                created_at=now,
+            )
+            for i in range(N)
+        )
+        session.commit()
+
+
+def timed(client: TestClient, path: str, encoding: str) -> tuple[float, int]:
+    best = float("inf")
+    size = 0
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        # stream=True keeps httpx from decoding, so the size is what went over the wire
+        with client.stream("GET", path, headers={"Accept-Encoding": encoding}) as r:
+            size = len(b"".join(r.iter_raw()))
+        best = min(best, time.perf_counter() - start)
+    return best, size
+
+
+def main() -> None:
+    seed()
+    encodings = ["identity", "gzip"] + (["br"] if compression.brotli is not None else [])
+    with TestClient(create_app()) as client:
+        print(f"GET /backlog/cards, {N} cards")
+        print(f"  {'variant':28} " + " ".join(f"{e:>20}" for e in encodings))
+        for label, path in VARIANTS:
+            cells = []
+            for encoding in encodings:
+                seconds, size = timed(client, path, encoding)
+                cells.append(f"{size / 1024:8.0f} KiB {seconds * 1000:6.1f} ms")
+            print(f"  {label:28} " + " ".join(f"{c:>20}" for c in cells))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Encode and decode 10k BacklogCardRead rows as JSON (orjson) and MessagePack.
+
+Encoding starts from the projected rows the list endpoints build; decoding is
+what a client does with the body.  Sizes are shown raw and gzip-compressed.
+
+Run from apps/api:  python -m benchmarks.bench_msgpack
+"""
+import gzip
+import time
+
+import orjson
+
+from app import negotiation, schemas
+from app.serialization import dumps, projector
+from benchmarks.bench_serialization import N, make_cards
+
+
+def best(fn, arg, repeat: int = 5) -> float:
+    fastest = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(arg)
+        fastest = min(fastest, time.perf_counter() - start)
+    return fastest
+
+
+def main() -> None:
+    project = projector(schemas.BacklogCardRead)
+    rows = [project(card) for card in make_cards(N)]
+    as_json = dumps(rows)
+    as_msgpack = negotiation.packb(rows)
+    assert len(negotiation.unpackb(as_msgpack)) == len(orjson.loads(as_json)) == N
+
+    print(f"{N} BacklogCardRead rows")
+    print(f"  {'':10} {'bytes':>10} {'gzip':>10} {'encode':>10} {'decode':>10}")
+    for label, body, encode, decode in (
+        ("json", as_json, dumps, orjson.loads),
+        ("msgpack", as_msgpack, negotiation.packb, negotiation.unpackb),
+    ):
+        print(
+            f"  {label:10} {len(body):10d} {len(gzip.compress(body)):10d}"
+            f" {best(encode, rows) * 1000:8.1f}ms {best(decode, body) * 1000:8.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
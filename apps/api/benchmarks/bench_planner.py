@@ -0,0 +1,52 @@
+"""Plan a 30-day trip from 500 backlog cards.
+
+Run from apps/api:  python -m benchmarks.bench_planner
+"""
+import random
+import time
+
+from app.planner import PlanCard, PlanLeg, leg_days, plan_schedule
+
+DAYS = 30
+CARDS = 500
+
+
+def make_cards(rng: random.Random) -> list[PlanCard]:
+    legs = [PlanLeg("Lisbon", 0, 9), PlanLeg("Porto", 10, 19), PlanLeg("Madrid", 20, 29)]
+    cards = []
+    for i in range(CARDS):
+        location = rng.choice(["Lisbon", "Porto", "Madrid", "Somewhere else"])
+        card = PlanCard(
+            id=i + 1,
+            category=rng.choice(["activities", "activities", "food", "clubs", "hotels"]),
+            location=location,
+            cost=round(rng.uniform(0, 150), 2),
+            rating=round(rng.uniform(1, 5), 1),
+            desire_to_go=round(rng.uniform(0, 5), 1),
+            locked_in=rng.random() < 0.02,
+            days=leg_days(location, legs),
+        )
+        if rng.random() < 0.05:
+            card.reservation_day, card.reservation_hour = rng.randrange(DAYS), rng.choice([12, 19, 20])
+        cards.append(card)
+    return cards
+
+
+def main() -> None:
+    rng = random.Random(42)
+    cards = make_cards(rng)
+    fixed = {(d, 9): c.id for d, c in enumerate(c for c in cards if c.locked_in)}
+    for budget in (None, 3000.0):
+        best = float("inf")
+        for _ in range(5):
+            start = time.perf_counter()
+            plan = plan_schedule(cards, DAYS, fixed=fixed, max_per_day=4, budget=budget)
+            best = min(best, time.perf_counter() - start)
+        print(
+            f"{CARDS} cards / {DAYS} days, budget={budget}: {best * 1000:.1f} ms, "
+            f"{len(plan.slots)} events, value {plan.total_value:.1f}, cost {plan.total_cost:.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Per-request cost of the rate limiter: route matching plus one bucket take.
+
+Measures the middleware in front of a no-op app against a pass-through ASGI
+middleware (the cost any middleware layer has), over a mix of limited and
+unlimited requests from 1,000 callers.
+
+Run from apps/api:  python -m benchmarks.bench_ratelimit
+"""
+import asyncio
+import random
+import time
+
+from app.ratelimit import GROUPS, Limit, MemoryBackend, RateLimitMiddleware, replace
+
+REQUESTS = 200_000
+PATHS = [
+    ("GET", "/trips/12/legs"),
+    ("POST", "/trips/12/schedule"),
+    ("PATCH", "/backlog/cards/3"),
+    ("GET", "/backlog/cards"),
+    ("GET", "/health"),
+]
+
+
+async def noop(scope, receive, send) -> None:
+    pass
+
+
+async def send(message) -> None:
+    pass
+
+
+class PassThrough:
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
+
+
+def make_scopes(rng: random.Random) -> list[dict]:
+    scopes = []
+    for _ in range(REQUESTS):
+        method, path = rng.choice(PATHS)
+        token = b"Bearer user-%d" % rng.randrange(1000)
+        scopes.append({"type": "http", "method": method, "path": path, "headers": [(b"host", b"api"), (b"authorization", token)]})
+    return scopes
+
+
+async def run(app, scopes: list[dict]) -> float:
+    start = time.perf_counter()
+    for scope in scopes:
+        await app(scope, None, send)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    scopes = make_scopes(random.Random(5))
+    # Generous limits so the measurement is of allowed requests
+    groups = tuple(replace(g, limit=Limit(10**9, 1)) for g in GROUPS)
+    limited = RateLimitMiddleware(noop, groups=groups, backend=MemoryBackend())
+    base = min(asyncio.run(run(PassThrough(noop), scopes)) for _ in range(5))
+    with_limiter = min(asyncio.run(run(limited, scopes)) for _ in range(5))
+    per_request = (with_limiter - base) / REQUESTS * 1e9
+    print(f"{REQUESTS} requests: pass-through {base * 1000:.0f} ms, limited {with_limiter * 1000:.0f} ms, limiter cost {per_request:.0f} ns/request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Re-sequence one day of 25/50/100 scheduled stops spread over a city.
+
+Run from apps/api:  python -m benchmarks.bench_routing
+"""
+import random
+import time
+
+from app.routing import Stop, optimize_day, route_for_day
+
+
+def make_stops(rng: random.Random, count: int) -> list[Stop]:
+    return [
+        Stop(
+            event_id=i + 1,
+            card_id=i + 1,
+            hour=i,
+            latitude=38.70 + rng.uniform(-0.06, 0.06),
+            longitude=-9.15 + rng.uniform(-0.08, 0.08),
+            locked=rng.random() < 0.1,
+        )
+        for i in range(count)
+    ]
+
+
+def main() -> None:
+    rng = random.Random(7)
+    for count in (25, 50, 100):
+        stops = make_stops(rng, count)
+        best = float("inf")
+        for _ in range(5):
+            start = time.perf_counter()
+            route = optimize_day(stops)
+            best = min(best, time.perf_counter() - start)
+        assert sorted(s.event_id for s in route.stops) == [s.event_id for s in stops]
+        assert all(s.hour == h for s, h in zip(route.stops, route.hours) if s.locked)
+        route_for_day(stops)
+        start = time.perf_counter()
+        route_for_day(stops)
+        cached = time.perf_counter() - start
+        print(
+            f"{count} stops: {best * 1000:.1f} ms ({cached * 1e6:.0f} us cached), "
+            f"{route.original_distance_km:.1f} km -> {route.distance_km:.1f} km"
+        )
+
+
+if __name__ == "__main__":
+    main()
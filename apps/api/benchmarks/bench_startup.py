@@ -0,0 +1,67 @@
+"""Cold-start timings: ``import app.main`` and time to first 200 from ``/health``.
+
+Each figure comes from a fresh interpreter (best of several runs, bytecode
+already compiled), the way a scale-to-zero host starts the service.
+
+Run from apps/api:  python -m benchmarks.bench_startup
+"""
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+RUNS = 5
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+
+
+def env() -> dict:
+    out = dict(os.environ)
+    out.setdefault("DATABASE_URL", "sqlite://")
+    return out
+
+
+def import_time() -> float:
+    result = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET], capture_output=True, text=True, check=True, env=env())
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def first_health() -> float:
+    port = free_port()
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env(),
+    )
+    try:
+        while True:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                if proc.poll() is not None:
+                    raise RuntimeError("server exited during startup")
+                time.sleep(0.005)
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main() -> None:
+    import_time()  # compile bytecode
+    imports = min(import_time() for _ in range(RUNS))
+    health = min(first_health() for _ in range(RUNS))
+    print(f"import app.main:        {imports * 1000:.0f} ms")
+    print(f"spawn -> first /health: {health * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -34,6 +34,14 @@ def run_migrations_offline() -> None:
 
 
 def run_migrations_online() -> None:
+    # app.bootstrap --check hands over its own connection
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        context.configure(connection=connection, target_metadata=target_metadata)
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+
     configuration = config.get_section(config.config_ini_section, {})
     configuration["sqlalchemy.url"] = get_url()
     connectable = engine_from_config(
@@ -0,0 +1,55 @@
+"""add change sequence, updated_at and tombstones for incremental trip sync
+
+Revision ID: a7c9e1b3d5f6
+Revises: f6b8d0e2a4c5
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c9e1b3d5f6'
+down_revision: Union[str, Sequence[str], None] = 'f6b8d0e2a4c5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEQ_TABLES = ('trip_legs', 'travel_segments', 'scheduled_events', 'trip_users')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in SEQ_TABLES:
+        op.add_column(table, sa.Column('seq', sa.Integer(), nullable=False, server_default='0'))
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()))
+        op.alter_column(table, 'updated_at', server_default=None)
+        op.create_index(f'ix_{table}_trip_id_seq', table, ['trip_id', 'seq'])
+    op.add_column('backlog_cards', sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()))
+    op.alter_column('backlog_cards', 'updated_at', server_default=None)
+
+    op.create_table(
+        'trip_tombstones',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('trip_id', sa.Integer(), nullable=False),
+        sa.Column('seq', sa.Integer(), nullable=False),
+        sa.Column('entity', sa.String(length=20), nullable=False),
+        sa.Column('entity_id', sa.Integer(), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(['trip_id'], ['trips.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_trip_tombstones_trip_id_seq', 'trip_tombstones', ['trip_id', 'seq'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_trip_tombstones_trip_id_seq', table_name='trip_tombstones')
+    op.drop_table('trip_tombstones')
+    op.drop_column('backlog_cards', 'updated_at')
+    for table in reversed(SEQ_TABLES):
+        op.drop_index(f'ix_{table}_trip_id_seq', table_name=table)
+        op.drop_column(table, 'updated_at')
+        op.drop_column(table, 'seq')
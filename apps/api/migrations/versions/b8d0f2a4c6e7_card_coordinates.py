@@ -0,0 +1,30 @@
+"""add latitude/longitude to backlog cards
+
+Revision ID: b8d0f2a4c6e7
+Revises: a7c9e1b3d5f6
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8d0f2a4c6e7'
+down_revision: Union[str, Sequence[str], None] = 'a7c9e1b3d5f6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('backlog_cards', sa.Column('latitude', sa.Float(), nullable=True))
+    op.add_column('backlog_cards', sa.Column('longitude', sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('backlog_cards', 'longitude')
+    op.drop_column('backlog_cards', 'latitude')
@@ -0,0 +1,71 @@
+"""store trip, leg and segment dates as DATE and reservations as timestamptz
+
+Revision ID: c3d9e1f0a7b2
+Revises: f1e2d3c4b5a6
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3d9e1f0a7b2'
+down_revision: Union[str, Sequence[str], None] = 'f1e2d3c4b5a6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+DATE_TABLES = ('trips', 'trip_legs', 'travel_segments')
+DATERANGE_SQL = "daterange(LEAST(start_date, end_date), GREATEST(start_date, end_date), '[]')"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in DATE_TABLES:
+        for column in ('start_date', 'end_date'):
+            op.alter_column(
+                table, column,
+                type_=sa.Date(),
+                existing_nullable=True,
+                postgresql_using=f"NULLIF({column}, '')::date",
+            )
+    op.alter_column(
+        'backlog_cards', 'reservation_date',
+        type_=sa.DateTime(timezone=True),
+        existing_nullable=True,
+        postgresql_using="NULLIF(reservation_date, '')::timestamptz",
+    )
+
+    op.create_index('ix_trips_start_date_end_date', 'trips', ['start_date', 'end_date'])
+    op.create_index('ix_trip_legs_trip_id_start_date', 'trip_legs', ['trip_id', 'start_date'])
+    op.create_index('ix_travel_segments_trip_id_start_date', 'travel_segments', ['trip_id', 'start_date'])
+    op.create_index('ix_backlog_cards_reservation_date', 'backlog_cards', ['reservation_date'])
+    for table in DATE_TABLES:
+        op.execute(f"CREATE INDEX ix_{table}_daterange ON {table} USING gist ({DATERANGE_SQL})")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in DATE_TABLES:
+        op.execute(f"DROP INDEX IF EXISTS ix_{table}_daterange")
+    op.drop_index('ix_backlog_cards_reservation_date', table_name='backlog_cards')
+    op.drop_index('ix_travel_segments_trip_id_start_date', table_name='travel_segments')
+    op.drop_index('ix_trip_legs_trip_id_start_date', table_name='trip_legs')
+    op.drop_index('ix_trips_start_date_end_date', table_name='trips')
+
+    op.alter_column(
+        'backlog_cards', 'reservation_date',
+        type_=sa.String(length=30),
+        existing_nullable=True,
+        postgresql_using="to_char(reservation_date AT TIME ZONE 'UTC', 'YYYY-MM-DD\"T\"HH24:MI:SS.MS\"Z\"')",
+    )
+    for table in DATE_TABLES:
+        for column in ('start_date', 'end_date'):
+            op.alter_column(
+                table, column,
+                type_=sa.String(length=10),
+                existing_nullable=True,
+                postgresql_using=f"to_char({column}, 'YYYY-MM-DD')",
+            )
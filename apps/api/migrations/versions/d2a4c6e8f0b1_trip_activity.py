@@ -0,0 +1,44 @@
+"""add month-partitioned trip_activity log
+
+Revision ID: d2a4c6e8f0b1
+Revises: c9e1f3a5b7d0
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2a4c6e8f0b1'
+down_revision: Union[str, Sequence[str], None] = 'c9e1f3a5b7d0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Monthly partitions (trip_activity_pYYYYMM) are created by app.activity as it writes
+    op.create_table(
+        'trip_activity',
+        sa.Column('occurred_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('id', sa.BigInteger(), autoincrement=False, nullable=False),
+        sa.Column('trip_id', sa.Integer(), nullable=False),
+        sa.Column('actor_id', sa.Integer(), nullable=True),
+        sa.Column('entity', sa.String(length=20), nullable=False),
+        sa.Column('entity_id', sa.Integer(), nullable=True),
+        sa.Column('action', sa.String(length=20), nullable=False),
+        sa.Column('changes', postgresql.JSONB(), nullable=False),
+        sa.PrimaryKeyConstraint('occurred_at', 'id'),
+        postgresql_partition_by='RANGE (occurred_at)',
+    )
+    op.create_index('ix_trip_activity_trip_occurred', 'trip_activity', ['trip_id', 'occurred_at', 'id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_trip_activity_trip_occurred', table_name='trip_activity')
+    op.drop_table('trip_activity')
@@ -0,0 +1,39 @@
+"""add full-text search vector and location trigram index to backlog_cards
+
+Revision ID: d8f2a6b4c1e3
+Revises: c3d9e1f0a7b2
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8f2a6b4c1e3'
+down_revision: Union[str, Sequence[str], None] = 'c3d9e1f0a7b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('simple', title), 'A') || "
+    "setweight(to_tsvector('simple', location), 'B') || "
+    "setweight(to_tsvector('simple', description), 'C')"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(f"ALTER TABLE backlog_cards ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ({SEARCH_VECTOR_SQL}) STORED")
+    op.execute("CREATE INDEX ix_backlog_cards_search_vector ON backlog_cards USING gin (search_vector)")
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute("CREATE INDEX ix_backlog_cards_location_trgm ON backlog_cards USING gin (location gin_trgm_ops)")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP INDEX IF EXISTS ix_backlog_cards_location_trgm")
+    op.execute("DROP INDEX IF EXISTS ix_backlog_cards_search_vector")
+    op.drop_column('backlog_cards', 'search_vector')
@@ -0,0 +1,29 @@
+"""add calendar_token to trips for calendar subscriptions
+
+Revision ID: e3b5d7f9a1c2
+Revises: d2a4c6e8f0b1
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3b5d7f9a1c2'
+down_revision: Union[str, Sequence[str], None] = 'd2a4c6e8f0b1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing trips get a token on the first GET /trips/{id}/calendar
+    op.add_column('trips', sa.Column('calendar_token', sa.String(length=64), server_default='', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('trips', 'calendar_token')
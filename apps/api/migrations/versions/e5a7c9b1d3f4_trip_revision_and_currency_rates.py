@@ -0,0 +1,36 @@
+"""add trip revision counter and currency_rates table
+
+Revision ID: e5a7c9b1d3f4
+Revises: d8f2a6b4c1e3
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a7c9b1d3f4'
+down_revision: Union[str, Sequence[str], None] = 'd8f2a6b4c1e3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('trips', sa.Column('revision', sa.Integer(), nullable=False, server_default='0'))
+    op.create_table(
+        'currency_rates',
+        sa.Column('code', sa.String(length=3), nullable=False),
+        sa.Column('rate', sa.Numeric(precision=18, scale=8), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint('code'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('currency_rates')
+    op.drop_column('trips', 'revision')
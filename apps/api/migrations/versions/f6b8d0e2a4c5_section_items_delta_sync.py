@@ -0,0 +1,50 @@
+"""add section_items and section revisions for packing/overview sync
+
+Revision ID: f6b8d0e2a4c5
+Revises: e5a7c9b1d3f4
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f6b8d0e2a4c5'
+down_revision: Union[str, Sequence[str], None] = 'e5a7c9b1d3f4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('trip_sections', sa.Column('revision', sa.Integer(), nullable=False, server_default='0'))
+    op.create_unique_constraint('uq_trip_section_kind', 'trip_sections', ['trip_id', 'kind'])
+    op.create_table(
+        'section_items',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('section_id', sa.Integer(), nullable=False),
+        sa.Column('client_id', sa.String(length=64), nullable=False),
+        sa.Column('parent_client_id', sa.String(length=64), nullable=True),
+        sa.Column('kind', sa.String(length=20), nullable=False),
+        sa.Column('position', sa.Integer(), nullable=False),
+        sa.Column('data', postgresql.JSONB(), nullable=False),
+        sa.Column('deleted', sa.Boolean(), nullable=False),
+        sa.Column('revision', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(['section_id'], ['trip_sections.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('section_id', 'client_id', name='uq_section_item_client_id'),
+    )
+    op.create_index('ix_section_items_section_id_revision', 'section_items', ['section_id', 'revision'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_section_items_section_id_revision', table_name='section_items')
+    op.drop_table('section_items')
+    op.drop_constraint('uq_trip_section_kind', 'trip_sections', type_='unique')
+    op.drop_column('trip_sections', 'revision')
@@ -0,0 +1,62 @@
+"""Shared fixtures: a throwaway SQLite database (or ``TEST_DATABASE_URL``) and seed rows.
+
+Routers are called as plain functions with the session and user, the same
+way the benchmarks drive them, so no auth round trip is involved.
+"""
+import os
+import tempfile
+
+_db_dir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = os.getenv("TEST_DATABASE_URL", f"sqlite:///{_db_dir}/test.db")
+os.environ.setdefault("STRUCTURED_LOGS", "0")
+
+import pytest
+
+from app import activity, db, models
+
+
+@pytest.fixture(scope="session", autouse=True)
+def schema():
+    db.Base.metadata.create_all(db.get_engine())
+    yield
+    activity.stop()
+    db.Base.metadata.drop_all(db.get_engine())
+
+
+@pytest.fixture
+def session(schema):
+    with db.SessionLocal() as session:
+        yield session
+    # Tests share one database; empty it so each starts from scratch
+    with db.SessionLocal() as cleanup:
+        for table in reversed(db.Base.metadata.sorted_tables):
+            cleanup.execute(table.delete())
+        cleanup.commit()
+
+
+@pytest.fixture
+def user(session):
+    user = models.User(google_sub="sub", email="user@example.com", name="User", picture="")
+    session.add(user)
+    session.commit()
+    return user
+
+
+@pytest.fixture
+def trip(session, user):
+    trip = models.Trip(name="Trip", created_by=user.id, invite_code="code", start_date="2026-06-01", end_date="2026-06-03")
+    session.add(trip)
+    session.flush()
+    session.add(models.TripUser(trip_id=trip.id, user_id=user.id))
+    session.commit()
+    return trip
+
+
+@pytest.fixture
+def add_card(session):
+    def add_card(**values) -> models.BacklogCard:
+        card = models.BacklogCard(**{"title": "Card", "category": "activities", **values})
+        session.add(card)
+        session.commit()
+        return card
+    return add_card
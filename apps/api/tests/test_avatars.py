@@ -0,0 +1,53 @@
+import os
+
+from app import avatars
+
+
+class CountingFetcher(avatars.StubFetcher):
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def fetch(self, url: str) -> bytes:
+        self.calls += 1
+        return super().fetch(url)
+
+
+def files(root, kind: str) -> list[str]:
+    return os.listdir(os.path.join(root, kind))
+
+
+def test_hits_are_served_from_disk(tmp_path):
+    fetcher = CountingFetcher()
+    cache = avatars.AvatarCache(str(tmp_path), fetcher)
+    first = cache.thumbnail_for("https://example.com/a.png")
+    assert first.startswith(b"RIFF") and first[8:12] == b"WEBP"
+    assert cache.thumbnail_for("https://example.com/a.png") == first
+    assert fetcher.calls == 1
+
+
+def test_eviction_removes_blobs_and_their_refs(tmp_path):
+    fetcher = CountingFetcher()
+    one = len(avatars.AvatarCache(str(tmp_path / "probe"), fetcher).thumbnail_for("https://example.com/0.png"))
+    cache = avatars.AvatarCache(str(tmp_path / "cache"), fetcher, max_bytes=one * 2)
+    for i in range(6):
+        cache.thumbnail_for(f"https://example.com/{i}.png")
+    root = tmp_path / "cache"
+    assert len(files(root, "blobs")) <= 2
+    assert len(files(root, "refs")) == len(files(root, "blobs"))
+
+    # An evicted picture is fetched again, and a restarted cache sees the same files
+    calls = fetcher.calls
+    assert cache.thumbnail_for("https://example.com/0.png")
+    assert fetcher.calls == calls + 1
+    reopened = avatars.AvatarCache(str(root), fetcher, max_bytes=one * 2)
+    assert set(reopened._ref_digest) == set(files(root, "refs"))
+
+
+def test_blob_deleted_after_lookup_refetches(tmp_path):
+    fetcher = CountingFetcher()
+    cache = avatars.AvatarCache(str(tmp_path), fetcher)
+    data = cache.thumbnail_for("https://example.com/a.png")
+    for name in files(tmp_path, "blobs"):
+        os.remove(tmp_path / "blobs" / name)
+    assert cache.thumbnail_for("https://example.com/a.png") == data
+    assert fetcher.calls == 2
@@ -0,0 +1,23 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+
+
+@pytest.fixture
+def client():
+    with TestClient(main.create_app()) as client:
+        yield client
+
+
+def test_feed_token(client, session, trip):
+    trip.calendar_token = "secret"
+    session.commit()
+    assert client.get(f"/trips/{trip.id}/calendar.ics", params={"token": "secret"}).status_code == 200
+    assert client.get(f"/trips/{trip.id}/calendar.ics", params={"token": "wrong"}).status_code == 401
+
+
+def test_non_ascii_token_is_a_mismatch(client, session, trip):
+    trip.calendar_token = "secret"
+    session.commit()
+    assert client.get(f"/trips/{trip.id}/calendar.ics", params={"token": "é"}).status_code == 401
@@ -0,0 +1,51 @@
+import pytest
+from pydantic import ValidationError
+
+from app import models, planner, schemas
+from app.routers import trips
+
+
+def schedule(session, trip_id: int) -> dict[tuple[int, int], int]:
+    session.expire_all()
+    events = session.query(models.ScheduledEvent).filter(models.ScheduledEvent.trip_id == trip_id)
+    return {(ev.day_index, ev.hour): ev.card_id for ev in events}
+
+
+def lock(session, trip, card, day: int, hour: int) -> None:
+    session.add(models.ScheduledEvent(trip_id=trip.id, card_id=card.id, day_index=day, hour=hour))
+    session.commit()
+
+
+def test_apply_keeps_locked_in_cards_not_listed(session, user, trip, add_card):
+    locked = add_card(title="Locked", locked_in=True)
+    other = add_card(title="Other", desire_to_go=5)
+    lock(session, trip, locked, 0, 10)
+
+    payload = schemas.PlanRequest(card_ids=[other.id], apply=True)
+    plan = trips.plan_trip_schedule(trip.id, payload, db=session, current_user=user)
+
+    assert (0, 10, locked.id) in {(ev.day_index, ev.hour, ev.card_id) for ev in plan.events}
+    slots = schedule(session, trip.id)
+    assert slots[(0, 10)] == locked.id
+    assert other.id in slots.values()
+
+
+def test_apply_keeps_locked_in_card_reserved_outside_trip(session, user, trip, add_card):
+    locked = add_card(title="Locked", locked_in=True, reservation_date="2027-01-01T18:00:00Z")
+    lock(session, trip, locked, 1, 18)
+
+    trips.plan_trip_schedule(trip.id, schemas.PlanRequest(apply=True), db=session, current_user=user)
+
+    assert schedule(session, trip.id)[(1, 18)] == locked.id
+
+
+def test_reversed_hours_are_rejected():
+    with pytest.raises(ValidationError):
+        schemas.PlanRequest(day_start_hour=20, day_end_hour=8)
+
+
+def test_empty_window_plans_nothing():
+    cards = [planner.PlanCard(id=1, reservation_day=0, reservation_hour=12), planner.PlanCard(id=2)]
+    plan = planner.plan_schedule(cards, 2, day_start_hour=20, day_end_hour=8)
+    assert plan.slots == {}
+    assert plan.unscheduled == [1, 2]
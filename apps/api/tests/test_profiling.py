@@ -0,0 +1,15 @@
+from app import profiling
+
+
+def test_authorized(monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", "secret")
+    assert profiling.authorized("secret")
+    assert not profiling.authorized("wrong")
+    assert not profiling.authorized(None)
+    assert not profiling.authorized("é")
+    assert not profiling.authorized("€")
+
+
+def test_unset_token_authorizes_nothing(monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", "")
+    assert not profiling.authorized("")
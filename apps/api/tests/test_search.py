@@ -0,0 +1,38 @@
+import pytest
+
+from app import search
+
+
+@pytest.fixture(autouse=True)
+def fresh_index(monkeypatch):
+    # Tests empty the tables without ORM events; start every test from a rebuilt index
+    monkeypatch.setattr(search, "_index", search.InvertedIndex())
+
+
+def page_through(session, q: str, limit: int) -> list[list[int]]:
+    pages, cursor = [], None
+    for _ in range(20):
+        hits, cursor = search.search_cards(session, q, limit, cursor)
+        pages.append([hit.card.id for hit in hits])
+        if cursor is None:
+            return pages
+    pytest.fail(f"search for {q!r} did not finish paging: {pages}")
+
+
+def test_pages_through_ties(session, add_card):
+    tied = [add_card(title="Museum", location="Lisbon").id for _ in range(5)]
+    best = add_card(title="Museum museum", location="Lisbon museum").id
+    add_card(title="Beach", location="Porto")
+
+    pages = page_through(session, "museum", 2)
+
+    ids = [card_id for page in pages for card_id in page]
+    assert ids[0] == best
+    assert sorted(ids[1:]) == tied
+    assert len(ids) == len(set(ids))
+    assert all(len(page) <= 2 for page in pages)
+
+
+def test_cursor_round_trips_rank():
+    rank = 0.699999988079071  # 0.7 as float4
+    assert search.decode_cursor(search.encode_cursor(rank, 3)) == (rank, 3)
@@ -0,0 +1,70 @@
+import asyncio
+
+from app.singleflight import SingleFlightMiddleware
+
+AUTH = [(b"authorization", b"Bearer tok")]
+
+
+def make_app():
+    release = asyncio.Event()
+    calls = []
+
+    async def app(scope, receive, send):
+        calls.append(scope["method"])
+        if scope["method"] == "GET":
+            await release.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": str(len(calls)).encode()})
+
+    return app, release, calls
+
+
+async def request(middleware, method: str) -> list[dict]:
+    scope = {"type": "http", "method": method, "path": "/trips/1", "query_string": b"", "headers": AUTH}
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        sent.append(message)
+
+    await middleware(scope, receive, send)
+    return sent
+
+
+def coalesced(sent: list[dict]) -> bool:
+    return (b"x-coalesced", b"true") in sent[0]["headers"]
+
+
+def test_concurrent_reads_coalesce():
+    async def run():
+        app, release, calls = make_app()
+        middleware = SingleFlightMiddleware(app)
+        leader = asyncio.create_task(request(middleware, "GET"))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(request(middleware, "GET"))
+        await asyncio.sleep(0)
+        release.set()
+        await leader
+        assert coalesced(await follower)
+        assert calls == ["GET"]
+
+    asyncio.run(run())
+
+
+def test_read_after_write_does_not_join_earlier_leader():
+    async def run():
+        app, release, calls = make_app()
+        middleware = SingleFlightMiddleware(app)
+        leader = asyncio.create_task(request(middleware, "GET"))
+        await asyncio.sleep(0)
+        await request(middleware, "PATCH")
+        follower = asyncio.create_task(request(middleware, "GET"))
+        await asyncio.sleep(0)
+        release.set()
+        await leader
+        assert not coalesced(await follower)
+        assert calls == ["GET", "PATCH", "GET"]
+
+    asyncio.run(run())
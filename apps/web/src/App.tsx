@@ -3,7 +3,7 @@ import './App.css'
 import { Link, Navigate, Route, Routes, useLocation } from 'react-router-dom'
 import { useEffect, useState } from 'react'
 import Login from './pages/login'
-import { fetchMe, logout as apiLogout, type SessionRead } from './api/client'
+import { avatarSrc, fetchMe, logout as apiLogout, type SessionRead } from './api/client'
 import Trips from './pages/trips'
 import Navigation from './components/Navigation'
 import TripMain from './pages/overview'
@@ -119,8 +119,8 @@ function HeaderContent() {
           <Text size="sm" fw={600}>{session.user.name}</Text>
           <Menu position="bottom-end" withinPortal>
             <Menu.Target>
-              <Avatar radius="xl" size={28} src={session.user.picture} alt={session.user.name} style={{ cursor: 'pointer' }}>
-                {!session.user.picture && getInitials(session.user.name)}
+              <Avatar radius="xl" size={28} src={avatarSrc(session.user)} alt={session.user.name} style={{ cursor: 'pointer' }}>
+                {!avatarSrc(session.user) && getInitials(session.user.name)}
               </Avatar>
             </Menu.Target>
             <Menu.Dropdown>
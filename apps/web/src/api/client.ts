@@ -15,6 +15,8 @@ export type BacklogCardPayload = {
   category: 'hotels' | 'activities' | 'food' | 'clubs'
   title: string
   location?: string
+  latitude?: number | null
+  longitude?: number | null
   cost?: number | null
   rating?: number | null
   desire_to_go?: number | null
@@ -29,7 +31,7 @@ export type BacklogCard = BacklogCardPayload & {
   id: number
   created_by?: number | null
   created_at?: string | null
-  creator?: { id: number; email: string; name: string; picture: string } | null
+  creator?: { id: number; email: string; name: string; picture: string; avatar_url?: string } | null
 }
 
 export async function listBacklogCards(): Promise<BacklogCard[]> {
@@ -76,9 +78,16 @@ export async function deleteBacklogCard(id: number): Promise<void> {
 
 
 // Auth
+export type UserRead = { id: number; email: string; name: string; picture: string; avatar_url?: string }
+
+// avatar_url is relative to the API, which is served from another origin than the app
+export function avatarSrc(user: { picture: string; avatar_url?: string }): string {
+  return user.avatar_url ? `${API_BASE}${user.avatar_url}` : user.picture
+}
+
 export type SessionRead = {
   token: string
-  user: { id: number; email: string; name: string; picture: string }
+  user: UserRead
 }
 
 export async function loginWithGoogle(idToken: string): Promise<SessionRead> {
@@ -106,7 +115,7 @@ export type TripLeg = { id: number; name: string; start_date?: string | null; en
 export type TripLegCreate = { name: string; start_date?: string | null; end_date?: string | null; order_index?: number }
 export type TripLegUpdate = { name?: string; start_date?: string | null; end_date?: string | null; order_index?: number }
 
-export type Trip = { id: number; name: string; start_date?: string | null; end_date?: string | null; legs?: TripLeg[]; created_by?: number | null; creator?: { id: number; email: string; name: string; picture: string } | null }
+export type Trip = { id: number; name: string; start_date?: string | null; end_date?: string | null; legs?: TripLeg[]; created_by?: number | null; creator?: { id: number; email: string; name: string; picture: string; avatar_url?: string } | null }
 export type TripCreate = { name: string; start_date?: string | null; end_date?: string | null }
 
 export async function listTrips(): Promise<Trip[]> {
@@ -266,3 +275,58 @@ export async function joinTripByInvite(tripId: number, code: string): Promise<Tr
 }
 
 
+
+// Synced trip sections (packing, overview)
+export type SectionKind = 'packing' | 'overview'
+export type SectionItem = {
+  id: string
+  parent_id?: string | null
+  kind: 'person' | 'item' | 'field'
+  position: number
+  data: Record<string, unknown>
+  deleted?: boolean
+  revision?: number
+}
+export type SectionItemOp = Omit<SectionItem, 'deleted' | 'revision'> & { op?: 'upsert' } | { op: 'delete'; id: string }
+export type SectionDelta = { kind: SectionKind; revision: number; items: SectionItem[] }
+
+export async function getSection(tripId: number, kind: SectionKind, since = 0): Promise<SectionDelta> {
+  const res = await fetch(`${API_BASE}/trips/${tripId}/sections/${kind}?since=${since}`, { headers: getAuthHeaders() })
+  if (!res.ok) throw new Error('Failed to fetch section')
+  return res.json()
+}
+
+export async function applySectionOps(tripId: number, kind: SectionKind, baseRevision: number, ops: SectionItemOp[]): Promise<SectionDelta> {
+  const res = await fetch(`${API_BASE}/trips/${tripId}/sections/${kind}/ops`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json', ...getAuthHeaders() },
+    body: JSON.stringify({ base_revision: baseRevision, ops }),
+  })
+  if (!res.ok) throw new Error('Failed to sync section')
+  return res.json()
+}
+
+// Suggested visiting order for one schedule day
+export type RouteStop = {
+  event_id: number
+  card_id: number
+  hour: number
+  scheduled_hour: number
+  latitude: number
+  longitude: number
+  locked: boolean
+}
+export type DayRoute = {
+  trip_id: number
+  day_index: number
+  stops: RouteStop[]
+  distance_km: number
+  original_distance_km: number
+  unrouted: number[]
+}
+
+export async function getDayRoute(tripId: number, dayIndex: number): Promise<DayRoute> {
+  const res = await fetch(`${API_BASE}/trips/${tripId}/days/${dayIndex}/route`, { headers: getAuthHeaders() })
+  if (!res.ok) throw new Error('Failed to fetch day route')
+  return res.json()
+}
@@ -1,7 +1,7 @@
 import { Badge, Box, Button, Checkbox, Group, Modal, NumberInput, Paper, Rating, ScrollArea, SimpleGrid, Stack, Text, TextInput, Textarea, Title } from '@mantine/core'
 import { useDisclosure } from '@mantine/hooks'
 import { useEffect, useMemo, useRef, useState } from 'react'
-import { createBacklogCard, listBacklogCards, deleteBacklogCard, updateBacklogCard, type BacklogCard as ApiBacklogCard, type SessionRead } from '../../../api/client'
+import { createBacklogCard, listBacklogCards, deleteBacklogCard, updateBacklogCard, type BacklogCard as ApiBacklogCard, type SessionRead, type UserRead, avatarSrc } from '../../../api/client'
 
 type ColumnKey = 'hotels' | 'activities' | 'food' | 'clubs'
 
@@ -20,7 +20,7 @@ type BacklogCard = {
   lockedIn: boolean
   createdBy: number | null
   createdAt: string | null
-  creator: { id: number; email: string; name: string; picture: string } | null
+  creator: UserRead | null
 }
 
 type AddCardFormState = {
@@ -251,7 +251,7 @@ function BacklogBoard() {
                     {card.creator && (
                       <Group gap={8} align="center">
                         <img 
-                          src={card.creator.picture} 
+                          src={avatarSrc(card.creator)} 
                           alt={card.creator.name}
                           style={{ 
                             width: 20, 
@@ -450,7 +450,7 @@ function BacklogBoard() {
                 {viewingCard.card.creator && (
                   <Group gap={8} align="center">
                     <img 
-                      src={viewingCard.card.creator.picture} 
+                      src={avatarSrc(viewingCard.card.creator)} 
                       alt={viewingCard.card.creator.name}
                       style={{ 
                         width: 24, 